@@ -4,108 +4,3501 @@ SAE 1.05 - Analyseur TKINTER avec GRAPHIQUES + EXPORT EXCEL
 Version finale : fenêtre avec graphiques + export Excel avec camemberts
 """
 
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
 from pathlib import Path
-from collections import Counter
-import csv
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from itertools import chain, islice, repeat
+import glob
+import hashlib
+import importlib.util
+import heapq
+import io
+import ipaddress
+import json
+import math
+import mmap
+import os
+import pickle
 import re
+import socket
+import struct
+from array import array
+import sys
+import threading
+import time
 from datetime import datetime
-import zipfile
-import io
+from queue import Full, Queue
+
+# Les modules lourds ne sont importés qu'au moment où on s'en sert :
+# tkinter à l'ouverture de la fenêtre (charger_interface), matplotlib au
+# premier graphique (charger_matplotlib), openpyxl au premier export Excel.
+tk = filedialog = messagebox = ttk = None
+Figure = FigureCanvasTkAgg = None
+
+# Présence vérifiée sans importer (quelques µs au lieu de plusieurs centaines de ms)
+MATPLOTLIB_OK = importlib.util.find_spec("matplotlib") is not None
+OPENPYXL_OK = importlib.util.find_spec("openpyxl") is not None
+NUMPY_OK = importlib.util.find_spec("numpy") is not None
+PYARROW_OK = importlib.util.find_spec("pyarrow") is not None
+ZSTANDARD_OK = importlib.util.find_spec("zstandard") is not None
+
+
+def charger_interface():
+    """Importe tkinter (mode fenêtre uniquement)."""
+    global tk, filedialog, messagebox, ttk
+    import tkinter as tk
+    from tkinter import filedialog, messagebox, ttk
+
+
+# Ombres et parts éclatées des camemberts (case à cocher dans l'interface)
+EFFETS_GRAPHIQUES = True
+
+# Lignes visibles des tables détaillées (seules celles-ci existent dans le Treeview)
+LIGNES_TABLE = 20
+
+
+def charger_matplotlib():
+    """Importe matplotlib au premier graphique ; renvoie False s'il est absent."""
+    global Figure, FigureCanvasTkAgg, MATPLOTLIB_OK
+    if MATPLOTLIB_OK and Figure is None:
+        try:
+            import matplotlib
+            matplotlib.use('TkAgg')
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        except ImportError:
+            MATPLOTLIB_OK = False
+    return MATPLOTLIB_OK
+
+# ============================================================================
+# FONCTION D'ANALYSE
+# ============================================================================
+
+# Taille des blocs lus sur le disque : le fichier n'est jamais chargé en entier
+TAILLE_BLOC = 1 << 20
+
+# En dessous de cette taille par processus, le parallélisme ne vaut pas le coût
+TAILLE_MIN_PLAGE = 16 << 20
+
+# Pas de mise à jour de la progression (et de vérification de l'annulation)
+TAILLE_PAS = 8 << 20
+
+# Mots d'erreur par défaut (mots entiers, sans tenir compte de la casse)
+MOTS_ERREUR = ("error", "err", "exception", "critical", "fatal", "failed", "failure", "denied")
+# Erreurs gardées en détail (premières ou échantillon) ; les comptes par type restent exacts
+MAX_ERREURS = 100_000
+
+# Règles d'alerte intégrées (voir JeuRegles) ; un fichier --regles les complète ou les remplace
+REGLES_DEFAUT = (
+    {"nom": "DOS", "type": "destination", "seuil": 50, "top": 5},
+    {"nom": "SYN FLOOD", "type": "flags", "flags": ["[S]"], "seuil": 50, "message": "🟠 {nom} : {valeur} paquets SYN"},
+    {"nom": "DESEQUILIBRE", "type": "desequilibre", "seuil": 20, "ratio": 5, "top": 10},
+)
+
+# Tokenizer binaire (mmap) : ces regex tournent directement sur les octets du fichier.
+# Une ligne "utile" n'est ni vide ni une ligne hexadécimale (\t0x0000: ...) ; les
+# lignes hexa sont sautées par le moteur de regex sans créer d'objet Python.
+# Groupe 1 : ligne ASCII imprimable (cas tcpdump), groupe 2 : tout le reste.
+_CORPS_LIGNE = rb"(?:([\x21-\x7e][\x20-\x7e]*)[ \t\x0b\x0c]*\r?(?=\n|\Z)|([^\s][^\n]*))"
+_BLANCS = rb"[ \t\r\x0b\x0c]*"
+# Sans \r isolé, une ligne hexa se reconnaît à son début : c'est le cas courant
+PREMIERE_LIGNE_B = re.compile(_BLANCS + rb"(?!0x)" + _CORPS_LIGNE)
+LIGNE_UTILE_B = re.compile(rb"\n(?!" + _BLANCS + rb"0x)" + _BLANCS + _CORPS_LIGNE)
+# Avec un \r isolé (fin de ligne "Mac"), la ligne hexa doit aller jusqu'au \n
+_HEXA_CR = rb"0x[^\r\n]*\r?(?:\n|\Z)"
+PREMIERE_LIGNE_CR_B = re.compile(_BLANCS + rb"(?!" + _HEXA_CR + rb")" + _CORPS_LIGNE)
+LIGNE_UTILE_CR_B = re.compile(rb"\n" + _BLANCS + rb"(?!" + _HEXA_CR + rb")" + _CORPS_LIGNE)
+CR_SEUL_B = re.compile(rb"\r(?!\n)")
+
+# Découpage des plages : on coupe avant une ligne non indentée, jamais au milieu
+# du bloc hexa d'un paquet
+DEBUT_PAQUET_B = re.compile(rb"\n(?![ \t])")
+
+# Bloc hexa (tcpdump -x / -X) : seules les 3 premières lignes (48 octets) servent,
+# elles contiennent les en-têtes IPv4 + TCP/UDP. La colonne ASCII éventuelle est
+# séparée par deux espaces et n'est donc pas capturée.
+_HEXA = rb"([0-9a-f]{2,4}(?: [0-9a-f]{2,4}){0,7})"
+BLOC_HEXA_B = re.compile(
+    rb"\n[ \t]*0x0000:  " + _HEXA
+    + rb"(?:[^\n]*\n[ \t]*0x0010:  " + _HEXA
+    + rb"(?:[^\n]*\n[ \t]*0x0020:  " + _HEXA + rb")?)?"
+)
+TAILLE_LOT_HEXA = 4096
+
+PORTS = struct.Struct("!HH")
+SEQ_ACK = struct.Struct("!II")
+
+# Enregistrement compact d'un paquet décodé (20 octets) :
+# ip_src, ip_dst, port_src, port_dst, protocole, ttl, flags TCP, longueur IP, longueur utile
+PAQUET_HEXA = struct.Struct("!4s4sHHBBBxHH")
+PROTOCOLES = {1: "ICMP", 6: "TCP", 17: "UDP", 58: "ICMPv6"}
+
+# Captures binaires : magique -> (ordre des octets, unité des horodatages)
+MAGIC_PCAP = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+MAGIC_PCAPNG = b"\x0a\x0d\x0d\x0a"
+EXTENSIONS_PCAP = (".pcap", ".pcapng", ".cap")
+
+# Captures compressées : reconnues par leurs premiers octets, décompressées au fil de la lecture
+MAGIC_COMPRESSION = {
+    b"\x1f\x8b": "gz",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+    b"\x28\xb5\x2f\xfd": "zst",
+    b"PK\x03\x04": "zip",
+}
+EXTENSIONS_COMPRESSION = (".gz", ".bz2", ".xz", ".zst")
+# Blocs décompressés d'avance par le thread de lecture (mémoire bornée)
+BLOCS_AVANCE = 4
+
+# Suivi d'une capture en cours (tcpdump -l) : rafraîchissement, attente, mémoire bornée
+INTERVALLE_SUIVI = 2.0
+ATTENTE_SUIVI = 0.2
+LIMITE_SUIVI = 100_000
+
+# Suivi des connexions TCP (option flux) : secondes d'inactivité avant retrait, taille de la table
+EXPIRATION_FLUX = 120.0
+MAX_FLUX = 100_000
+
+# Fusion de plusieurs captures : variation du volume d'un hôte signalée au-delà de 50 %
+SEUIL_VARIATION = 0.5
+
+# Clés des stats qui portent des objets Python (requêtes), absentes du JSON
+CLES_OBJETS = ("table", "index")
+
+# Nombre maximal de lignes d'une feuille Excel (en-tête compris)
+LIGNES_MAX_EXCEL = 1_048_576
+
+# Export des paquets (ExportPaquets) : lignes par lot / groupe de lignes Parquet
+TAILLE_LOT_EXPORT = 65536
+
+# Cache disque des analyses (analyser_avec_cache) ; VERSION_CACHE change avec EtatAnalyse
+DOSSIER_CACHE = Path(os.environ.get("ANALYSEUR_CACHE") or Path.home() / ".cache" / "analyseur_sae105")
+VERSION_CACHE = 9
+TAILLE_EMPREINTE = 64 << 10
+
+# Mode esquisse : précision du HyperLogLog (2**14 registres = 16 Kio, erreur type 0,8 %)
+PRECISION_HLL = 14
+
+# Horodatage tcpdump en tête de ligne (11:42:04.766656) et longueur annoncée
+HORODATAGE_B = re.compile(rb"(\d\d):(\d\d):(\d\d(?:\.\d+)?) ")
+LONGUEUR_B = re.compile(rb" length (\d+)")
+SEQ_B = re.compile(rb" seq (\d+)")
+ACK_B = re.compile(rb" ack (\d+)")
+
+# Flags TCP écrits comme tcpdump ("[S.]," pour SYN+ACK), indexés par l'octet de flags
+FLAGS_TCP = [
+    "[" + ("".join(c for bit, c in ((1, "F"), (2, "S"), (4, "R"), (8, "P"), (16, "."),
+                                     (32, "U"), (64, "E"), (128, "W")) if i & bit) or "none") + "],"
+    for i in range(256)
+]
+BITS_FLAGS = {texte: i for i, texte in enumerate(FLAGS_TCP)}
+
+# Services nommés par tcpdump (BP-Linux8.ssh) -> numéro de port
+_PORTS_NOMMES = {}
+
+
+def decouper_fichier(chemin, nb_plages, debut=0, fin=None):
+    """Découpe le fichier (ou sa plage [debut, fin)) en plages alignées sur les débuts de ligne."""
+    taille = os.path.getsize(chemin) if fin is None else fin
+    bornes = [debut]
+    with open(chemin, "rb") as f:
+        for i in range(1, nb_plages):
+            f.seek(max(debut + (taille - debut) * i // nb_plages, bornes[-1]))
+            f.readline()
+            # Pas de coupure au milieu d'un bloc hexa (lignes indentées)
+            while True:
+                pos = f.tell()
+                if f.read(1) not in (b" ", b"\t"):
+                    break
+                f.readline()
+            if pos >= taille:
+                break
+            if pos > bornes[-1]:
+                bornes.append(pos)
+    bornes.append(taille)
+    return list(zip(bornes, bornes[1:]))
+
+
+def decoder_ip(brut, o=0, n=None):
+    """Décode l'en-tête IPv4/IPv6 (+ TCP/UDP) qui commence à brut[o].
+
+    n est le nombre d'octets disponibles (en-têtes parfois tronqués).
+    Renvoie (ip_src, ip_dst, port_src, port_dst, protocole, ttl, flags TCP,
+    longueur IP, longueur utile), dans l'ordre de PAQUET_HEXA, ou None.
+    """
+    if n is None:
+        n = len(brut) - o
+    if n < 20:
+        return None
+    version = brut[o] >> 4
+    if version == 4:
+        ihl = (brut[o] & 15) * 4
+        longueur_ip = (brut[o + 2] << 8) | brut[o + 3]
+        charge = longueur_ip - ihl
+        ttl = brut[o + 8]
+        proto = brut[o + 9]
+        src = brut[o + 12:o + 16]
+        dst = brut[o + 16:o + 20]
+        fragment = ((brut[o + 6] & 0x1f) << 8) | brut[o + 7]
+    elif version == 6 and n >= 40:
+        ihl = 40
+        charge = (brut[o + 4] << 8) | brut[o + 5]
+        longueur_ip = charge + 40
+        proto = brut[o + 6]
+        ttl = brut[o + 7]
+        src = brut[o + 8:o + 24]
+        dst = brut[o + 24:o + 40]
+        fragment = 0
+    else:
+        return None
+    
+    port_src = port_dst = flags = entete = 0
+    t = o + ihl
+    if proto in (6, 17) and not fragment and n >= ihl + 4:
+        port_src, port_dst = PORTS.unpack_from(brut, t)
+        if proto == 17:
+            entete = 8
+        elif n >= ihl + 14:
+            entete = (brut[t + 12] >> 4) * 4
+            flags = brut[t + 13]
+    return src, dst, port_src, port_dst, proto, ttl, flags, longueur_ip, max(charge - entete, 0)
+
+
+def decoder_hexa(tampon, debut=0, fin=None):
+    """Décode les blocs hexa des paquets en enregistrements PAQUET_HEXA.
+
+    Les 48 premiers octets de chaque paquet sont convertis par lots
+    (un seul bytes.fromhex pour TAILLE_LOT_HEXA paquets). Renvoie un
+    bytearray de PAQUET_HEXA.size octets par paquet IPv4.
+    """
+    if fin is None:
+        fin = len(tampon)
+    enregistrements = bytearray()
+    lot = []
+    tailles = []
+    
+    def vider_lot():
+        brut = bytes.fromhex("".join(lot))
+        pack = PAQUET_HEXA.pack
+        for i, n in enumerate(tailles):
+            paquet = decoder_ip(brut, i * 48, n)
+            if paquet and len(paquet[0]) == 4:
+                enregistrements.extend(pack(*paquet))
+        lot.clear()
+        tailles.clear()
+    
+    for m in BLOC_HEXA_B.finditer(tampon, debut, fin):
+        hexa = b"".join(g for g in m.groups() if g).replace(b" ", b"")
+        tailles.append(len(hexa) // 2)
+        lot.append(hexa.ljust(96, b"0").decode())
+        if len(lot) >= TAILLE_LOT_HEXA:
+            vider_lot()
+    if lot:
+        vider_lot()
+    return enregistrements
+
+
+def format_capture(chemin):
+    """Reconnaît le format par les premiers octets : "pcap", "pcapng" ou "texte"."""
+    with open(chemin, "rb") as f:
+        magique = f.read(4)
+    if magique in MAGIC_PCAP:
+        return "pcap"
+    if magique == MAGIC_PCAPNG:
+        return "pcapng"
+    return "texte"
+
+
+def compression_capture(chemin):
+    """Reconnaît la compression par les premiers octets : "gz", "bz2", "xz", "zst", "zip" ou None."""
+    with open(chemin, "rb") as f:
+        magique = f.read(6)
+    for debut, compression in MAGIC_COMPRESSION.items():
+        if magique.startswith(debut):
+            return compression
+    return None
+
+
+def ouvrir_decompression(f, compression):
+    """Flux décompressé (lecture en continu) d'un fichier ouvert en binaire."""
+    if compression == "gz":
+        import gzip
+        return gzip.GzipFile(fileobj=f)
+    if compression == "bz2":
+        import bz2
+        return bz2.BZ2File(f)
+    if compression == "xz":
+        import lzma
+        return lzma.LZMAFile(f)
+    if compression == "zst":
+        if not ZSTANDARD_OK:
+            raise ValueError("captures .zst : installez le module zstandard (pip install zstandard)")
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(f)
+    raise ValueError(f"compression inconnue : {compression}")
+
+
+class LectureAvance(io.RawIOBase):
+    """Lit un flux (décompression) dans un thread, jusqu'à BLOCS_AVANCE blocs d'avance.
+
+    zlib, bz2, lzma et zstandard relâchent le GIL : le bloc suivant est
+    décompressé pendant que le thread principal analyse le précédent.
+    position (appelée dans le thread de lecture) donne les octets lus
+    dans le fichier compressé ; lus compte les octets décompressés.
+    """
+
+    def __init__(self, source, position=None):
+        super().__init__()
+        self.blocs = Queue(BLOCS_AVANCE)
+        self.arret = threading.Event()
+        self.bloc = memoryview(b"")
+        self.fin = False
+        self.lus = 0
+        self.position = 0
+        self.thread = threading.Thread(target=self._lire, args=(source, position), daemon=True)
+        self.thread.start()
+
+    def _lire(self, source, position):
+        try:
+            while not self.arret.is_set():
+                bloc = source.read(TAILLE_BLOC)
+                self._deposer((bloc, position() if position else 0))
+                if not bloc:
+                    return
+        except Exception as e:  # relancée dans le thread principal
+            self._deposer((e, 0))
+
+    def _deposer(self, element):
+        while not self.arret.is_set():
+            try:
+                self.blocs.put(element, timeout=0.1)
+                return
+            except Full:
+                pass
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if not self.bloc:
+            if self.fin:
+                return 0
+            bloc, position = self.blocs.get()
+            if isinstance(bloc, Exception):
+                self.fin = True
+                raise bloc
+            self.bloc = memoryview(bloc)
+            self.fin = not bloc
+            self.lus += len(bloc)
+            self.position = position
+        n = min(len(b), len(self.bloc))
+        b[:n] = self.bloc[:n]
+        self.bloc = self.bloc[n:]
+        return n
+
+    def close(self):
+        self.arret.set()  # le thread de lecture s'arrête au plus tard au bloc suivant
+        self.thread.join()
+        super().close()
+
+
+def lire_trames(f):
+    """Lit un flux pcap ou pcapng et renvoie (horodatage, linktype, trame) par paquet.
+
+    Lecture en continu (jamais le fichier entier en mémoire) ; les en-têtes
+    sont décodés avec struct.
+    """
+    read = f.read
+    magique = read(4)
+    
+    if magique in MAGIC_PCAP:
+        ordre, unite = MAGIC_PCAP[magique]
+        linktype = struct.unpack(ordre + "I", read(20)[16:20])[0] & 0xFFFF
+        enregistrement = struct.Struct(ordre + "IIII")
+        while True:
+            entete = read(16)
+            if len(entete) < 16:
+                return
+            sec, frac, capture, _ = enregistrement.unpack(entete)
+            trame = read(capture)
+            if len(trame) < capture:
+                return
+            yield sec + frac * unite, linktype, trame
+    
+    if magique != MAGIC_PCAPNG:
+        raise ValueError("ni pcap ni pcapng")
+    
+    ordre = "<"
+    interfaces = []  # (linktype, unité de temps, snaplen) par interface
+    entete = magique + read(4)
+    while len(entete) == 8:
+        if entete[:4] == MAGIC_PCAPNG:
+            # Section Header Block : fixe l'ordre des octets de la section
+            bom = read(4)
+            ordre = "<" if bom == b"\x4d\x3c\x2b\x1a" else ">"
+            total = struct.unpack(ordre + "I", entete[4:])[0]
+            read(total - 12)
+            interfaces = []
+        else:
+            type_bloc, total = struct.unpack(ordre + "II", entete)
+            corps = read(total - 8)
+            if len(corps) < total - 8:
+                return
+            if type_bloc == 1:  # Interface Description Block
+                linktype, _, snaplen = struct.unpack_from(ordre + "HHI", corps)
+                interfaces.append((linktype, _resolution_pcapng(corps, ordre), snaplen))
+            elif type_bloc == 6 and interfaces:  # Enhanced Packet Block
+                iface, haut, bas, capture, _ = struct.unpack_from(ordre + "IIIII", corps)
+                linktype, unite, _ = interfaces[iface]
+                yield ((haut << 32) | bas) * unite, linktype, corps[20:20 + capture]
+            elif type_bloc == 3 and interfaces:  # Simple Packet Block
+                linktype, _, snaplen = interfaces[0]
+                longueur = struct.unpack_from(ordre + "I", corps)[0]
+                yield None, linktype, corps[4:4 + min(longueur, snaplen or longueur)]
+        entete = read(8)
+
+
+def _resolution_pcapng(corps, ordre):
+    """Unité de temps d'une interface pcapng (option if_tsresol, µs par défaut)."""
+    pos = 8
+    while pos + 4 <= len(corps):
+        code, longueur = struct.unpack_from(ordre + "HH", corps, pos)
+        if code == 0:
+            break
+        if code == 9 and longueur >= 1:
+            v = corps[pos + 4]
+            return 2.0 ** -(v & 0x7f) if v & 0x80 else 10.0 ** -v
+        pos += 4 + (longueur + 3) // 4 * 4
+    return 1e-6
+
+
+def position_ip(linktype, trame):
+    """Position de l'en-tête IP dans la trame selon le type de lien, ou None."""
+    if linktype == 1:  # Ethernet (+ VLAN)
+        o = 12
+        while o + 2 <= len(trame) and trame[o:o + 2] in (b"\x81\x00", b"\x88\xa8"):
+            o += 4
+        return o + 2 if trame[o:o + 2] in (b"\x08\x00", b"\x86\xdd") else None
+    if linktype in (101, 12, 14, 228, 229):  # IP brut
+        return 0
+    if linktype in (0, 108):  # loopback BSD
+        return 4
+    if linktype == 113:  # Linux cooked v1
+        return 16
+    if linktype == 276:  # Linux cooked v2
+        return 20
+    return None
+
+
+def _alternance(mots):
+    """Alternative regex factorisée par préfixes : err, error, exception -> e(?:rr(?:or)?|xception)."""
+    arbre = {}
+    for mot in mots:
+        noeud = arbre
+        for c in mot:
+            noeud = noeud.setdefault(c, {})
+        noeud[""] = {}
+    
+    def motif(noeud):
+        branches = [re.escape(c) + motif(suite) for c, suite in sorted(noeud.items()) if c]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in noeud:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if "" in noeud else "")
+    
+    return motif(arbre)
+
+
+class DetecteurErreurs:
+    """Détecteur d'erreurs à plusieurs mots, compilé une fois.
+
+    regex / regex_b cherchent un des mots (entier, casse ignorée) dans une
+    ligne texte / octets ; filtre_b est un pré-filtre bien moins coûteux,
+    appliqué à la ligne en minuscules : sans lui, pas besoin de la regex.
+    Les alternatives sont factorisées par préfixes communs.
+    """
+
+    def __init__(self, mots=MOTS_ERREUR):
+        self.mots = sorted({m.lower() for m in mots})
+        if not self.mots:
+            raise ValueError("aucun mot d'erreur")
+        motif = rf"\b{_alternance(self.mots)}\b"
+        self.regex = re.compile(motif, re.IGNORECASE)
+        self.regex_b = re.compile(motif.encode(), re.IGNORECASE)
+        self.filtre_b = _filtre_mots(self.mots)
+
+
+def _filtre_mots(mots):
+    """Pré-filtre (octets en minuscules) : présence d'un des mots, même au milieu d'un autre."""
+    # Un mot qui en contient un autre n'ajoute rien au pré-filtre (error contient err)
+    minimaux = sorted({m for m in mots if not any(a != m and a in m for a in mots)})
+    return re.compile(_alternance(minimaux).encode())
+
+
+DETECTEUR_ERREURS = DetecteurErreurs()
+
+
+class JeuRegles:
+    """Règles d'alerte compilées une fois (REGLES_DEFAUT ou fichier --regles).
+
+    Chaque règle est un dict {"nom", "type", "seuil", ...} ; elle se
+    déclenche quand sa valeur dépasse seuil :
+    - "destination" / "source" : paquets reçus / envoyés par une adresse,
+      parmi les top plus actives (toutes si top est absent) ;
+    - "flags" : paquets dont le flag contient un des textes de flags ("[S]", "R") ;
+    - "desequilibre" : paquets envoyés par une source qui en envoie ratio
+      fois plus qu'elle n'en reçoit ;
+    - "hotes" : paquets de ou vers (sens "source", "destination" ou "tous")
+      un hôte de la liste hotes (adresses, noms ou réseaux "10.0.0.0/8") ;
+    - "motif" : lignes qui contiennent un des mots (casse ignorée) et, si
+      motif est donné, où cette regex est trouvée.
+    Les règles à compteurs lisent les compteurs de la passe unique, sans
+    travail par paquet, et valent aussi par fenêtre glissante (sauf
+    "fenetre": false). Les mots des règles à motif rejoignent le pré-filtre
+    des erreurs : une seule recherche par ligne, quel que soit le nombre de
+    règles. "message" remplace le texte de l'alerte ({nom}, {cible},
+    {valeur}, {recus}, {ratio}, {flags}, {exemple}).
+    """
+
+    MESSAGES = {
+        "destination": "🔴 {nom} : {valeur} connexions vers {cible}",
+        "source": "🔵 {nom} : {valeur} paquets depuis {cible}",
+        "flags": "🟠 {nom} : {valeur} paquets {flags}",
+        "desequilibre": "🟡 {nom} : {cible} ({valeur}→{recus}, ratio {ratio:.1f}:1)",
+        "hotes": "🟣 {nom} : {valeur} paquets de ou vers {cible}",
+        "motif": "🟣 {nom} : {valeur} lignes (ex. {exemple})",
+    }
+    CLES = {"nom", "type", "seuil", "top", "flags", "ratio", "hotes", "sens", "mots", "motif", "message", "fenetre"}
+    SENS = ("source", "destination", "tous")
+
+    def __init__(self, regles=REGLES_DEFAUT):
+        self.regles = []
+        self.flags = []      # règles "flags", dans l'ordre : leurs totaux sont des listes
+        self.hotes = {}      # hôte -> règles "hotes" qui le citent
+        self.reseaux = []    # (famille, adresse du réseau, masque, règle), en entiers
+        self.motifs = []     # (nom, mots en octets, regex en octets ou None)
+        self.mots = []
+        noms = set()
+        for regle in regles:
+            r = self._verifier(regle)
+            if r["nom"] in noms:
+                raise ValueError(f"règle {r['nom']} : nom en double")
+            noms.add(r["nom"])
+            self.regles.append(r)
+            if r["type"] == "flags":
+                r["indice"] = len(self.flags)
+                self.flags.append(r)
+            elif r["type"] == "hotes":
+                for hote in r["hotes"]:
+                    if "/" in hote:
+                        reseau = ipaddress.ip_network(hote, strict=False)
+                        famille = socket.AF_INET if reseau.version == 4 else socket.AF_INET6
+                        self.reseaux.append((famille, int(reseau.network_address), int(reseau.netmask), r))
+                    else:
+                        self.hotes.setdefault(hote, []).append(r)
+            elif r["type"] == "motif":
+                regex = re.compile(r["motif"].encode()) if r["motif"] else None
+                self.motifs.append((r["nom"], tuple(m.encode() for m in r["mots"]), regex))
+                self.mots.extend(r["mots"])
+        # Classement partagé par compteur : top le plus long demandé, ou (si une
+        # règle n'a pas de top) tout ce qui dépasse le plus petit seuil
+        self.classements = {}
+        for r in self.regles:
+            if r["type"] in ("destination", "source", "desequilibre"):
+                cle = "destination" if r["type"] == "destination" else "source"
+                top, seuil = self.classements.get(cle, (0, r["seuil"]))
+                top = None if top is None or r["top"] is None else max(top, r["top"])
+                self.classements[cle] = (top, min(seuil, r["seuil"]))
+        # Flag (indice de FLAGS_TCP) -> règles "flags" qu'il fait compter, pour les fenêtres
+        self.bits_flags = {}
+        for bit, texte in enumerate(FLAGS_TCP):
+            indices = tuple(r["indice"] for r in self.flags if any(t in texte for t in r["flags"]))
+            if indices:
+                self.bits_flags[bit] = indices
+
+    def _verifier(self, regle):
+        """Règle complétée (valeurs par défaut, mots en minuscules) ; ValueError si elle est invalide."""
+        if not isinstance(regle, dict) or not isinstance(regle.get("nom"), str) or not regle["nom"]:
+            raise ValueError(f"règle sans nom : {regle!r}")
+        nom = regle["nom"]
+        inconnues = set(regle) - self.CLES
+        if inconnues:
+            raise ValueError(f"règle {nom} : clés inconnues {', '.join(sorted(inconnues))}")
+        type_ = regle.get("type")
+        if type_ not in self.MESSAGES:
+            raise ValueError(f"règle {nom} : type {type_!r} inconnu ({', '.join(self.MESSAGES)})")
+        r = {"nom": nom, "type": type_, "seuil": regle.get("seuil", 0), "top": regle.get("top"),
+             "message": regle.get("message", self.MESSAGES[type_]), "fenetre": regle.get("fenetre", True)}
+        if not isinstance(r["seuil"], (int, float)) or isinstance(r["seuil"], bool):
+            raise ValueError(f"règle {nom} : seuil doit être un nombre")
+        if r["top"] is not None and (not isinstance(r["top"], int) or r["top"] < 1):
+            raise ValueError(f"règle {nom} : top doit être un entier positif")
+        if type_ == "desequilibre":
+            r["ratio"] = regle.get("ratio", 5)
+            if not isinstance(r["ratio"], (int, float)) or isinstance(r["ratio"], bool):
+                raise ValueError(f"règle {nom} : ratio doit être un nombre")
+        elif type_ == "flags":
+            r["flags"] = self._textes(regle, "flags")
+        elif type_ == "hotes":
+            r["hotes"] = self._textes(regle, "hotes")
+            r["sens"] = regle.get("sens", "tous")
+            if r["sens"] not in self.SENS:
+                raise ValueError(f"règle {nom} : sens doit être {', '.join(self.SENS)}")
+            for hote in r["hotes"]:
+                if "/" in hote:
+                    try:
+                        ipaddress.ip_network(hote, strict=False)
+                    except ValueError as e:
+                        raise ValueError(f"règle {nom} : {e}") from None
+        elif type_ == "motif":
+            r["mots"] = [m.lower() for m in self._textes(regle, "mots")]
+            r["motif"] = regle.get("motif")
+            try:
+                re.compile(r["motif"].encode()) if r["motif"] else None
+            except (re.error, AttributeError) as e:
+                raise ValueError(f"règle {nom} : motif invalide ({e})") from None
+        try:
+            r["message"].format(nom="", cible="", valeur=0, recus=0, ratio=0.0, flags="", exemple="")
+        except (KeyError, IndexError, ValueError, AttributeError) as e:
+            raise ValueError(f"règle {nom} : message invalide ({e!r})") from None
+        return r
+
+    @staticmethod
+    def _textes(regle, cle):
+        valeurs = regle.get(cle)
+        if not valeurs or not isinstance(valeurs, list) or not all(isinstance(v, str) and v for v in valeurs):
+            raise ValueError(f"règle {regle['nom']} : {cle} doit être une liste de textes non vide")
+        return valeurs
+
+    def totaux_flags(self, cnt_flags):
+        """Total de chaque règle "flags" sur un compteur de flags texte ("[S],")."""
+        return [sum(c for flag, c in cnt_flags.items() if any(t in flag for t in r["flags"])) for r in self.flags]
+
+    def _volumes_hotes(self, cnt_src, cnt_dst):
+        """(règle, hôte) -> paquets, pour les règles "hotes".
+
+        Une capture a bien plus d'adresses (ports éphémères) que d'hôtes :
+        les paquets sont d'abord sommés par préfixe "hôte." (rpartition en
+        C, une addition par adresse), puis seuls les préfixes sont comparés
+        aux règles. Les formes ambiguës (IPv4 sans port, nom sans point)
+        sont reprises adresse par adresse avec separer_hote_port.
+        """
+        volumes = Counter()
+        regles_hotes = {}
+        for sens, cnt in (("source", cnt_src), ("destination", cnt_dst)):
+            cnt = getattr(cnt, "compteurs", cnt)
+            par_prefixe = {}
+            get = par_prefixe.get
+            for (prefixe, _, _), c in zip(map(str.rpartition, cnt, repeat(".")), cnt.values()):
+                par_prefixe[prefixe] = get(prefixe, 0) + c
+            ambigus = {p for p in par_prefixe if not p or (p.count(".") == 2 and p.replace(".", "").isdigit())}
+            par_hote = Counter({p: c for p, c in par_prefixe.items() if p not in ambigus})
+            if ambigus:
+                for adresse, c in cnt.items():
+                    if adresse.rpartition(".")[0] in ambigus:
+                        par_hote[separer_hote_port(adresse)[0]] += c
+            for hote, c in par_hote.items():
+                regles = regles_hotes.get(hote)
+                if regles is None:
+                    regles = regles_hotes[hote] = self._regles_hote(hote)
+                for r in regles:
+                    if r["sens"] in (sens, "tous"):
+                        volumes[r["nom"], hote] += c
+        return volumes
+
+    def _regles_hote(self, hote):
+        """Règles "hotes" qui citent l'hôte directement ou par un réseau."""
+        regles = list(self.hotes.get(hote, ()))
+        if self.reseaux:
+            # inet_pton (en C) plutôt qu'ipaddress : appelé pour chaque hôte distinct
+            for famille in (socket.AF_INET, socket.AF_INET6):
+                try:
+                    ip = int.from_bytes(socket.inet_pton(famille, hote.partition("%")[0]), "big")
+                except OSError:
+                    continue
+                regles += [r for f, reseau, masque, r in self.reseaux if f == famille and ip & masque == reseau]
+                break
+        return regles
+
+    @staticmethod
+    def _classement(cnt, top, seuil):
+        """Début de cnt.most_common() : les top premiers, ou (top None) tous ceux au-dessus de seuil."""
+        if top is not None:
+            return cnt.most_common(top)
+        # Filtrer avant de trier : même ordre que most_common, sans trier toute la traîne
+        return sorted(((a, c) for a, c in getattr(cnt, "compteurs", cnt).items() if c > seuil),
+                      key=lambda x: x[1], reverse=True)
+
+    def evaluer(self, cnt_src, cnt_dst, flags, motifs=None, fenetre=False):
+        """Règles déclenchées : liste de (règle, cible, valeur, texte), dans l'ordre des règles.
+
+        flags : totaux de totaux_flags (ou des fenêtres) ; motifs : nom ->
+        {"lignes", "exemple"} des règles à motif (ignorées avec fenetre=True).
+        """
+        alertes = []
+        volumes = self._volumes_hotes(cnt_src, cnt_dst) if self.hotes or self.reseaux else {}
+        classements = {cle: self._classement(cnt_dst if cle == "destination" else cnt_src, top, seuil)
+                       for cle, (top, seuil) in self.classements.items()}
+        for r in self.regles:
+            if fenetre and not r["fenetre"]:
+                continue
+            type_, seuil = r["type"], r["seuil"]
+            if type_ in ("destination", "source"):
+                for adresse, c in classements[type_][:r["top"]]:
+                    if c > seuil:
+                        alertes.append(self._alerte(r, adresse, c))
+            elif type_ == "flags":
+                total = flags[r["indice"]]
+                if total > seuil:
+                    alertes.append(self._alerte(r, "", total))
+            elif type_ == "desequilibre":
+                for adresse, env in classements["source"][:r["top"]]:
+                    rec = cnt_dst.get(adresse, 0)
+                    ratio = env / max(rec, 1)
+                    if env > seuil and ratio > r["ratio"]:
+                        alertes.append(self._alerte(r, adresse, env, recus=rec, ratio=ratio))
+            elif type_ == "hotes":
+                trouves = sorted(((c, h) for (n, h), c in volumes.items() if n == r["nom"] and c > seuil),
+                                 reverse=True)
+                for c, hote in trouves[:r["top"]]:
+                    alertes.append(self._alerte(r, hote, c))
+            elif motifs is not None and not fenetre:
+                m = motifs.get(r["nom"])
+                if m and m["lignes"] > seuil:
+                    alertes.append(self._alerte(r, "", m["lignes"], exemple=m["exemple"]))
+        return alertes
+
+    @staticmethod
+    def _alerte(r, cible, valeur, recus=0, ratio=0.0, exemple=""):
+        texte = r["message"].format(nom=r["nom"], cible=cible, valeur=valeur, recus=recus, ratio=ratio,
+                                    flags=" ".join(r.get("flags", ())), exemple=exemple)
+        return r["nom"], cible, valeur, texte
+
+
+REGLES = JeuRegles()
+
+
+def charger_regles(chemin):
+    """Lit un fichier de règles JSON ; ValueError s'il est invalide.
+
+    {"regles": [...], "defaut": true, "fenetre": 10, "mots_erreur": [...]} :
+    avec defaut (vrai par défaut), les règles intégrées sont gardées,
+    sauf celles qu'une règle du fichier remplace par son nom. Retourne
+    la configuration, "regles" contenant la liste finale.
+    """
+    with open(chemin, encoding="utf-8") as f:
+        try:
+            config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{chemin} : JSON invalide ({e})") from None
+    if not isinstance(config, dict):
+        raise ValueError(f"{chemin} : un objet JSON est attendu")
+    inconnues = set(config) - {"regles", "defaut", "fenetre", "mots_erreur"}
+    if inconnues:
+        raise ValueError(f"{chemin} : clés inconnues {', '.join(sorted(inconnues))}")
+    regles = config.get("regles", [])
+    if not isinstance(regles, list):
+        raise ValueError(f"{chemin} : regles doit être une liste")
+    if config.get("defaut", True):
+        # Une règle du fichier qui porte le nom d'une règle intégrée prend sa place
+        par_nom = {r.get("nom"): r for r in regles if isinstance(r, dict)}
+        noms = {r["nom"] for r in REGLES_DEFAUT}
+        regles = [par_nom.get(r["nom"], r) for r in REGLES_DEFAUT] + \
+                 [r for r in regles if not isinstance(r, dict) or r.get("nom") not in noms]
+    JeuRegles(regles)
+    fenetre = config.get("fenetre")
+    if fenetre is not None and (not isinstance(fenetre, (int, float)) or fenetre <= 0):
+        raise ValueError(f"{chemin} : fenetre doit être un nombre de secondes positif")
+    mots = config.get("mots_erreur")
+    if mots is not None and (not isinstance(mots, list) or not mots or not all(isinstance(m, str) and m for m in mots)):
+        raise ValueError(f"{chemin} : mots_erreur doit être une liste de mots")
+    return {**config, "regles": regles}
+
+
+def separer_hote_port(adresse):
+    """Sépare la notation tcpdump "hôte.port" en (hôte, port).
+
+    Une IPv4 seule (4 nombres) ou un nom sans point n'a pas de port ;
+    sinon le dernier composant est le port (numéro ou nom de service).
+    """
+    hote, point, port = adresse.rpartition(".")
+    if not point or (port.isdigit() and hote.count(".") == 2 and ":" not in hote and hote.replace(".", "").isdigit()):
+        return adresse, ""
+    return hote, port
+
+
+def numero_port(port):
+    """Numéro d'un port tcpdump ("50019", "ssh", "domain"...), 0 si inconnu."""
+    if port.isdigit():
+        return int(port)
+    numero = _PORTS_NOMMES.get(port)
+    if numero is None:
+        try:
+            numero = socket.getservbyname(port)
+        except OSError:
+            numero = 0
+        _PORTS_NOMMES[port] = numero
+    return numero
+
+
+def horodatage_ligne(ligne):
+    """Secondes depuis minuit de l'horodatage en tête d'une ligne tcpdump (octets), ou None."""
+    m = HORODATAGE_B.match(ligne)
+    if not m:
+        return None
+    h, mn, sec = m.groups()
+    return int(h) * 3600 + int(mn) * 60 + float(sec)
+
+
+def longueur_ligne(ligne):
+    """Longueur utile annoncée par tcpdump ("length 108"), 0 si absente."""
+    m = LONGUEUR_B.search(ligne)
+    return int(m.group(1)) if m else 0
+
+
+def seq_ack_ligne(ligne):
+    """(seq, ack) d'une ligne tcpdump (octets) ; début de plage pour "seq 1:37", None si absent."""
+    s = SEQ_B.search(ligne)
+    a = ACK_B.search(ligne)
+    return (int(s.group(1)) if s else None), (int(a.group(1)) if a else None)
+
+
+def seq_ack_tcp(trame, o):
+    """(seq, ack) de l'en-tête TCP d'un paquet IP commençant à trame[o], ou (None, None)."""
+    t = o + ((trame[o] & 15) * 4 if trame[o] >> 4 == 4 else 40)
+    if len(trame) < t + 12:
+        return None, None
+    return SEQ_ACK.unpack_from(trame, t + 4)
+
+
+class TablePaquets:
+    """Table en colonnes des paquets analysés (option table=True).
+
+    Une entrée par paquet dans des tableaux compacts (module array) ;
+    les hôtes sont codés par un numéro (dictionnaire hotes/_ids). Les
+    agrégations utilisent NumPy s'il est installé (bincount), sinon
+    Counter, qui compte aussi en C.
+    """
+
+    COLONNES = {
+        "ts": "d", "src": "I", "dst": "I", "port_src": "H", "port_dst": "H",
+        "flags": "H", "longueur": "I",
+    }
+    SANS_FLAGS = 256  # paquet non TCP (0 est le flag [none])
+
+    def __init__(self):
+        for nom, code in self.COLONNES.items():
+            setattr(self, nom, array(code))
+        self.hotes = []
+        self._ids = {}
+
+    def __len__(self):
+        return len(self.ts)
+
+    def _id(self, hote):
+        i = self._ids.get(hote)
+        if i is None:
+            i = self._ids[hote] = len(self.hotes)
+            self.hotes.append(hote)
+        return i
+
+    def ajouter(self, ts, src, dst, flags, longueur):
+        """Ajoute un paquet (src/dst en notation tcpdump "hôte.port")."""
+        hote_src, port_src = separer_hote_port(src)
+        hote_dst, port_dst = separer_hote_port(dst)
+        self.ts.append(ts if ts is not None else float("nan"))
+        self.src.append(self._id(hote_src))
+        self.dst.append(self._id(hote_dst))
+        self.port_src.append(numero_port(port_src) if port_src else 0)
+        self.port_dst.append(numero_port(port_dst) if port_dst else 0)
+        self.flags.append(flags if flags is not None else self.SANS_FLAGS)
+        self.longueur.append(longueur)
+
+    def fusionner(self, autre):
+        """Ajoute à la suite les paquets d'une autre table (hôtes renumérotés)."""
+        correspondance = [self._id(h) for h in autre.hotes]
+        for nom in self.COLONNES:
+            if nom in ("src", "dst"):
+                getattr(self, nom).extend(correspondance[i] for i in getattr(autre, nom))
+            else:
+                getattr(self, nom).extend(getattr(autre, nom))
+        return self
+
+    def octets_memoire(self):
+        """Taille des colonnes en mémoire (hors dictionnaire des hôtes)."""
+        return sum(len(getattr(self, nom)) * getattr(self, nom).itemsize for nom in self.COLONNES)
+
+    def colonne(self, nom):
+        """La colonne en tableau NumPy (sans copie) si NumPy est là, sinon l'array."""
+        if NUMPY_OK:
+            import numpy as np
+            col = getattr(self, nom)
+            return np.frombuffer(col, dtype=col.typecode) if len(col) else np.zeros(0, dtype=col.typecode)
+        return getattr(self, nom)
+
+    def compter(self, nom, poids=None):
+        """Nombre (ou somme de la colonne poids) par valeur de la colonne nom."""
+        if NUMPY_OK:
+            import numpy as np
+            col = self.colonne(nom)
+            w = self.colonne(poids) if poids else None
+            sommes = np.bincount(col, weights=w) if len(col) else np.zeros(0)
+            return {int(v): int(sommes[v]) for v in np.flatnonzero(sommes)}
+        if poids is None:
+            return Counter(getattr(self, nom))
+        sommes = Counter()
+        for v, w in zip(getattr(self, nom), getattr(self, poids)):
+            sommes[v] += w
+        return sommes
+
+    def top(self, nom="src", n=10, poids=None):
+        """Top n des hôtes (src/dst) ou des ports, en paquets ou en octets (poids="longueur")."""
+        comptes = Counter(self.compter(nom, poids)).most_common(n)
+        if nom in ("src", "dst"):
+            return [(self.hotes[i], c) for i, c in comptes]
+        return comptes
+
+    def compte_flags(self):
+        """Nombre de paquets TCP par combinaison de flags ("[S],", "[P.],"...)."""
+        return {FLAGS_TCP[b]: c for b, c in Counter(self.compter("flags")).most_common() if b != self.SANS_FLAGS}
+
+    def ratios(self, n=10):
+        """(hôte, envoyés, reçus, ratio) des n plus gros émetteurs (règle DESEQUILIBRE)."""
+        recus = self.compter("dst")
+        return [
+            (self.hotes[i], env, recus.get(i, 0), env / max(recus.get(i, 0), 1))
+            for i, env in Counter(self.compter("src")).most_common(n)
+        ]
+
+
+def format_horodatage(t):
+    """Horodatage lisible : HH:MM:SS (secondes depuis minuit) ou date complète (epoch pcap)."""
+    if t >= 2 * 86400:
+        return datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S")
+    h, reste = divmod(int(t), 3600)
+    return f"{h:02d}:{reste // 60:02d}:{reste % 60:02d}"
+
+
+class FenetresAlertes:
+    """Règles d'alerte évaluées sur une fenêtre glissante de temps (option fenetre=secondes).
+
+    La fenêtre avance par pas de duree/NB_CASES secondes. Les compteurs de
+    chaque pas sont gardés dans un anneau (deque) et ceux de la fenêtre mis
+    à jour en ajoutant le pas qui entre et en retirant celui qui sort : la
+    mémoire ne dépend que de la fenêtre, pas de la durée de la capture.
+    Les fenêtres consécutives qui déclenchent la même règle forment un
+    épisode (début, fin, pic) ; seuls les max_episodes derniers sont gardés.
+    Les règles sont celles de regles (JeuRegles, REGLES par défaut) ; les
+    flags ne sont comptés que pour ses règles "flags".
+    """
+
+    NB_CASES = 10
+
+    def __init__(self, duree=10.0, max_episodes=1000, regles=None):
+        self.duree = float(duree)
+        self.pas = self.duree / self.NB_CASES
+        self.regles = REGLES if regles is None else regles
+        self.bits_flags = self.regles.bits_flags
+        self.anneau = deque()
+        self.fen_src = Counter()
+        self.fen_dst = Counter()
+        self.fen_flags = [0] * len(self.regles.flags)
+        self.courante = self._case_vide()
+        self.k = None
+        self.dernier = None
+        self.decalage = 0.0
+        self.ouverts = {}
+        self.episodes = deque(maxlen=max_episodes)
+        self.nb_episodes = 0
+
+    def _case_vide(self):
+        return [Counter(), Counter(), [0] * len(self.regles.flags)]
+
+    def ajouter(self, ts, src, dst, flags, longueur):
+        if ts is None:
+            return
+        # Horodatages tcpdump sans date : passage de minuit
+        if self.dernier is not None and ts + self.decalage < self.dernier - 43200:
+            self.decalage += 86400
+        t = ts + self.decalage
+        self.dernier = t
+        k = int(t // self.pas)
+        if self.k is None:
+            self.k = k
+        elif k > self.k:
+            self._avancer(k)
+        # Un paquet en retard compte dans le pas courant
+        case = self.courante
+        case[0][src] += 1
+        case[1][dst] += 1
+        for i in self.bits_flags.get(flags, ()):
+            case[2][i] += 1
+
+    def _avancer(self, k):
+        """Ferme les pas jusqu'à k (exclu) ; un long silence vide la fenêtre."""
+        if k - self.k > self.NB_CASES:
+            self._fermer()
+            self._fermer_episodes(self.ouverts)
+            self.ouverts = {}
+            self.anneau.clear()
+            self.fen_src.clear()
+            self.fen_dst.clear()
+            self.fen_flags = [0] * len(self.fen_flags)
+            self.k = k
+            return
+        while self.k < k:
+            self._fermer()
+
+    def _fermer(self):
+        """Fait entrer le pas courant dans la fenêtre et évalue les règles."""
+        case = self.courante
+        if len(self.anneau) == self.NB_CASES:
+            self._retirer(self.anneau.popleft())
+        self.anneau.append(case)
+        self.fen_src.update(case[0])
+        self.fen_dst.update(case[1])
+        self.fen_flags = [a + b for a, b in zip(self.fen_flags, case[2])]
+        self.k += 1
+        self.courante = self._case_vide()
+        
+        actives = self._depassements(self.fen_src, self.fen_dst, self.fen_flags)
+        fin = self.k * self.pas
+        for cle, (valeur, texte) in actives.items():
+            ep = self.ouverts.get(cle)
+            if ep is None:
+                self.ouverts[cle] = {"debut": fin - self.duree, "fin": fin, "pic": valeur, "texte": texte}
+            else:
+                ep["fin"] = fin
+                if valeur > ep["pic"]:
+                    ep["pic"], ep["texte"] = valeur, texte
+        finis = {cle: ep for cle, ep in self.ouverts.items() if cle not in actives}
+        for cle in finis:
+            del self.ouverts[cle]
+        self._fermer_episodes(finis)
+
+    def _retirer(self, case):
+        for fen, cnt in ((self.fen_src, case[0]), (self.fen_dst, case[1])):
+            for cle, c in cnt.items():
+                reste = fen[cle] - c
+                if reste:
+                    fen[cle] = reste
+                else:
+                    del fen[cle]
+        self.fen_flags = [a - b for a, b in zip(self.fen_flags, case[2])]
+
+    def _fermer_episodes(self, episodes):
+        for ep in episodes.values():
+            self.episodes.append(ep)
+            self.nb_episodes += 1
+
+    def _depassements(self, src, dst, flags):
+        return {(regle, cible): (valeur, texte)
+                for regle, cible, valeur, texte in self.regles.evaluer(src, dst, flags, fenetre=True)}
+
+    def alertes(self):
+        """Épisodes d'alerte en texte, y compris le pas en cours (sans modifier l'état)."""
+        src = self.fen_src + self.courante[0]
+        dst = self.fen_dst + self.courante[1]
+        if len(self.anneau) == self.NB_CASES:
+            src.subtract(self.anneau[0][0])
+            dst.subtract(self.anneau[0][1])
+            flags = [a - b + c for a, b, c in zip(self.fen_flags, self.anneau[0][2], self.courante[2])]
+        else:
+            flags = [a + c for a, c in zip(self.fen_flags, self.courante[2])]
+        actives = self._depassements(+src, +dst, flags)
+        fin = (self.k + 1) * self.pas if self.k is not None else 0
+        
+        episodes = list(self.episodes)
+        for cle, ep in self.ouverts.items():
+            ep = dict(ep)
+            if cle in actives:
+                ep["fin"] = fin
+                if actives[cle][0] > ep["pic"]:
+                    ep["pic"], ep["texte"] = actives[cle]
+            episodes.append(ep)
+        for cle, (valeur, texte) in actives.items():
+            if cle not in self.ouverts:
+                episodes.append({"debut": fin - self.duree, "fin": fin, "pic": valeur, "texte": texte})
+        
+        return [
+            f"{ep['texte']} (entre {format_horodatage(max(ep['debut'], 0))} et {format_horodatage(ep['fin'])})"
+            for ep in episodes
+        ]
+
+
+class Flux:
+    """Une connexion TCP de la table de SuiviFlux."""
+
+    __slots__ = ("client", "serveur", "etat", "debut", "dernier", "paquets", "octets", "isn", "isn_serveur", "fins")
+
+    def __init__(self, client, serveur, etat, ts):
+        self.client = client
+        self.serveur = serveur
+        self.etat = etat
+        self.debut = self.dernier = ts
+        self.paquets = 0
+        self.octets = 0
+        self.isn = self.isn_serveur = None
+        self.fins = 0
+
+
+class SuiviFlux:
+    """Table des connexions TCP, suivies par leur poignée de main (option flux=secondes).
+    
+    Un flux est identifié par ses deux extrémités "adresse.port" (5-uplet :
+    seuls les paquets TCP, ceux qui ont des flags, sont suivis). Il passe
+    par SYN -> SYN-ACK (ack = seq du SYN + 1) -> ACK (ack 1 en numéros
+    relatifs de tcpdump, sinon seq du SYN-ACK + 1), puis FIN des deux
+    côtés ou RST. Les flux inactifs depuis expiration secondes, puis les
+    plus anciens au-delà de max_flux, sortent de la table et ne restent
+    que dans les agrégats : nombre par état final, histogramme des
+    durées, top des flux par octets. La mémoire reste ainsi bornée.
+    """
+
+    SANS_POIGNEE, SYN, SYN_ACK, ETABLI, FERMETURE, FERME, RESET = range(7)
+    # État final d'un flux retiré de la table (un flux établi qui expire est "expire")
+    FINAUX = ("sans_poignee", "demi_ouvert", "demi_ouvert", "expire", "ferme", "ferme", "reinitialise")
+    BORNES_DUREES = ((0.001, "< 1 ms"), (0.01, "< 10 ms"), (0.1, "< 100 ms"), (1, "< 1 s"),
+                     (10, "< 10 s"), (60, "< 1 min"), (600, "< 10 min"), (math.inf, "≥ 10 min"))
+    TOP = 10
+
+    def __init__(self, expiration=EXPIRATION_FLUX, max_flux=MAX_FLUX):
+        self.expiration = float(expiration)
+        self.max_flux = max_flux
+        self.table = OrderedDict()  # clé -> Flux, du moins au plus récemment actif
+        self.dernier = None
+        self.decalage = 0.0
+        self.termines = Counter()
+        self.durees = Counter()
+        self.somme_durees = 0.0
+        self.duree_max = 0.0
+        self.octets = 0
+        self.retires = 0
+        self.demi_ouverts_dst = Counter()
+        self.top = []  # tas (octets, n, description) des plus gros flux retirés
+        self.n = 0
+
+    def ajouter(self, ts, src, dst, flags, longueur, seq=None, ack=None):
+        if ts is not None:
+            # Horodatages tcpdump sans date : passage de minuit
+            if self.dernier is not None and ts + self.decalage < self.dernier - 43200:
+                self.decalage += 86400
+            ts += self.decalage
+            self.dernier = ts
+        syn, ack_f, fin, rst = flags & 0x02, flags & 0x10, flags & 0x01, flags & 0x04
+        cle = (src, dst) if src < dst else (dst, src)
+        table = self.table
+        f = table.pop(cle, None)
+        if f is not None and syn and not ack_f and f.etat >= self.FERME:
+            # Port réutilisé : nouvelle connexion
+            self._retirer(f)
+            f = None
+        if f is None:
+            if syn and not ack_f:
+                f = Flux(src, dst, self.SYN, ts)
+                f.isn = seq
+            else:
+                f = Flux(src, dst, self.SANS_POIGNEE, ts)
+        else:
+            du_client = src == f.client
+            if syn and ack_f:
+                if f.etat == self.SYN and not du_client and (f.isn is None or ack is None or ack == f.isn + 1):
+                    f.etat = self.SYN_ACK
+                    f.isn_serveur = seq
+            elif ack_f and f.etat == self.SYN_ACK and du_client:
+                if ack is None or f.isn_serveur is None or ack in (1, f.isn_serveur + 1):
+                    f.etat = self.ETABLI
+            if rst:
+                f.etat = self.RESET
+            elif fin and f.etat in (self.SANS_POIGNEE, self.ETABLI, self.FERMETURE):
+                f.fins |= 1 if du_client else 2
+                f.etat = self.FERME if f.fins == 3 else self.FERMETURE
+        f.paquets += 1
+        f.octets += longueur
+        if ts is not None:
+            f.dernier = ts
+        table[cle] = f
+        
+        # Retrait des flux inactifs (les moins récemment actifs sont en tête de la table)
+        if ts is not None:
+            limite = ts - self.expiration
+            while True:
+                dernier = next(iter(table.values())).dernier
+                if dernier is None or dernier >= limite:
+                    break
+                self._retirer(table.popitem(last=False)[1])
+        if len(table) > self.max_flux:
+            self._retirer(table.popitem(last=False)[1])
+
+    def _retirer(self, f):
+        """Verse un flux dans les agrégats."""
+        self.retires += 1
+        self._compter(f, self.FINAUX[f.etat], self.termines, self.durees, self.demi_ouverts_dst)
+        duree = self._duree(f)
+        if duree is not None:
+            self.somme_durees += duree
+            self.duree_max = max(self.duree_max, duree)
+        self.octets += f.octets
+        self.n += 1
+        entree = (f.octets, self.n, self._decrire(f))
+        if len(self.top) < self.TOP:
+            heapq.heappush(self.top, entree)
+        elif entree > self.top[0]:
+            heapq.heapreplace(self.top, entree)
+
+    @staticmethod
+    def _duree(f):
+        return f.dernier - f.debut if f.debut is not None and f.dernier is not None else None
+
+    def _compter(self, f, etat, etats, durees, demi_ouverts):
+        etats[etat] += 1
+        if etat == "demi_ouvert":
+            demi_ouverts[f.serveur] += 1
+        duree = self._duree(f)
+        if duree is not None:
+            durees[next(nom for borne, nom in self.BORNES_DUREES if duree < borne)] += 1
+
+    def _decrire(self, f, actif=False):
+        duree = self._duree(f)
+        etat = "etabli" if actif and f.etat == self.ETABLI else self.FINAUX[f.etat]
+        return (f.client, f.serveur, f.octets, f.paquets, round(duree, 6) if duree is not None else None, etat)
+
+    def fusionner(self, autre):
+        """Ajoute le suivi d'une autre capture ; ses flux encore ouverts rejoignent la table."""
+        self.termines.update(autre.termines)
+        self.durees.update(autre.durees)
+        self.somme_durees += autre.somme_durees
+        self.duree_max = max(self.duree_max, autre.duree_max)
+        self.octets += autre.octets
+        self.retires += autre.retires
+        self.demi_ouverts_dst.update(autre.demi_ouverts_dst)
+        for entree in autre.top:
+            self.n += 1
+            heapq.heappush(self.top, (entree[0], self.n, entree[2]))
+        self.top = heapq.nlargest(self.TOP, self.top)
+        heapq.heapify(self.top)
+        for cle, f in autre.table.items():
+            if cle in self.table:
+                self._retirer(f)
+            else:
+                self.table[cle] = f
+        while len(self.table) > self.max_flux:
+            self._retirer(self.table.popitem(last=False)[1])
+
+    def resume(self):
+        """Agrégats des flux retirés et des flux encore ouverts (sans les modifier)."""
+        etats = Counter(self.termines)
+        durees = Counter(self.durees)
+        demi_ouverts = Counter(self.demi_ouverts_dst)
+        somme, duree_max, octets = self.somme_durees, self.duree_max, self.octets
+        top = list(self.top)
+        n = self.n
+        for f in self.table.values():
+            etat = "etabli" if f.etat == self.ETABLI else self.FINAUX[f.etat]
+            self._compter(f, etat, etats, durees, demi_ouverts)
+            duree = self._duree(f)
+            if duree is not None:
+                somme += duree
+                duree_max = max(duree_max, duree)
+            octets += f.octets
+            n += 1
+            top.append((f.octets, n, self._decrire(f, actif=True)))
+        total = sum(etats.values())
+        avec_duree = sum(durees.values())
+        return {
+            "expiration": self.expiration,
+            "total": total,
+            "actifs": len(self.table),
+            "retires": self.retires,
+            "etats": dict(etats),
+            "demi_ouverts": etats.get("demi_ouvert", 0),
+            "demi_ouverts_destinations": demi_ouverts.most_common(10),
+            "duree_moyenne": round(somme / avec_duree, 6) if avec_duree else None,
+            "duree_max": round(duree_max, 6),
+            "durees": {nom: durees[nom] for _, nom in self.BORNES_DUREES if durees[nom]},
+            "octets": octets,
+            "top_octets": [d for _, _, d in heapq.nlargest(self.TOP, top)],
+        }
+
+
+class ResumeFrequents:
+    """Éléments les plus fréquents en mémoire bornée (résumé de Misra-Gries).
+
+    Garde au plus capacite compteurs. Le compte estimé d'un élément est
+    au-dessous du vrai d'au plus self.erreur, qui ne dépasse jamais
+    total / (capacite + 1) ; tout élément plus fréquent que cela est
+    présent. C'est la forme fusionnable de Space-Saving : deux résumés
+    (plages parallèles, cache) se combinent avec les mêmes garanties.
+    """
+
+    def __init__(self, capacite):
+        self.capacite = capacite
+        self.compteurs = Counter()
+        self.total = 0
+        self.erreur = 0
+
+    def update(self, lot):
+        """Ajoute un lot de comptes (Counter ou dict élément -> nombre)."""
+        self.compteurs.update(lot)
+        self.total += sum(lot.values())
+        self._reduire()
+
+    def _reduire(self):
+        if len(self.compteurs) > self.capacite:
+            seuil = heapq.nlargest(self.capacite + 1, self.compteurs.values())[-1]
+            self.erreur += seuil
+            self.compteurs = Counter({e: c - seuil for e, c in self.compteurs.items() if c > seuil})
+
+    def fusionner(self, autre):
+        self.compteurs.update(autre.compteurs)
+        self.total += autre.total
+        self.erreur += autre.erreur
+        self._reduire()
+
+    def most_common(self, n=None):
+        return self.compteurs.most_common(n)
+
+    def get(self, element, defaut=0):
+        return self.compteurs.get(element, defaut)
+
+
+class HyperLogLog:
+    """Nombre approché d'éléments distincts en 2**precision octets (HyperLogLog).
+
+    Erreur type 1,04 / sqrt(2**precision) : 0,8 % pour la précision 14
+    (16 Kio), quel que soit le nombre d'éléments. Hash blake2b sur 64 bits,
+    identique d'un processus à l'autre, donc fusionnable.
+    """
+
+    def __init__(self, precision=PRECISION_HLL):
+        self.precision = precision
+        self.registres = bytearray(1 << precision)
+
+    def ajouter(self, elements):
+        """Ajoute des éléments (chaînes) ; les répétitions ne changent rien."""
+        registres = self.registres
+        p = self.precision
+        bits = 64 - p
+        masque = (1 << bits) - 1
+        blake2b = hashlib.blake2b
+        for e in elements:
+            h = int.from_bytes(blake2b(e.encode(), digest_size=8).digest(), "big")
+            i = h >> bits
+            rang = bits - (h & masque).bit_length() + 1
+            if rang > registres[i]:
+                registres[i] = rang
+
+    def fusionner(self, autre):
+        self.registres = bytearray(map(max, self.registres, autre.registres))
+
+    def erreur_type(self):
+        return 1.04 / len(self.registres) ** 0.5
+
+    def __len__(self):
+        m = len(self.registres)
+        estimation = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -r for r in self.registres)
+        vides = self.registres.count(0)
+        if vides and estimation <= 2.5 * m:
+            estimation = m * math.log(m / vides)  # petites cardinalités : comptage linéaire
+        return round(estimation)
+
+
+class IndexHotes:
+    """Index secondaire par hôte, par port et par conversation (option hotes=True).
+
+    Construit à la fin de l'analyse à partir des compteurs complets
+    "adresse.port" et des paires (source, destination) comptées à la
+    lecture, donc sans relire le fichier. Chaque adresse distincte n'est
+    découpée qu'une fois ; les noms d'hôte sont internés.
+    """
+
+    def __init__(self, cnt_src, cnt_dst, paires):
+        self._decoupes = {}
+        self.hotes_src = Counter()
+        self.hotes_dst = Counter()
+        self.ports_src = Counter()
+        self.ports_dst = Counter()
+        self.conversations = Counter()
+        # Copies des compteurs complets : le suivi continue de remplir les originaux
+        self.adresses_src = Counter(cnt_src)
+        self.adresses_dst = Counter(cnt_dst)
+        
+        for cnt, hotes, ports in ((cnt_src, self.hotes_src, self.ports_src),
+                                  (cnt_dst, self.hotes_dst, self.ports_dst)):
+            for adresse, c in cnt.items():
+                hote, port = self.decouper(adresse)
+                hotes[hote] += c
+                if port:
+                    ports[port] += c
+        for (src, dst), c in paires.items():
+            self.conversations[self.decouper(src)[0], self.decouper(dst)[0]] += c
+
+    def decouper(self, adresse):
+        """(hôte interné, port) ; le port est un numéro si le service est connu."""
+        d = self._decoupes.get(adresse)
+        if d is None:
+            hote, port = separer_hote_port(adresse)
+            d = self._decoupes[adresse] = (sys.intern(hote), (numero_port(port) or port) if port else None)
+        return d
+
+    def top(self, vue, n=10):
+        """Top n d'une vue : adresses_src, adresses_dst, hotes_src, hotes_dst, ports_src,
+        ports_dst ou conversations (n=None : tout, trié)."""
+        return getattr(self, vue).most_common(n)
+
+
+def vue_par_hote(s):
+    """Les stats s avec sources et destinations regroupées par hôte (tous ports confondus)."""
+    index = s.get("index")
+    if index is None:
+        return s
+    return {
+        **s,
+        "sources": index.top("hotes_src"),
+        "destinations": index.top("hotes_dst"),
+        "sources_distinctes": len(index.hotes_src),
+        "destinations_distinctes": len(index.hotes_dst),
+        "par_hote": True,
+    }
+
+
+def classement_complet(s, cle):
+    """Toutes les lignes (adresse, nombre) de s["sources"] ou s["destinations"], triées.
+
+    Sans index (option hotes), seul le top 10 des stats est disponible.
+    """
+    index = s.get("index")
+    if index is None:
+        return s[cle]
+    vue = "hotes_" if s.get("par_hote") else "adresses_"
+    return index.top(vue + ("src" if cle == "sources" else "dst"), None)
+
+
+class ExportPaquets:
+    """Export de tous les paquets analysés, écrit au fil de la lecture (option export=chemin).
+
+    Colonnes : ts, src, port_src, dst, port_dst, flags (vide hors TCP), longueur. Les
+    lignes sont mises en lots de TAILLE_LOT_EXPORT et chaque lot est écrit
+    dès qu'il est plein : en Parquet compressé (un groupe de lignes par lot,
+    si pyarrow est installé) pour un chemin en .parquet, sinon en CSV gzip.
+    """
+
+    COLONNES = ("ts", "src", "port_src", "dst", "port_dst", "flags", "longueur")
+
+    def __init__(self, chemin):
+        self.chemin = str(chemin)
+        self.format = "parquet" if self.chemin.endswith(".parquet") else "csv.gz"
+        self.paquets = 0
+        self.lot = []
+        if self.format == "parquet":
+            if not PYARROW_OK:
+                raise ValueError("pyarrow n'est pas installé : exporter en .csv.gz (pip install pyarrow)")
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            self._schema = pa.schema([
+                ("ts", pa.float64()), ("src", pa.string()), ("port_src", pa.string()),
+                ("dst", pa.string()), ("port_dst", pa.string()), ("flags", pa.string()),
+                ("longueur", pa.uint32()),
+            ])
+            self._ecrivain = pq.ParquetWriter(self.chemin, self._schema, compression="zstd")
+        else:
+            import csv
+            import gzip
+            
+            self._fichier = gzip.open(self.chemin, "wt", encoding="utf-8", newline="", compresslevel=6)
+            self._ecrivain = csv.writer(self._fichier)
+            self._ecrivain.writerow(self.COLONNES)
+
+    def ajouter(self, ts, src, dst, flags, longueur):
+        hote_src, port_src = separer_hote_port(src)
+        hote_dst, port_dst = separer_hote_port(dst)
+        texte_flags = FLAGS_TCP[flags].rstrip(",") if flags is not None else None
+        self.lot.append((ts, hote_src, port_src, hote_dst, port_dst, texte_flags, longueur))
+        if len(self.lot) >= TAILLE_LOT_EXPORT:
+            self._vider()
+
+    def _vider(self):
+        if not self.lot:
+            return
+        if self.format == "parquet":
+            import pyarrow as pa
+            
+            colonnes = list(zip(*self.lot))
+            self._ecrivain.write_table(pa.Table.from_arrays(
+                [pa.array(c, type=f.type) for c, f in zip(colonnes, self._schema)], schema=self._schema
+            ))
+        else:
+            self._ecrivain.writerows(self.lot)
+        self.paquets += len(self.lot)
+        self.lot = []
+
+    def fermer(self):
+        """Écrit le dernier lot et ferme le fichier."""
+        self._vider()
+        if self.format == "parquet":
+            self._ecrivain.close()
+        else:
+            self._fichier.close()
+
+
+class EtatAnalyse:
+    """Compteurs de l'analyse, mis à jour au fil de la lecture (une seule passe).
+
+    Avec hexa=True, les blocs hexa (tcpdump -x/-X) sont aussi décodés :
+    adresses IP exactes, protocoles et volumes en octets.
+    Avec table=True, chaque paquet est aussi rangé dans une TablePaquets
+    (stats["table"]) pour des requêtes ultérieures sans relire le fichier.
+    Avec fenetre=secondes, les règles d'alerte sont aussi évaluées sur une
+    fenêtre glissante de cette durée (stats["alertes_fenetres"]).
+    Avec esquisse=capacite, sources et destinations tiennent en mémoire
+    bornée : cnt_src / cnt_dst ne servent plus que de lot, versé après
+    chaque bloc dans un ResumeFrequents (top N) et un HyperLogLog (nombre
+    de distincts). Les comptes deviennent des estimations à erreur bornée.
+    Avec hotes=True, les paires (source, destination) sont aussi comptées
+    et un IndexHotes (stats["index"]) regroupe par hôte, port et conversation.
+    Avec export=chemin, tous les paquets sont écrits au fil de la lecture
+    (ExportPaquets) ; fermer() termine le fichier.
+    Avec flux=secondes, les connexions TCP sont suivies (SuiviFlux, avec
+    seq et ack) et retirées après ce délai d'inactivité (stats["flux"]).
+    Les erreurs sont cherchées avec les mots motifs (MOTS_ERREUR par
+    défaut) ; err_types les compte toutes, mais seules max_erreurs sont
+    gardées en détail : les premières, ou avec echantillon=True un
+    échantillon uniforme (réservoir) de toutes les erreurs du fichier, ou
+    avec recentes=True (mode suivi) les plus récentes.
+    Avec regles (liste de règles, voir JeuRegles), les alertes suivent ces
+    règles au lieu de REGLES_DEFAUT ; les lignes des règles à motif sont
+    comptées pendant la lecture (stats["regles_motifs"]).
+    Les objets de self.suivis reçoivent chaque paquet par
+    ajouter(ts, src, dst, flags, longueur), flags valant None hors TCP.
+    """
+
+    def __init__(self, hexa=False, table=False, fenetre=None, esquisse=None, hotes=False, export=None,
+                 motifs=None, max_erreurs=MAX_ERREURS, echantillon=False, flux=None, regles=None, recentes=False):
+        self.lignes = 0
+        self.cnt_src = Counter()
+        self.cnt_dst = Counter()
+        self.cnt_flags = Counter()
+        self.err_types = Counter()
+        # Occurrences et entrées retirées par elaguer : les totaux restent exacts
+        self.elagues = Counter()
+        self.detecteur = DetecteurErreurs(motifs) if motifs else DETECTEUR_ERREURS
+        self.max_erreurs = sys.maxsize if max_erreurs is None else max_erreurs
+        # Mode suivi : les plus anciennes erreurs laissent la place aux nouvelles
+        self.recentes = recentes
+        self.erreurs = deque(maxlen=self.max_erreurs) if recentes else []
+        self.echantillon = echantillon
+        if echantillon:
+            import random
+            self.hasard = random.Random(0)
+        
+        self.regles = JeuRegles(regles) if regles else REGLES
+        # Les mots des règles à motif partagent le pré-filtre des erreurs
+        self.filtre_b = _filtre_mots(self.detecteur.mots + self.regles.mots) if self.regles.mots \
+            else self.detecteur.filtre_b
+        self.lignes_regles = Counter()
+        self.exemples_regles = {}
+        
+        self.hexa = hexa
+        self.paquets_hexa = 0
+        self.octets_ip = 0
+        self.octets_utiles = 0
+        self.ip_src = Counter()
+        self.ip_dst = Counter()
+        self.vol_src = Counter()
+        self.vol_dst = Counter()
+        self.protocoles = Counter()
+        
+        self.table = TablePaquets() if table else None
+        self.fenetres = FenetresAlertes(fenetre, regles=self.regles) if fenetre else None
+        self.export = ExportPaquets(export) if export else None
+        self.suivis = [s for s in (self.table, self.fenetres, self.export) if s is not None]
+        self.flux = SuiviFlux(flux) if flux else None
+        
+        self.paires = Counter() if hotes else None
+        
+        self.esquisse = esquisse
+        if esquisse:
+            self.top_src = ResumeFrequents(esquisse)
+            self.top_dst = ResumeFrequents(esquisse)
+            self.top_paires = ResumeFrequents(esquisse)
+            self.hll_src = HyperLogLog()
+            self.hll_dst = HyperLogLog()
+
+    def ajouter_lignes(self, lignes):
+        """Met à jour les compteurs avec un itérable de lignes brutes."""
+        cnt_src = self.cnt_src
+        cnt_dst = self.cnt_dst
+        cnt_flags = self.cnt_flags
+        err_types = self.err_types
+        erreurs = self.erreurs
+        err_search = self.detecteur.regex.search
+        max_erreurs = sys.maxsize if self.recentes else self.max_erreurs
+        suivis = self.suivis or self.flux is not None
+        paires = self.paires
+        motifs = self.regles.motifs
+        n = self.lignes
+        
+        for ligne in lignes:
+            ligne = ligne.strip()
+            if not ligne or ligne.startswith("0x"):
+                continue
+            n += 1
+            
+            parts = ligne.split()
+            src = flag = None
+            if ">" in parts:
+                idx = parts.index(">")
+                if 0 < idx < len(parts) - 1:
+                    src = parts[idx - 1]
+                    dst = parts[idx + 1].rstrip(" :,")
+                    cnt_src[src] += 1
+                    cnt_dst[dst] += 1
+                    if paires is not None:
+                        paires[src, dst] += 1
+            if "Flags" in parts:
+                i = parts.index("Flags")
+                if i < len(parts) - 1:
+                    flag = parts[i + 1]
+                    cnt_flags[flag] += 1
+            if suivis and src is not None:
+                self._suivre(ligne.encode(), src, dst, flag)
+            
+            m = err_search(ligne)
+            if m:
+                t = m.group(0).upper()
+                err_types[t] += 1
+                if len(erreurs) < max_erreurs:
+                    erreurs.append({"ligne": n, "type": t, "msg": ligne[:150]})
+                elif self.echantillon:
+                    self._echantillonner({"ligne": n, "type": t, "msg": ligne[:150]})
+            if motifs:
+                brute = ligne.encode()
+                if self.filtre_b.search(brute.lower()):
+                    self._appliquer_motifs(brute)
+        
+        self.lignes = n
+        if self.esquisse:
+            self._vider_lots()
+
+    def ajouter_tampon(self, tampon, debut=0, fin=None):
+        """Met à jour les compteurs à partir d'octets bruts (mmap, bytes...).
+
+        Même résultat que ajouter_lignes, mais sans split() ni liste de mots :
+        les délimiteurs sont cherchés dans les octets et seuls les champs
+        conservés (source, destination, flag, message d'erreur) sont décodés.
+        """
+        if fin is None:
+            fin = len(tampon)
+        cnt_src = self.cnt_src
+        cnt_dst = self.cnt_dst
+        cnt_flags = self.cnt_flags
+        err_types = self.err_types
+        erreurs = self.erreurs
+        err_search = self.detecteur.regex_b.search
+        mots_erreur = self.filtre_b.search
+        max_erreurs = sys.maxsize if self.recentes else self.max_erreurs
+        suivis = self.suivis or self.flux is not None
+        paires = self.paires
+        motifs = self.regles.motifs
+        n = self.lignes
+        
+        if CR_SEUL_B.search(tampon, debut, fin):
+            premiere = PREMIERE_LIGNE_CR_B.match(tampon, debut, fin)
+            suivantes = LIGNE_UTILE_CR_B.finditer(tampon, debut, fin)
+        else:
+            premiere = PREMIERE_LIGNE_B.match(tampon, debut, fin)
+            suivantes = LIGNE_UTILE_B.finditer(tampon, debut, fin)
+        for m in chain((premiere,), suivantes) if premiere else suivantes:
+            ligne = m.group(1)
+            if ligne is None or b"  " in ligne:
+                # Ligne inhabituelle (non ASCII, tabulations...) : chemin texte
+                self.lignes = n
+                brut = m.group(0).decode("utf-8", errors="ignore")
+                self.ajouter_lignes(brut.replace("\r", "\n").split("\n"))
+                n = self.lignes
+                continue
+            n += 1
+            ligne = ligne.rstrip(b" ")
+            
+            # Ici les mots sont séparés par une seule espace : split() == split(" ")
+            src = flag = None
+            if not (ligne[0] == 62 and (len(ligne) == 1 or ligne[1] == 32)):
+                p = ligne.find(b" > ")
+                if p >= 0:
+                    q = p + 3
+                    r = ligne.find(b" ", q)
+                    src = ligne[ligne.rfind(b" ", 0, p) + 1:p].decode()
+                    dst = ligne[q:r if r >= 0 else None].rstrip(b" :,").decode()
+                    cnt_src[src] += 1
+                    cnt_dst[dst] += 1
+                    if paires is not None:
+                        paires[src, dst] += 1
+            
+            if ligne.startswith(b"Flags "):
+                q = 6
+            else:
+                q = ligne.find(b" Flags ")
+                if q >= 0:
+                    q += 7
+            if q >= 0:
+                r = ligne.find(b" ", q)
+                flag = ligne[q:r if r >= 0 else None].decode()
+                cnt_flags[flag] += 1
+            
+            if suivis and src is not None:
+                self._suivre(ligne, src, dst, flag)
+            
+            if mots_erreur(ligne.lower()):
+                e = err_search(ligne)
+                if e:
+                    t = e.group(0).upper().decode()
+                    err_types[t] += 1
+                    if len(erreurs) < max_erreurs:
+                        erreurs.append({"ligne": n, "type": t, "msg": ligne[:150].decode()})
+                    elif self.echantillon:
+                        self._echantillonner({"ligne": n, "type": t, "msg": ligne[:150].decode()})
+                if motifs:
+                    self._appliquer_motifs(ligne)
+        
+        self.lignes = n
+        if self.esquisse:
+            self._vider_lots()
+
+    def _appliquer_motifs(self, ligne):
+        """Ligne (octets) passée par le pré-filtre : compte les règles à motif qu'elle vérifie."""
+        minuscules = ligne.lower()
+        for nom, mots, regex in self.regles.motifs:
+            if any(m in minuscules for m in mots) and (regex is None or regex.search(ligne)):
+                self.lignes_regles[nom] += 1
+                if nom not in self.exemples_regles:
+                    self.exemples_regles[nom] = ligne[:150].decode("utf-8", errors="replace")
+
+    def _echantillonner(self, erreur):
+        """Réservoir plein : l'erreur remplace une erreur gardée avec probabilité max / vues."""
+        j = self.hasard.randrange(sum(self.err_types.values()))
+        if j < self.max_erreurs:
+            self.erreurs[j] = erreur
+
+    def _vider_lots(self):
+        """Mode esquisse : verse le lot de cnt_src / cnt_dst dans les résumés bornés."""
+        for lot, top, distincts in ((self.cnt_src, self.top_src, self.hll_src),
+                                    (self.cnt_dst, self.top_dst, self.hll_dst)):
+            if lot:
+                top.update(lot)
+                distincts.ajouter(lot)
+                lot.clear()
+        if self.paires:
+            self.top_paires.update(self.paires)
+            self.paires.clear()
+
+    def _suivre(self, ligne, src, dst, flag):
+        """Transmet un paquet texte (ligne en octets) aux suivis et au suivi des flux TCP.
+
+        flags vaut None hors TCP (pas de champ Flags).
+        """
+        ts = horodatage_ligne(ligne)
+        flags = BITS_FLAGS.get(flag, 0) if flag is not None else None
+        longueur = longueur_ligne(ligne)
+        for suivi in self.suivis:
+            suivi.ajouter(ts, src, dst, flags, longueur)
+        if self.flux is not None and flag is not None:
+            self.flux.ajouter(ts, src, dst, flags, longueur, *seq_ack_ligne(ligne))
+
+    def ajouter_trames(self, trames):
+        """Met à jour les compteurs à partir de trames pcap (horodatage, linktype, trame).
+
+        Chaque paquet compte comme une ligne ; sources et destinations sont
+        écrites comme "tcpdump -n" (ip.port) et les flags comme "[S.],".
+        """
+        cnt_src = self.cnt_src
+        cnt_dst = self.cnt_dst
+        cnt_flags = self.cnt_flags
+        noms = {}
+        enregistrements = bytearray()
+        pack = PAQUET_HEXA.pack
+        n = 0
+        
+        for ts, linktype, trame in trames:
+            n += 1
+            o = position_ip(linktype, trame)
+            paquet = decoder_ip(trame, o) if o is not None else None
+            if paquet is None:
+                continue
+            src, dst, port_src, port_dst, proto, _, flags, _, utile = paquet
+            for ip in (src, dst):
+                if ip not in noms:
+                    noms[ip] = socket.inet_ntop(socket.AF_INET if len(ip) == 4 else socket.AF_INET6, ip)
+            if proto in (6, 17):
+                texte_src = f"{noms[src]}.{port_src}"
+                texte_dst = f"{noms[dst]}.{port_dst}"
+            else:
+                texte_src = noms[src]
+                texte_dst = noms[dst]
+            cnt_src[texte_src] += 1
+            cnt_dst[texte_dst] += 1
+            if self.paires is not None:
+                self.paires[texte_src, texte_dst] += 1
+            if proto == 6:
+                cnt_flags[FLAGS_TCP[flags]] += 1
+            for suivi in self.suivis:
+                suivi.ajouter(ts, texte_src, texte_dst, flags if proto == 6 else None, utile)
+            if proto == 6 and self.flux is not None:
+                self.flux.ajouter(ts, texte_src, texte_dst, flags, utile, *seq_ack_tcp(trame, o))
+            if self.hexa and len(src) == 4:
+                enregistrements.extend(pack(*paquet))
+        
+        self.lignes += n
+        if self.esquisse:
+            self._vider_lots()
+        if enregistrements:
+            self.ajouter_paquets(enregistrements)
+
+    def ajouter_hexa(self, tampon, debut=0, fin=None):
+        """Décode les blocs hexa de la plage et met à jour les compteurs IP."""
+        self.ajouter_paquets(decoder_hexa(tampon, debut, fin))
+
+    def ajouter_paquets(self, enregistrements):
+        """Met à jour les compteurs IP à partir d'enregistrements PAQUET_HEXA."""
+        ip_src = self.ip_src
+        ip_dst = self.ip_dst
+        vol_src = self.vol_src
+        vol_dst = self.vol_dst
+        protocoles = self.protocoles
+        octets_ip = octets_utiles = n = 0
+        
+        for src, dst, _, _, proto, _, _, longueur, utile in PAQUET_HEXA.iter_unpack(enregistrements):
+            n += 1
+            ip_src[src] += 1
+            ip_dst[dst] += 1
+            vol_src[src] += longueur
+            vol_dst[dst] += longueur
+            protocoles[proto] += 1
+            octets_ip += longueur
+            octets_utiles += utile
+        
+        self.paquets_hexa += n
+        self.octets_ip += octets_ip
+        self.octets_utiles += octets_utiles
+
+    def elaguer(self, limite):
+        """Borne la mémoire d'une analyse sans fin (mode suivi).
+
+        Un compteur qui dépasse limite entrées ne garde que ses limite // 2
+        plus fréquentes ; seules les limite dernières erreurs sont gardées.
+        Les occurrences retirées restent comptées dans les totaux (elagues),
+        les nombres d'entrées distinctes deviennent approchés.
+        """
+        for nom, cnt in (("src", self.cnt_src), ("dst", self.cnt_dst), ("flags", self.cnt_flags),
+                         ("erreurs", self.err_types), (None, self.ip_src), (None, self.ip_dst),
+                         (None, self.vol_src), (None, self.vol_dst), (None, self.paires or {})):
+            if len(cnt) > limite:
+                garde = dict(cnt.most_common(limite // 2))
+                if nom:
+                    self.elagues[nom] += sum(cnt.values()) - sum(garde.values())
+                    self.elagues[f"{nom}_distincts"] += len(cnt) - len(garde)
+                cnt.clear()
+                cnt.update(garde)
+        if len(self.erreurs) > limite:
+            garde = islice(self.erreurs, len(self.erreurs) - limite, None)
+            self.erreurs = deque(garde, maxlen=self.erreurs.maxlen) if self.recentes else list(garde)
+        if self.flux is not None and len(self.flux.demi_ouverts_dst) > limite:
+            garde = self.flux.demi_ouverts_dst.most_common(limite // 2)
+            self.flux.demi_ouverts_dst = Counter(dict(garde))
+
+    def fermer(self):
+        """Termine les sorties écrites pendant la lecture (export des paquets)."""
+        if self.export is not None:
+            self.export.fermer()
+
+    def fusionner(self, autre, fichier=None):
+        """Ajoute l'état d'un bloc suivant du fichier (numéros de ligne décalés).
+        
+        Avec fichier (fusion de captures distinctes), les erreurs gardent leur
+        numéro de ligne et reçoivent le nom du fichier.
+        """
+        decalage = self.lignes
+        vues = sum(self.err_types.values())
+        vues_autre = sum(autre.err_types.values())
+        self.cnt_src.update(autre.cnt_src)
+        self.cnt_dst.update(autre.cnt_dst)
+        self.cnt_flags.update(autre.cnt_flags)
+        self.err_types.update(autre.err_types)
+        self.elagues.update(autre.elagues)
+        if fichier is None:
+            erreurs_autre = [{**e, "ligne": e["ligne"] + decalage} for e in autre.erreurs]
+        else:
+            erreurs_autre = [{"fichier": fichier, **e} for e in autre.erreurs]
+        if self.recentes:
+            self.erreurs.extend(erreurs_autre)
+        elif self.echantillon:
+            self.erreurs = self._fusionner_echantillons(self.erreurs, vues, erreurs_autre, vues_autre)
+        else:
+            self.erreurs.extend(erreurs_autre[:self.max_erreurs - len(self.erreurs)])
+        self.lignes += autre.lignes
+        self.lignes_regles.update(autre.lignes_regles)
+        for nom, exemple in autre.exemples_regles.items():
+            self.exemples_regles.setdefault(nom, exemple)
+        
+        self.paquets_hexa += autre.paquets_hexa
+        self.octets_ip += autre.octets_ip
+        self.octets_utiles += autre.octets_utiles
+        self.ip_src.update(autre.ip_src)
+        self.ip_dst.update(autre.ip_dst)
+        self.vol_src.update(autre.vol_src)
+        self.vol_dst.update(autre.vol_dst)
+        self.protocoles.update(autre.protocoles)
+        if self.table is not None:
+            self.table.fusionner(autre.table)
+        if self.paires is not None:
+            self.paires.update(autre.paires)
+        if self.esquisse:
+            self._vider_lots()
+            self.top_src.fusionner(autre.top_src)
+            self.top_dst.fusionner(autre.top_dst)
+            self.top_paires.fusionner(autre.top_paires)
+            self.hll_src.fusionner(autre.hll_src)
+            self.hll_dst.fusionner(autre.hll_dst)
+        if self.flux is not None:
+            self.flux.fusionner(autre.flux)
+        return self
+
+    def _fusionner_echantillons(self, a, na, b, nb):
+        """Échantillon de max_erreurs parmi na + nb erreurs, à partir des échantillons a et b."""
+        a, b = a[:], b[:]
+        resultat = []
+        while len(resultat) < self.max_erreurs and (a or b):
+            if b and (not a or self.hasard.random() * (na + nb) >= na):
+                resultat.append(b.pop(self.hasard.randrange(len(b))))
+                nb -= 1
+            else:
+                resultat.append(a.pop(self.hasard.randrange(len(a))))
+                na -= 1
+        return resultat
+
+    def resultat(self, profil=None):
+        """Construit le dictionnaire de stats (avec les alertes).
+        
+        profil (Profil) mesure à part l'évaluation des alertes et l'index par hôte.
+        """
+        cnt_flags = self.cnt_flags
+        elagues = self.elagues
+        nb_erreurs = sum(self.err_types.values()) + elagues["erreurs"]
+        if self.esquisse:
+            self._vider_lots()
+            cnt_src = self.top_src
+            cnt_dst = self.top_dst
+            paires = self.top_paires.compteurs
+            total_src = cnt_src.total
+            total_dst = cnt_dst.total
+            nb_src = len(self.hll_src)
+            nb_dst = len(self.hll_dst)
+        else:
+            cnt_src = self.cnt_src
+            cnt_dst = self.cnt_dst
+            paires = self.paires
+            total_src = sum(cnt_src.values()) + elagues["src"]
+            total_dst = sum(cnt_dst.values()) + elagues["dst"]
+            nb_src = len(cnt_src) + elagues["src_distincts"]
+            nb_dst = len(cnt_dst) + elagues["dst_distincts"]
+        
+        motifs = None
+        if self.regles.motifs:
+            motifs = {nom: {"lignes": self.lignes_regles[nom], "exemple": self.exemples_regles.get(nom)}
+                      for nom, _, _ in self.regles.motifs}
+        with _etape(profil, "alertes"):
+            alertes = calculer_alertes(cnt_src, cnt_dst, cnt_flags, nb_erreurs, self.regles, motifs)
+            if self.flux is not None:
+                flux = self.flux.resume()
+                alertes.extend(alertes_flux(flux))
+        
+        stats = {
+            "lignes": self.lignes,
+            "sources": cnt_src.most_common(10),
+            "destinations": cnt_dst.most_common(10),
+            "flags": list(cnt_flags.items()),
+            # Copie : en mode suivi, la lecture continue de remplir self.erreurs après l'instantané
+            "erreurs": sorted(self.erreurs, key=lambda e: (e.get("fichier", ""), e["ligne"])) if self.echantillon else list(self.erreurs),
+            "nb_erreurs": nb_erreurs,
+            "err_types": dict(self.err_types),
+            "alertes": alertes,
+            "total_src": total_src,
+            "total_dst": total_dst,
+            "total_flags": sum(cnt_flags.values()) + elagues["flags"],
+            "sources_distinctes": nb_src,
+            "destinations_distinctes": nb_dst,
+        }
+        if elagues:
+            stats["elague"] = dict(elagues)
+        
+        if self.esquisse:
+            stats["esquisse"] = {
+                "capacite": self.esquisse,
+                "erreur_max_sources": self.top_src.erreur,
+                "erreur_max_destinations": self.top_dst.erreur,
+                "erreur_type_distincts": round(self.hll_src.erreur_type(), 4),
+            }
+        
+        if self.hexa:
+            ip = socket.inet_ntoa
+            stats.update({
+                "paquets_hexa": self.paquets_hexa,
+                "octets_ip": self.octets_ip,
+                "octets_utiles": self.octets_utiles,
+                "ip_sources": [(ip(a), c) for a, c in self.ip_src.most_common(10)],
+                "ip_destinations": [(ip(a), c) for a, c in self.ip_dst.most_common(10)],
+                "volume_sources": [(ip(a), c) for a, c in self.vol_src.most_common(10)],
+                "volume_destinations": [(ip(a), c) for a, c in self.vol_dst.most_common(10)],
+                "protocoles": {PROTOCOLES.get(p, str(p)): c for p, c in self.protocoles.most_common()},
+            })
+        if self.paires is not None:
+            compteurs = cnt_src.compteurs if self.esquisse else cnt_src
+            compteurs_dst = cnt_dst.compteurs if self.esquisse else cnt_dst
+            with _etape(profil, "index par hôte", lignes=len(compteurs) + len(compteurs_dst)):
+                index = IndexHotes(compteurs, compteurs_dst, paires)
+            stats.update({
+                "index": index,
+                "hotes_sources": index.top("hotes_src"),
+                "hotes_destinations": index.top("hotes_dst"),
+                "ports_destinations": index.top("ports_dst"),
+                "conversations": [(a, b, c) for (a, b), c in index.top("conversations")],
+            })
+        if self.table is not None:
+            stats["table"] = self.table
+        if self.export is not None:
+            stats["export"] = {"chemin": self.export.chemin, "format": self.export.format,
+                               "paquets": self.export.paquets + len(self.export.lot)}
+        if self.flux is not None:
+            stats["flux"] = flux
+        if motifs is not None:
+            stats["regles_motifs"] = motifs
+        if self.fenetres is not None:
+            stats["fenetre"] = self.fenetres.duree
+            with _etape(profil, "alertes par fenêtre"):
+                stats["alertes_fenetres"] = self.fenetres.alertes()
+        return stats
+
+
+def calculer_alertes(cnt_src, cnt_dst, cnt_flags, nb_erreurs, regles=None, motifs=None):
+    """Applique les règles (REGLES par défaut : DOS / SYN FLOOD / DESEQUILIBRE) sur les compteurs."""
+    regles = REGLES if regles is None else regles
+    alertes = [texte for _, _, _, texte in regles.evaluer(cnt_src, cnt_dst, regles.totaux_flags(cnt_flags), motifs)]
+    
+    if nb_erreurs:
+        alertes.append(f"❌ ERREURS : {nb_erreurs} lignes d'erreur")
+    
+    return alertes
+
+
+def alertes_flux(flux):
+    """Connexions restées à moitié ouvertes (SYN sans poignée de main complète) : SYN flood probable."""
+    ouvertes = sum(c for e, c in flux["etats"].items() if e != "sans_poignee")
+    demi = flux["demi_ouverts"]
+    if demi > 50 and demi > ouvertes / 2:
+        cible = flux["demi_ouverts_destinations"][0][0]
+        return [f"🟠 DEMI-OUVERTES : {demi} connexions sur {ouvertes} sans poignée de main complète "
+                f"(surtout vers {cible})"]
+    return []
+
+
+class AnalyseAnnulee(Exception):
+    """Levée quand une analyse en cours est annulée."""
+
+
+def _verifier_annulation(annulation):
+    if annulation is not None and annulation.is_set():
+        raise AnalyseAnnulee("Analyse annulée")
+
+
+class Profil:
+    """Mesures par étape d'un traitement (option profil) : durée, volumes, débit, pic mémoire.
+    
+    with profil.etape("analyse", octets=n) as e: ... ; e["lignes"] = ...
+    Les étapes peuvent s'imbriquer (niveau). Avec memoire=True, le pic
+    d'allocations Python de chaque étape est suivi par tracemalloc, ce qui
+    ralentit nettement l'analyse ; les processus fils ne sont pas suivis.
+    tracemalloc est arrêté entre deux étapes de premier niveau.
+    """
+
+    def __init__(self, memoire=False):
+        self.memoire = memoire
+        self.etapes = []
+        self._pics = []  # pic en cours des étapes englobantes
+        self._demarre = False
+
+    @contextmanager
+    def etape(self, nom, **volumes):
+        mesure = {"etape": nom, "niveau": len(self._pics), **volumes}
+        if self.memoire:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._demarre = True
+            actuelle, pic = tracemalloc.get_traced_memory()
+            if self._pics:
+                self._pics[-1] = max(self._pics[-1], pic)
+            tracemalloc.reset_peak()
+        self._pics.append(0)
+        self.etapes.append(mesure)
+        debut = time.perf_counter()
+        try:
+            yield mesure
+        finally:
+            mesure["duree"] = time.perf_counter() - debut
+            pic = self._pics.pop()
+            if self.memoire:
+                pic = max(pic, tracemalloc.get_traced_memory()[1])
+                mesure["pic_memoire"] = pic - actuelle
+                if self._pics:
+                    self._pics[-1] = max(self._pics[-1], pic)
+                elif self._demarre:
+                    tracemalloc.stop()
+                    self._demarre = False
+
+    def resume(self):
+        """Les étapes (dans l'ordre de début) avec leurs débits, pour le JSON."""
+        resume = []
+        for m in self.etapes:
+            m = dict(m)
+            for volume in ("lignes", "octets"):
+                if m.get(volume) and m["duree"] > 0:
+                    m[f"{volume}_par_s"] = round(m[volume] / m["duree"])
+            resume.append(m)
+        return resume
+
+    def lignes(self):
+        """Une ligne de texte par étape (résumé de la fenêtre, sortie d'erreur du CLI)."""
+        lignes = []
+        for m in self.resume():
+            texte = f"{'  ' * m['niveau']}{m['etape']:{30 - 2 * m['niveau']}s} {m['duree'] * 1000:10.1f} ms"
+            if m.get("lignes"):
+                texte += f" | {m['lignes']:>11,} lignes ({m.get('lignes_par_s', 0):,}/s)"
+            if m.get("octets"):
+                texte += f" | {m['octets'] / 2**20:9.1f} Mio ({m.get('octets_par_s', 0) / 2**20:.1f} Mio/s)"
+            if "pic_memoire" in m:
+                pic = m["pic_memoire"]
+                texte += f" | pic {pic / 2**20:.1f} Mio" if pic >= 2**20 else f" | pic {pic / 1024:.0f} Kio"
+            lignes.append(texte)
+        return lignes
+
+
+def _etape(profil, nom, **volumes):
+    """profil.etape(...) si un Profil est donné, sinon un contexte vide."""
+    return profil.etape(nom, **volumes) if profil is not None else nullcontext({})
+
+
+def _analyser_plage(chemin, debut, fin, progression=None, annulation=None, etat=None, **options):
+    """Analyse une plage d'octets du fichier (aussi exécuté dans les processus fils).
+
+    La plage est traitée par pas de TAILLE_PAS octets alignés sur les débuts
+    de paquet, pour pouvoir signaler l'avancement et s'interrompre.
+    Si etat est donné, il est complété au lieu d'en créer un nouveau.
+    """
+    etat = EtatAnalyse(**options) if etat is None else etat
+    with open(chemin, "rb") as f:
+        taille = os.fstat(f.fileno()).st_size
+        if taille == 0:
+            return etat
+        fin = taille if fin is None else fin
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = debut
+            while pos < fin:
+                _verifier_annulation(annulation)
+                coupe = fin
+                if pos + TAILLE_PAS < fin:
+                    m = DEBUT_PAQUET_B.search(mm, pos + TAILLE_PAS - 1, fin)
+                    coupe = m.end() if m else fin
+                etat.ajouter_tampon(mm, pos, coupe)
+                if etat.hexa:
+                    etat.ajouter_hexa(mm, pos, coupe)
+                pos = coupe
+                if progression:
+                    progression(pos, taille)
+    return etat
+
+
+def _ajouter_morceau(etat, tampon, fin):
+    """Analyse tampon[:fin] (lignes complètes, paquets hexa entiers)."""
+    etat.ajouter_tampon(tampon, 0, fin)
+    if etat.hexa:
+        etat.ajouter_hexa(tampon, 0, fin)
+
+
+def _lire_trames_flux(etat, f, annulation=None, avancement=None):
+    """Ajoute à etat les trames d'un flux pcap/pcapng, par lots."""
+    trames = lire_trames(f)
+    while True:
+        _verifier_annulation(annulation)
+        lot = list(islice(trames, 10000))
+        if not lot:
+            break
+        etat.ajouter_trames(lot)
+        if avancement:
+            avancement()
+
+
+def _lire_texte_flux(etat, f, annulation=None, avancement=None):
+    """Ajoute à etat les lignes d'un flux texte, bloc par bloc (comme le suivi)."""
+    tampon = bytearray()
+    while True:
+        _verifier_annulation(annulation)
+        donnees = f.read1(TAILLE_BLOC)
+        if not donnees:
+            break
+        tampon += donnees
+        fin = _fin_traitable(tampon, etat.hexa)
+        if fin:
+            _ajouter_morceau(etat, tampon, fin)
+            del tampon[:fin]
+        if avancement:
+            avancement()
+    if tampon:
+        _ajouter_morceau(etat, tampon, len(tampon))
+
+
+def _lire_flux(etat, lecteur, annulation=None, avancement=None):
+    """Analyse le contenu décompressé lu par lecteur (LectureAvance) : pcap ou texte."""
+    with io.BufferedReader(lecteur, TAILLE_BLOC) as f:
+        magique = f.peek(4)[:4]
+        if magique in MAGIC_PCAP or magique == MAGIC_PCAPNG:
+            _lire_trames_flux(etat, f, annulation, avancement)
+        else:
+            _lire_texte_flux(etat, f, annulation, avancement)
+
+
+def _analyser_pcap(chemin, progression=None, annulation=None, **options):
+    """Analyse une capture pcap/pcapng en continu, par lots de trames."""
+    etat = EtatAnalyse(**options)
+    taille = os.path.getsize(chemin)
+    with open(chemin, "rb", buffering=TAILLE_BLOC) as f:
+        _lire_trames_flux(etat, f, annulation, progression and (lambda: progression(f.tell(), taille)))
+    return etat
+
+
+def _analyser_compresse(chemin, compression, progression=None, annulation=None, **options):
+    """Analyse une capture compressée sans l'écrire décompressée sur le disque.
+
+    Le contenu (texte ou pcap) est décompressé dans un thread pendant
+    l'analyse, toujours dans un seul processus : on ne peut pas sauter au
+    milieu d'un flux compressé. Les captures d'une archive zip sont lues
+    à la suite dans un même état ; chaque erreur porte le nom de sa capture
+    et son numéro de ligne dans cette capture.
+    """
+    etat = EtatAnalyse(**options)
+    taille = os.path.getsize(chemin)
+    with open(chemin, "rb") as brut:
+        if compression != "zip":
+            with ouvrir_decompression(brut, compression) as source:
+                lecteur = LectureAvance(source, brut.tell)
+                _lire_flux(etat, lecteur, annulation, progression and (lambda: progression(lecteur.position, taille)))
+            return etat
+        
+        import zipfile
+        with zipfile.ZipFile(brut) as archive:
+            lus = 0
+            for membre in archive.infolist():
+                if membre.is_dir():
+                    continue
+                nb_erreurs = len(etat.erreurs)
+                avant = etat.lignes
+                with archive.open(membre) as source:
+                    lecteur = LectureAvance(source)
+                    avancement = progression and (lambda: progression(
+                        lus + membre.compress_size * lecteur.lus // max(membre.file_size, 1), taille))
+                    _lire_flux(etat, lecteur, annulation, avancement)
+                # Échantillon : les nouvelles erreurs peuvent en remplacer d'anciennes, n'importe où
+                for i in range(0 if etat.echantillon else nb_erreurs, len(etat.erreurs)):
+                    e = etat.erreurs[i]
+                    if "fichier" not in e:
+                        etat.erreurs[i] = {"fichier": membre.filename, **e, "ligne": e["ligne"] - avant}
+                lus += membre.compress_size
+    return etat
+
+
+def _analyser_texte(chemin, debut=0, fin=None, nb_processus=1, progression=None, annulation=None,
+                    etat=None, **options):
+    """Analyse la plage [debut, fin) d'une capture texte et retourne l'EtatAnalyse.
+
+    Si etat est donné, l'analyse le complète (reprise après le cache).
+    """
+    taille = os.path.getsize(chemin)
+    fin = taille if fin is None else fin
+    if nb_processus is None:
+        nb_processus = os.cpu_count() or 1
+    nb_processus = min(nb_processus, (fin - debut) // TAILLE_MIN_PLAGE)
+    if options.get("fenetre") or options.get("export") or options.get("flux"):
+        nb_processus = 1  # fenêtres de temps, export et flux TCP suivent l'ordre du fichier
+    
+    if nb_processus <= 1:
+        return _analyser_plage(chemin, debut, fin, progression, annulation, etat, **options)
+    
+    # Plus de plages que de processus : progression plus fine, annulation plus rapide
+    from concurrent.futures import ProcessPoolExecutor, wait
+    
+    plages = decouper_fichier(chemin, nb_processus * 4, debut, fin)
+    etat = EtatAnalyse(**options) if etat is None else etat
+    pool = ProcessPoolExecutor(max_workers=nb_processus)
+    annule = False
+    try:
+        futures = [pool.submit(_analyser_plage, chemin, d, f, **options) for d, f in plages]
+        for (d, f), fut in zip(plages, futures):
+            _verifier_annulation(annulation)
+            while wait([fut], timeout=0.2).not_done:
+                _verifier_annulation(annulation)
+            etat.fusionner(fut.result())
+            if progression:
+                progression(f, taille)
+    except AnalyseAnnulee:
+        annule = True
+        raise
+    finally:
+        # Annulation : rendre la main sans attendre les plages en cours
+        pool.shutdown(wait=not annule, cancel_futures=True)
+    return etat
+
+
+def analyser_fichier(chemin, nb_processus=1, progression=None, annulation=None, profil=None, **options):
+    """Analyse le fichier et retourne les stats.
+
+    nb_processus > 1 (ou None = nombre de cœurs) découpe les gros fichiers
+    en plages analysées en parallèle puis fusionnées dans l'ordre.
+    progression(octets_traites, octets_total) est appelée au fil de l'eau ;
+    si annulation (threading.Event) est levée, AnalyseAnnulee est levée.
+    Les autres options sont celles d'EtatAnalyse (ex. hexa=True).
+    Les captures pcap/pcapng sont reconnues et lues directement, de même
+    que les captures compressées (gz, bz2, xz, zst, zip), décompressées
+    au fil de la lecture dans un seul processus.
+    Avec profil (Profil), la lecture en une passe (découpage, flags et
+    erreurs compris) puis la construction des stats sont mesurées.
+    """
+    with _etape(profil, "analyse", octets=os.path.getsize(chemin)) as e:
+        etat = _etat_fichier(chemin, nb_processus, progression, annulation, **options)
+        e["lignes"] = etat.lignes
+    with _etape(profil, "stats", lignes=etat.lignes):
+        return etat.resultat(profil)
+
+
+def _etat_fichier(chemin, nb_processus=1, progression=None, annulation=None, **options):
+    """EtatAnalyse complet et fermé d'un fichier (aussi exécuté dans les processus fils)."""
+    compression = compression_capture(chemin)
+    if compression:
+        etat = _analyser_compresse(chemin, compression, progression, annulation, **options)
+    elif format_capture(chemin) != "texte":
+        etat = _analyser_pcap(chemin, progression, annulation, **options)
+    else:
+        etat = _analyser_texte(chemin, 0, None, nb_processus, progression, annulation, **options)
+    etat.fermer()
+    return etat
+
+
+def _empreinte(f, debut, fin):
+    """Hash SHA-1 des octets [debut, fin) d'un fichier ouvert."""
+    f.seek(debut)
+    return hashlib.sha1(f.read(fin - debut)).hexdigest()
+
+
+def _fin_sure(chemin, debut, fin, hexa):
+    """Dernière frontière de paquet avant fin : la suite éventuelle du fichier ne peut pas la couper."""
+    with open(chemin, "rb") as f:
+        depart = max(debut, fin - TAILLE_BLOC)
+        f.seek(depart)
+        p = _fin_traitable(f.read(fin - depart), hexa)
+    return depart + p if p else debut
+
+
+def _lire_cache(fichier):
+    try:
+        with open(fichier, "rb") as f:
+            entree = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    return entree if entree.get("version") == VERSION_CACHE else None
+
+
+def _ecrire_cache(fichier, entree):
+    """Écriture atomique ; le cache n'est qu'une optimisation, les erreurs sont ignorées."""
+    try:
+        fichier.parent.mkdir(parents=True, exist_ok=True)
+        temp = fichier.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp, "wb") as f:
+            pickle.dump(entree, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, fichier)
+    except OSError:
+        pass
+
+
+def analyser_avec_cache(chemin, nb_processus=1, progression=None, annulation=None, dossier=None, profil=None,
+                        **options):
+    """Comme analyser_fichier, avec un cache disque des analyses précédentes.
+
+    L'entrée du cache (une par chemin et par jeu d'options, dans dossier ou
+    DOSSIER_CACHE) garde la taille, la date de modification, le hash du
+    début et de la fin du contenu déjà analysé, l'état fusionné jusqu'à la
+    dernière frontière de paquet et les stats. Un fichier inchangé (même
+    taille, même date et mêmes hash du début et des fins de la partie
+    connue et du fichier) est rendu sans l'analyser ; un fichier qui a
+    grandi (même début, même fin de la partie connue) n'est analysé qu'à
+    partir de là. Sinon (fichier modifié ou tronqué), l'analyse repart de
+    zéro.
+    L'export des paquets demande une lecture complète : pas de cache.
+    """
+    if options.get("export"):
+        return analyser_fichier(chemin, nb_processus, progression, annulation, profil, **options)
+    chemin = Path(chemin).resolve()
+    cle = hashlib.sha1(f"{chemin}|{sorted(options.items())}".encode()).hexdigest()
+    fichier_cache = Path(dossier or DOSSIER_CACHE) / f"{cle}.pickle"
+    st = os.stat(chemin)
+    with _etape(profil, "lecture du cache"):
+        entree = _lire_cache(fichier_cache)
+    
+    with open(chemin, "rb") as f:
+        connu = 0
+        if entree and entree["fin"] <= st.st_size:
+            fin = entree["fin"]
+            if (_empreinte(f, 0, min(fin, TAILLE_EMPREINTE)) == entree["tete"]
+                    and _empreinte(f, max(fin - TAILLE_EMPREINTE, 0), fin) == entree["queue"]):
+                connu = fin
+                # Même taille et même date ne suffisent pas (touch -r, dates grossières) : fin du fichier comprise
+                if (entree["taille"] == st.st_size and entree["mtime"] == st.st_mtime_ns
+                        and _empreinte(f, max(st.st_size - TAILLE_EMPREINTE, 0), st.st_size) == entree["queue_fichier"]):
+                    return entree["stats"]
+    
+    texte = format_capture(chemin) == "texte" and not compression_capture(chemin)
+    with _etape(profil, "analyse", octets=st.st_size - connu) as e:
+        if not texte:
+            # pcap, compressé : pas de reprise au milieu des blocs, seul un fichier inchangé est réutilisé
+            etat = _etat_fichier(chemin, 1, progression, annulation, **options)
+            fin = st.st_size
+            etat_fin = pickle.dumps(etat, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            etat = pickle.loads(entree["etat"]) if connu else None
+            lignes_connues = etat.lignes if connu else 0
+            fin = _fin_sure(chemin, connu, st.st_size, options.get("hexa"))
+            etat = _analyser_texte(chemin, connu, fin, nb_processus, progression, annulation, etat, **options)
+            etat_fin = pickle.dumps(etat, protocol=pickle.HIGHEST_PROTOCOL)
+            if fin < st.st_size:
+                etat = _analyser_plage(chemin, fin, st.st_size, progression, annulation, etat, **options)
+        e["lignes"] = etat.lignes - (lignes_connues if texte else 0)
+    with _etape(profil, "stats", lignes=etat.lignes):
+        stats = etat.resultat(profil)
+    
+    with _etape(profil, "écriture du cache"):
+        with open(chemin, "rb") as f:
+            tete = _empreinte(f, 0, min(fin, TAILLE_EMPREINTE))
+            queue = _empreinte(f, max(fin - TAILLE_EMPREINTE, 0), fin)
+            queue_fichier = _empreinte(f, max(st.st_size - TAILLE_EMPREINTE, 0), st.st_size)
+        _ecrire_cache(fichier_cache, {
+            "version": VERSION_CACHE, "chemin": str(chemin), "taille": st.st_size, "mtime": st.st_mtime_ns,
+            "fin": fin, "tete": tete, "queue": queue, "queue_fichier": queue_fichier, "etat": etat_fin,
+            "stats": stats,
+        })
+    return stats
+
+
+def analyser_fichiers(chemins, nb_processus=None, progression=None, annulation=None,
+                      seuil=SEUIL_VARIATION, profil=None, **options):
+    """Analyse plusieurs captures (un fichier par processus) et fusionne leurs compteurs.
+    
+    Retourne (stats combinées, [stats de chaque fichier]). Les stats
+    combinées ont en plus "fichiers" (noms courts) et "comparaisons" :
+    chaque capture comparée à la précédente par comparer_stats, à partir
+    des compteurs déjà calculés, sans relire les fichiers. L'index par
+    hôte (hotes=True) est toujours construit. Les erreurs gardent leur
+    numéro de ligne, avec le nom de leur fichier (le chemin complet si deux
+    fichiers portent le même nom).
+    """
+    if options.get("export"):
+        raise ValueError("fusion : exporter les paquets de chaque fichier séparément")
+    options["hotes"] = True
+    chemins = [Path(c) for c in chemins]
+    tailles = [os.path.getsize(c) for c in chemins]
+    if nb_processus is None:
+        nb_processus = os.cpu_count() or 1
+    nb_processus = min(nb_processus, len(chemins))
+    
+    with _etape(profil, "analyse", octets=sum(tailles)) as e:
+        etats = _etats_fichiers(chemins, tailles, nb_processus, progression, annulation, **options)
+        e["lignes"] = sum(etat.lignes for etat in etats)
+    
+    noms = noms_sortie(chemins)
+    with _etape(profil, "stats par fichier"):
+        par_fichier = [etat.resultat() for etat in etats]
+    with _etape(profil, "fusion"):
+        total = EtatAnalyse(**options)
+        vus = Counter(c.name for c in chemins)
+        for chemin, etat in zip(chemins, etats):
+            total.fusionner(etat, fichier=chemin.name if vus[chemin.name] == 1 else str(chemin))
+    with _etape(profil, "stats", lignes=total.lignes):
+        stats = total.resultat(profil)
+    if options.get("fenetre"):
+        # Les fenêtres de temps ne se fusionnent pas d'une capture à l'autre
+        stats["alertes_fenetres"] = [f"{nom} : {a}" for nom, sf in zip(noms, par_fichier)
+                                     for a in sf["alertes_fenetres"]]
+    stats["fichiers"] = noms
+    with _etape(profil, "comparaisons"):
+        stats["comparaisons"] = [
+            comparer_stats(par_fichier[i - 1], par_fichier[i], seuil, (noms[i - 1], noms[i]), total.regles)
+            for i in range(1, len(par_fichier))
+        ]
+    return stats, par_fichier
+
+
+def _etats_fichiers(chemins, tailles, nb_processus, progression, annulation, **options):
+    """États fermés des fichiers, dans l'ordre (un fichier par processus si nb_processus > 1)."""
+    etats = []
+    if nb_processus <= 1:
+        for chemin in chemins:
+            etats.append(_etat_fichier(chemin, annulation=annulation, **options))
+            if progression:
+                progression(sum(tailles[:len(etats)]), sum(tailles))
+    else:
+        from concurrent.futures import ProcessPoolExecutor, wait
+        
+        pool = ProcessPoolExecutor(max_workers=nb_processus)
+        annule = False
+        try:
+            futures = [pool.submit(_etat_fichier, c, **options) for c in chemins]
+            for fut in futures:
+                while wait([fut], timeout=0.2).not_done:
+                    _verifier_annulation(annulation)
+                etats.append(fut.result())
+                if progression:
+                    progression(sum(tailles[:len(etats)]), sum(tailles))
+        except AnalyseAnnulee:
+            annule = True
+            raise
+        finally:
+            # Annulation : rendre la main sans attendre les fichiers en cours
+            pool.shutdown(wait=not annule, cancel_futures=True)
+    return etats
+
+
+def _volumes_hotes(s):
+    """Paquets par hôte (émis + reçus) : index complet si présent, sinon les tops des stats."""
+    index = s.get("index")
+    if index is not None:
+        return index.hotes_src + index.hotes_dst
+    volumes = Counter(dict(s["sources"]))
+    volumes.update(dict(s["destinations"]))
+    return volumes
+
+
+def _alertes_par_cle(s, regles=None):
+    """Alertes de s par (règle, cible), pour les comparer malgré des valeurs différentes."""
+    index = s.get("index")
+    if index is None:
+        return {(texte, ""): texte for texte in s["alertes"]}
+    regles = REGLES if regles is None else regles
+    alertes = {(regle, cible): texte for regle, cible, _, texte
+               in regles.evaluer(index.adresses_src, index.adresses_dst, regles.totaux_flags(dict(s["flags"])),
+                                 s.get("regles_motifs"))}
+    # Alertes hors règles (erreurs, connexions demi-ouvertes) : une par préfixe
+    for texte in s["alertes"]:
+        if texte.startswith(("❌ ERREURS", "🟠 DEMI-OUVERTES")):
+            alertes[texte.split(" : ")[0], ""] = texte
+    return alertes
+
+
+def comparer_stats(avant, apres, seuil=SEUIL_VARIATION, noms=("avant", "après"), regles=None):
+    """Différences entre deux stats : hôtes nouveaux ou disparus, variations, alertes.
+    
+    Les volumes (paquets émis + reçus par hôte) viennent de l'index par
+    hôte (option hotes) ; sans lui, seuls les tops sont comparés. Une
+    variation est signalée si |après - avant| / avant >= seuil. Les
+    alertes sont réévaluées avec regles (JeuRegles, REGLES par défaut).
+    """
+    vol_avant = _volumes_hotes(avant)
+    vol_apres = _volumes_hotes(apres)
+    variations = []
+    for hote, a in vol_avant.items():
+        b = vol_apres.get(hote)
+        if b is not None and abs(b - a) >= seuil * a:
+            variations.append((hote, a, b, round((b - a) / a * 100, 1)))
+    variations.sort(key=lambda v: abs(v[3]), reverse=True)
+    
+    alertes_avant = _alertes_par_cle(avant, regles)
+    alertes_apres = _alertes_par_cle(apres, regles)
+    return {
+        "avant": noms[0],
+        "apres": noms[1],
+        "seuil": seuil,
+        "nouveaux_hotes": sorted(((h, c) for h, c in vol_apres.items() if h not in vol_avant),
+                                 key=lambda x: x[1], reverse=True),
+        "hotes_disparus": sorted(((h, c) for h, c in vol_avant.items() if h not in vol_apres),
+                                 key=lambda x: x[1], reverse=True),
+        "variations": variations,
+        "alertes_apparues": [t for k, t in alertes_apres.items() if k not in alertes_avant],
+        "alertes_disparues": [t for k, t in alertes_avant.items() if k not in alertes_apres],
+    }
+
+
+class TacheAnalyse(threading.Thread):
+    """Analyse d'un fichier dans un thread de fond.
+
+    L'appelant lit octets / total pour la progression et stats / erreur
+    une fois le thread terminé ; annuler() interrompt l'analyse.
+    Avec cache=True, analyser_avec_cache est utilisée.
+    """
+
+    def __init__(self, chemin, cache=False, **options):
+        super().__init__(daemon=True)
+        self.chemin = chemin
+        self.cache = cache
+        self.options = options
+        self.annulation = threading.Event()
+        self.octets = 0
+        self.total = 0
+        self.stats = None
+        self.erreur = None
+
+    def run(self):
+        try:
+            analyser = analyser_avec_cache if self.cache else analyser_fichier
+            self.stats = analyser(
+                self.chemin, progression=self._progression, annulation=self.annulation, **self.options
+            )
+        except Exception as e:
+            self.erreur = e
+
+    def _progression(self, octets, total):
+        self.octets = octets
+        self.total = total
+
+    def annuler(self):
+        self.annulation.set()
+
+
+class TacheFusion(TacheAnalyse):
+    """Fusion de plusieurs captures (analyser_fichiers) dans un thread de fond.
+    
+    stats reçoit les stats combinées, par_fichier celles de chaque capture.
+    """
+
+    def __init__(self, chemins, **options):
+        super().__init__(Path(f"fusion de {len(chemins)} captures"), **options)
+        self.chemins = chemins
+        self.par_fichier = None
+
+    def run(self):
+        try:
+            self.stats, self.par_fichier = analyser_fichiers(
+                self.chemins, progression=self._progression, annulation=self.annulation, **self.options
+            )
+        except Exception as e:
+            self.erreur = e
+
+
+def _fin_traitable(tampon, hexa):
+    """Position jusqu'où le tampon du suivi peut être analysé.
+
+    Seules les lignes complètes sont prises ; avec hexa, on s'arrête au
+    dernier début de paquet, dont le bloc hexa peut encore arriver.
+    """
+    fin = tampon.rfind(b"\n") + 1
+    if hexa:
+        i = fin - 1
+        while i > 0:
+            i = tampon.rfind(b"\n", 0, i)
+            if i < 0 or tampon[i + 1] not in b" \t":
+                break
+        fin = i + 1 if i > 0 else 0
+    return fin
+
+
+def suivre_flux(source, rappel, intervalle=INTERVALLE_SUIVI, annulation=None, limite=LIMITE_SUIVI, **options):
+    """Suit une capture texte qui grandit (tcpdump -l > fichier) ou un flux ("-" = stdin).
+
+    Les compteurs sont mis à jour au fil des lignes et rappel(stats) est
+    appelé au plus toutes les intervalle secondes, puis une dernière fois à
+    la fin : fin du flux, annulation (threading.Event) ou Ctrl+C. Un fichier
+    est suivi sans fin ; s'il est tronqué, la lecture reprend au début.
+    La mémoire reste bornée (EtatAnalyse.elaguer) : l'option table n'est
+    donc pas permise, et seules les max_erreurs erreurs les plus récentes
+    sont gardées en détail.
+    """
+    if options.get("table"):
+        raise ValueError("la table des paquets grandit sans fin : pas de table en mode suivi")
+    etat = EtatAnalyse(recentes=True, **options)
+    
+    if source == "-":
+        fd = sys.stdin.buffer.fileno()
+        f = None
+        lire = lambda: os.read(fd, TAILLE_BLOC)
+    else:
+        if format_capture(source) != "texte" or compression_capture(source):
+            raise ValueError("le suivi ne lit que les captures texte (tcpdump -l)")
+        f = open(source, "rb")
+        lire = lambda: f.read(TAILLE_BLOC)
+    
+    tampon = bytearray()
+    dernier = time.monotonic()
+    nouveau = False
+    try:
+        while not (annulation is not None and annulation.is_set()):
+            donnees = lire()
+            if donnees:
+                tampon += donnees
+                fin = _fin_traitable(tampon, etat.hexa)
+                if fin:
+                    _ajouter_morceau(etat, tampon, fin)
+                    del tampon[:fin]
+                    nouveau = True
+            elif f is None:
+                break  # fin du flux
+            else:
+                if f.tell() > os.fstat(f.fileno()).st_size:
+                    f.seek(0)
+                    tampon.clear()
+                time.sleep(ATTENTE_SUIVI)
+            
+            if nouveau and time.monotonic() - dernier >= intervalle:
+                etat.elaguer(limite)
+                rappel(etat.resultat())
+                dernier = time.monotonic()
+                nouveau = False
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if f is not None:
+            f.close()
+    
+    if tampon:
+        _ajouter_morceau(etat, tampon, len(tampon))
+    etat.fermer()
+    etat.elaguer(limite)
+    stats = etat.resultat()
+    rappel(stats)
+    return stats
+
+
+class TacheSuivi(threading.Thread):
+    """Suivi d'une capture qui grandit dans un thread de fond.
+
+    stats contient le dernier instantané (remplacé au plus toutes les
+    intervalle secondes) ; annuler() arrête le suivi.
+    """
+
+    def __init__(self, chemin, intervalle=INTERVALLE_SUIVI, **options):
+        super().__init__(daemon=True)
+        self.chemin = chemin
+        self.intervalle = intervalle
+        self.options = options
+        self.annulation = threading.Event()
+        self.stats = None
+        self.erreur = None
 
-# Matplotlib pour les graphiques dans la fenêtre
-try:
-    import matplotlib
-    matplotlib.use('TkAgg')
-    from matplotlib.figure import Figure
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    MATPLOTLIB_OK = True
-except ImportError:
-    MATPLOTLIB_OK = False
+    def run(self):
+        try:
+            suivre_flux(self.chemin, self._instantane, self.intervalle, self.annulation, **self.options)
+        except Exception as e:
+            self.erreur = e
+
+    def _instantane(self, stats):
+        self.stats = stats
+
+    def annuler(self):
+        self.annulation.set()
 
 # ============================================================================
-# FONCTION D'ANALYSE
+# EXPORTS (sans interface : utilisés par la fenêtre et par la ligne de commande)
 # ============================================================================
 
-def analyser_fichier(chemin):
-    """Analyse le fichier et retourne les stats."""
+def rapport_markdown(s, nom_fichier):
+    """Construit le rapport Markdown des stats s."""
+    approx = "≈" if 'esquisse' in s or 'elague' in s else ""
+    md = [
+        f"# 🛡️ Rapport SAE 1.05\n\n",
+        f"**📅 Date** : {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n",
+        f"**📁 Fichier** : `{nom_fichier}`\n\n",
+        f"---\n\n",
+        f"## 📊 Statistiques globales\n\n",
+        f"- **Lignes analysées** : {s['lignes']}\n",
+        f"- **Sources distinctes** : {approx}{s['sources_distinctes']}\n",
+        f"- **Destinations distinctes** : {approx}{s['destinations_distinctes']}\n",
+        f"- **Erreurs** : {s['nb_erreurs']}\n",
+        f"- **Alertes** : {len(s['alertes'])}\n\n",
+    ]
+    if 'esquisse' in s:
+        e = s['esquisse']
+        md.append(f"> Mode esquisse ({e['capacite']} compteurs) : comptes sous-estimés d'au plus "
+                  f"{e['erreur_max_sources']} (sources) / {e['erreur_max_destinations']} (destinations), "
+                  f"distincts à ±{e['erreur_type_distincts'] * 100:.1f} % (erreur type)\n\n")
+    if 'elague' in s:
+        md.append("> Compteurs élagués (suivi) : seuls les plus fréquents sont détaillés ; "
+                  "totaux et pourcentages restent exacts, les nombres de distincts sont approchés\n\n")
+    md += [
+        f"---\n\n",
+        f"## 🔵 Top 10 Sources\n\n",
+        "| Rang | IP Source | Paquets | % |\n",
+        "|:----:|:----------|--------:|---:|\n"
+    ]
+    
+    for i, (ip, c) in enumerate(s['sources'], 1):
+        pct = round(c / s['total_src'] * 100, 1) if s['total_src'] > 0 else 0
+        md.append(f"| {i} | `{ip}` | {c} | **{pct}%** |\n")
+    
+    md.append("\n---\n\n## 🔴 Top 10 Destinations\n\n")
+    md.append("| Rang | IP Destination | Connexions | % |\n")
+    md.append("|:----:|:---------------|----------:|---:|\n")
+    
+    for i, (ip, c) in enumerate(s['destinations'], 1):
+        pct = round(c / s['total_dst'] * 100, 1) if s['total_dst'] > 0 else 0
+        md.append(f"| {i} | `{ip}` | {c} | **{pct}%** |\n")
     
-    with open(chemin, "r", encoding="utf-8", errors="ignore") as f:
-        lignes = [l.strip() for l in f if l.strip() and not l.strip().startswith("0x")]
+    if 'ip_sources' in s:
+        protos = ", ".join(f"{p} : {c}" for p, c in s['protocoles'].items())
+        md.append("\n---\n\n## 🌐 Adresses IP exactes (blocs hexa)\n\n")
+        md.append(f"- **Paquets décodés** : {s['paquets_hexa']} ({protos})\n")
+        md.append(f"- **Volume IP** : {s['octets_ip']} octets (dont {s['octets_utiles']} utiles)\n\n")
+        md.append("| Rang | IP Source | Paquets | IP Destination | Paquets |\n")
+        md.append("|:----:|:----------|--------:|:---------------|--------:|\n")
+        for i in range(max(len(s['ip_sources']), len(s['ip_destinations']))):
+            src, c_src = s['ip_sources'][i] if i < len(s['ip_sources']) else ("", "")
+            dst, c_dst = s['ip_destinations'][i] if i < len(s['ip_destinations']) else ("", "")
+            md.append(f"| {i + 1} | `{src}` | {c_src} | `{dst}` | {c_dst} |\n")
     
-    sources = []
-    destinations = []
-    flags = []
+    if s.get('conversations'):
+        md.append("\n---\n\n## 🔁 Conversations (par hôte)\n\n")
+        md.append("| Rang | Hôte source | Hôte destination | Paquets |\n")
+        md.append("|:----:|:------------|:-----------------|--------:|\n")
+        for i, (a, b, c) in enumerate(s['conversations'], 1):
+            md.append(f"| {i} | `{a}` | `{b}` | {c} |\n")
+        ports = ", ".join(f"{p} ({c})" for p, c in s['ports_destinations'])
+        md.append(f"\n**Ports de destination** : {ports}\n")
+    
+    if 'flux' in s:
+        f = s['flux']
+        etats = ", ".join(f"{e} : {c}" for e, c in f['etats'].items())
+        durees = ", ".join(f"{d} : {c}" for d, c in f['durees'].items())
+        md.append(f"\n---\n\n## 🔗 Connexions TCP (expiration {f['expiration']:g} s)\n\n")
+        md.append(f"- **Flux** : {f['total']} ({f['actifs']} encore ouverts, {f['retires']} retirés de la table)\n")
+        md.append(f"- **États** : {etats}\n")
+        md.append(f"- **Demi-ouvertes** : {f['demi_ouverts']}"
+                  + "".join(f", `{d}` ({c})" for d, c in f['demi_ouverts_destinations'][:5]) + "\n")
+        if f['duree_moyenne'] is not None:
+            md.append(f"- **Durée** : moyenne {f['duree_moyenne']:g} s, max {f['duree_max']:g} s ({durees})\n")
+        md.append(f"- **Volume** : {f['octets']} octets\n\n")
+        md.append("| Rang | Source | Destination | Octets | Paquets | Durée (s) | État |\n")
+        md.append("|:----:|:-------|:------------|-------:|--------:|----------:|:-----|\n")
+        for i, (a, b, o, n, d, e) in enumerate(f['top_octets'], 1):
+            duree = "-" if d is None else f"{d:g}"  # capture sans horodatage
+            md.append(f"| {i} | `{a}` | `{b}` | {o} | {n} | {duree} | {e} |\n")
+    
+    if s['alertes']:
+        md.append("\n---\n\n## ⚠️ Alertes de sécurité\n\n")
+        for i, a in enumerate(s['alertes'], 1):
+            md.append(f"{i}. {a}\n")
+    
+    if s.get('alertes_fenetres'):
+        md.append(f"\n---\n\n## ⏱️ Alertes par fenêtre de {s['fenetre']:g} s\n\n")
+        for i, a in enumerate(s['alertes_fenetres'], 1):
+            md.append(f"{i}. {a}\n")
+    
+    if s.get('fichiers'):
+        md.append(f"\n---\n\n## 🔀 Comparaison des captures ({', '.join(s['fichiers'])})\n")
+        for c in s['comparaisons']:
+            md.append(f"\n### `{c['avant']}` → `{c['apres']}`\n\n")
+            md.append(f"- **Nouveaux hôtes** ({len(c['nouveaux_hotes'])}) : "
+                      + ", ".join(f"`{h}` ({n})" for h, n in c['nouveaux_hotes'][:10]) + "\n")
+            md.append(f"- **Hôtes disparus** ({len(c['hotes_disparus'])}) : "
+                      + ", ".join(f"`{h}` ({n})" for h, n in c['hotes_disparus'][:10]) + "\n")
+            for t in c['alertes_apparues']:
+                md.append(f"- **Alerte apparue** : {t}\n")
+            for t in c['alertes_disparues']:
+                md.append(f"- **Alerte disparue** : {t}\n")
+            if c['variations']:
+                md.append(f"\n| Hôte | Avant | Après | Variation (seuil {c['seuil'] * 100:g} %) |\n")
+                md.append("|:-----|------:|------:|----------:|\n")
+                for h, a, b, pct in c['variations'][:10]:
+                    md.append(f"| `{h}` | {a} | {b} | **{pct:+g} %** |\n")
+    
+    md.append("\n---\n\n*Rapport généré automatiquement - SAE 1.05*\n")
+    
+    return "".join(md)
+
+
+def _feuille(wb, titre, entete, largeurs, style="entete"):
+    """Crée une feuille en écriture seule, avec sa ligne d'en-tête stylée."""
+    from openpyxl.cell import WriteOnlyCell
     
+    ws = wb.create_sheet(titre)
+    for col, largeur in zip("ABCDEFGH", largeurs):
+        ws.column_dimensions[col].width = largeur
+    cellules = []
+    for valeur in entete:
+        cellule = WriteOnlyCell(ws, value=valeur)
+        cellule.style = style
+        cellules.append(cellule)
+    ws.append(cellules)
+    return ws
+
+
+def _feuilles_detail(wb, titre, entete, largeurs, lignes, style="entete"):
+    """Écrit des lignes de détail au fil de l'eau (lignes peut être un générateur).
+
+    À la limite de lignes d'Excel, la suite part dans "titre (2)", "titre (3)"...
+    """
+    ws = _feuille(wb, titre, entete, largeurs, style)
+    n = 1
+    numero = 1
     for ligne in lignes:
-        parts = ligne.split()
-        if ">" in parts:
-            idx = parts.index(">")
-            if 0 < idx < len(parts) - 1:
-                sources.append(parts[idx - 1].strip())
-                destinations.append(parts[idx + 1].rstrip(" :,").strip())
-        if "Flags" in parts:
-            i = parts.index("Flags")
-            if i < len(parts) - 1:
-                flags.append(parts[i + 1].strip())
-    
-    cnt_src = Counter(sources)
-    cnt_dst = Counter(destinations)
-    cnt_flags = Counter(flags)
-    
-    err_regex = re.compile(r"\b(ERROR|Error|ERR|Exception|CRITICAL|FATAL|failed|failure|denied)\b", re.IGNORECASE)
-    erreurs = []
-    err_types = Counter()
-    
-    for idx, ligne in enumerate(lignes, 1):
-        m = err_regex.search(ligne)
-        if m:
-            t = m.group(0).upper()
-            err_types[t] += 1
-            erreurs.append({"ligne": idx, "type": t, "msg": ligne[:150]})
-    
-    alertes = []
-    
-    for ip, count in cnt_dst.most_common(5):
-        if count > 50:
-            alertes.append(f"🔴 DOS : {count} connexions vers {ip}")
-    
-    syn_total = sum(c for flag, c in cnt_flags.items() if "[S]" in flag)
-    if syn_total > 50:
-        alertes.append(f"🟠 SYN FLOOD : {syn_total} paquets SYN")
-    
-    dest_map = dict(cnt_dst)
-    for ip, env in cnt_src.most_common(10):
-        rec = dest_map.get(ip, 0)
-        ratio = env / max(rec, 1)
-        if env > 20 and ratio > 5:
-            alertes.append(f"🟡 DESEQUILIBRE : {ip} ({env}→{rec}, ratio {ratio:.1f}:1)")
-    
-    if erreurs:
-        alertes.append(f"❌ ERREURS : {len(erreurs)} lignes d'erreur")
-    
-    total_src = sum(cnt_src.values())
-    total_dst = sum(cnt_dst.values())
-    total_flags = sum(cnt_flags.values())
+        if n == LIGNES_MAX_EXCEL:
+            numero += 1
+            ws = _feuille(wb, f"{titre} ({numero})", entete, largeurs, style)
+            n = 1
+        ws.append(ligne)
+        n += 1
+
+
+def ecrire_excel(s, nom_fichier, chemin):
+    """Écrit le classeur Excel (onglets + camemberts + barres) des stats s.
+
+    Classeur en écriture seule : les lignes partent sur le disque au fur et
+    à mesure et les en-têtes partagent des styles nommés, donc la mémoire ne
+    dépend pas du nombre de lignes d'erreur.
+    """
+    from openpyxl import Workbook
+    from openpyxl.chart import PieChart, BarChart, Reference
+    from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle
     
-    return {
-        "lignes": len(lignes),
-        "sources": cnt_src.most_common(10),
-        "destinations": cnt_dst.most_common(10),
-        "flags": list(cnt_flags.items()),
-        "erreurs": erreurs,
-        "err_types": dict(err_types),
-        "alertes": alertes,
-        "total_src": total_src,
-        "total_dst": total_dst,
-        "total_flags": total_flags,
-    }
+    wb = Workbook(write_only=True)
+    
+    # Styles (un style nommé par couleur d'en-tête)
+    header_font = Font(color="FFFFFF", bold=True, size=12)
+    center = Alignment(horizontal="center", vertical="center")
+    for nom, couleur in (("entete", "3498DB"), ("entete_erreur", "E74C3C"), ("entete_alerte", "F39C12")):
+        wb.add_named_style(NamedStyle(
+            name=nom,
+            fill=PatternFill(start_color=couleur, end_color=couleur, fill_type="solid"),
+            font=header_font,
+            alignment=center,
+        ))
+    
+    # ===== ONGLET 1 : RÉSUMÉ =====
+    ws_resume = _feuille(wb, "📊 Résumé", ["Indicateur", "Valeur"], [30, 40])
+    
+    ws_resume.append(["📁 Fichier", nom_fichier])
+    ws_resume.append(["📅 Date", datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
+    ws_resume.append(["📄 Lignes analysées", s['lignes']])
+    ws_resume.append(["🔵 Sources distinctes", s['sources_distinctes']])
+    ws_resume.append(["🔴 Destinations distinctes", s['destinations_distinctes']])
+    ws_resume.append(["❌ Erreurs détectées", s['nb_erreurs']])
+    ws_resume.append(["⚠️ Alertes", len(s['alertes'])])
+    if 'esquisse' in s:
+        ws_resume.append(["≈ Mode esquisse (compteurs)", s['esquisse']['capacite']])
+        ws_resume.append(["≈ Erreur max sources", s['esquisse']['erreur_max_sources']])
+        ws_resume.append(["≈ Erreur max destinations", s['esquisse']['erreur_max_destinations']])
+    if 'elague' in s:
+        ws_resume.append(["≈ Compteurs élagués (suivi)", "totaux exacts, distincts approchés"])
+    if 'ip_sources' in s:
+        ws_resume.append(["🌐 Paquets décodés (hexa)", s['paquets_hexa']])
+        ws_resume.append(["📦 Volume IP (octets)", s['octets_ip']])
+        ws_resume.append(["📦 Volume utile (octets)", s['octets_utiles']])
+    
+    # ===== ONGLET 2 : SOURCES + CAMEMBERT =====
+    ws_src = _feuille(wb, "🔵 Sources", ["IP Source", "Paquets", "Pourcentage"], [35, 15, 12])
+    
+    for ip, c in s['sources']:
+        pct = round(c / s['total_src'] * 100, 1) if s['total_src'] > 0 else 0
+        ws_src.append([ip, c, pct])
+    
+    # CAMEMBERT Sources (Top 5)
+    pie_src = PieChart()
+    pie_src.title = "Top 5 Sources (%)"
+    pie_src.height = 12
+    pie_src.width = 18
+    
+    max_row = len(s['sources']) + 1
+    labels = Reference(ws_src, min_col=1, min_row=2, max_row=min(6, max_row))
+    data = Reference(ws_src, min_col=2, min_row=1, max_row=min(6, max_row))
+    pie_src.add_data(data, titles_from_data=True)
+    pie_src.set_categories(labels)
+    
+    ws_src.add_chart(pie_src, "E2")
+    
+    # ===== ONGLET 3 : DESTINATIONS + CAMEMBERT =====
+    ws_dst = _feuille(wb, "🔴 Destinations", ["IP Destination", "Connexions", "Pourcentage"], [35, 15, 12])
+    
+    for ip, c in s['destinations']:
+        pct = round(c / s['total_dst'] * 100, 1) if s['total_dst'] > 0 else 0
+        ws_dst.append([ip, c, pct])
+    
+    # CAMEMBERT Destinations (Top 5)
+    pie_dst = PieChart()
+    pie_dst.title = "Top 5 Destinations (%)"
+    pie_dst.height = 12
+    pie_dst.width = 18
+    
+    max_row = len(s['destinations']) + 1
+    labels = Reference(ws_dst, min_col=1, min_row=2, max_row=min(6, max_row))
+    data = Reference(ws_dst, min_col=2, min_row=1, max_row=min(6, max_row))
+    pie_dst.add_data(data, titles_from_data=True)
+    pie_dst.set_categories(labels)
+    
+    ws_dst.add_chart(pie_dst, "E2")
+    
+    # ===== ONGLET 4 : FLAGS TCP + BARRES =====
+    ws_flags = _feuille(wb, "🏴 Flags TCP", ["Flag TCP", "Paquets", "Pourcentage"], [20, 15, 12])
+    
+    for flag, c in s['flags']:
+        pct = round(c / s['total_flags'] * 100, 1) if s['total_flags'] > 0 else 0
+        ws_flags.append([flag, c, pct])
+    
+    # GRAPHIQUE EN BARRES Flags
+    bar_flags = BarChart()
+    bar_flags.title = "Répartition des Flags TCP"
+    bar_flags.y_axis.title = "Nombre de paquets"
+    bar_flags.x_axis.title = "Flag"
+    bar_flags.height = 12
+    bar_flags.width = 18
+    
+    max_row = len(s['flags']) + 1
+    labels = Reference(ws_flags, min_col=1, min_row=2, max_row=max_row)
+    data = Reference(ws_flags, min_col=2, min_row=1, max_row=max_row)
+    bar_flags.add_data(data, titles_from_data=True)
+    bar_flags.set_categories(labels)
+    
+    ws_flags.add_chart(bar_flags, "E2")
+    
+    # ===== ONGLET 5 : ERREURS + CAMEMBERT =====
+    if s['err_types']:
+        ws_err_types = _feuille(wb, "❌ Types Erreurs", ["Type d'erreur", "Occurrences"], [20, 15], "entete_erreur")
+    
+        for t, c in s['err_types'].items():
+            ws_err_types.append([t, c])
+    
+        # CAMEMBERT Erreurs
+        pie_err = PieChart()
+        pie_err.title = "Répartition des erreurs (%)"
+        pie_err.height = 12
+        pie_err.width = 18
+    
+        max_row = len(s['err_types']) + 1
+        labels = Reference(ws_err_types, min_col=1, min_row=2, max_row=max_row)
+        data = Reference(ws_err_types, min_col=2, min_row=1, max_row=max_row)
+        pie_err.add_data(data, titles_from_data=True)
+        pie_err.set_categories(labels)
+    
+        ws_err_types.add_chart(pie_err, "D2")
+    
+        # Onglet(s) détails erreurs (avec le fichier d'origine après une fusion)
+        if s['erreurs'] and 'fichier' in s['erreurs'][0]:
+            _feuilles_detail(
+                wb, "📋 Erreurs Détail", ["Fichier", "Ligne", "Type", "Message"], [25, 10, 15, 80],
+                ([e['fichier'], e['ligne'], e['type'], e['msg']] for e in s['erreurs']), "entete_erreur",
+            )
+        else:
+            _feuilles_detail(
+                wb, "📋 Erreurs Détail", ["Ligne", "Type", "Message"], [10, 15, 80],
+                ([e['ligne'], e['type'], e['msg']] for e in s['erreurs']), "entete_erreur",
+            )
+    
+    # ===== ONGLET 6 : ALERTES =====
+    if s['alertes']:
+        ws_alertes = _feuille(wb, "⚠️ Alertes", ["N°", "Alerte"], [10, 100], "entete_alerte")
+    
+        for i, a in enumerate(s['alertes'], 1):
+            ws_alertes.append([i, a])
+    
+    # ===== ONGLET 7 : CONVERSATIONS (option hotes) =====
+    if s.get('conversations'):
+        ws_conv = _feuille(wb, "🔁 Conversations", ["Hôte source", "Hôte destination", "Paquets"], [35, 35, 12])
+        
+        for a, b, c in s['conversations']:
+            ws_conv.append([a, b, c])
+    
+    # ===== ONGLET 8 : FLUX TCP (option flux) =====
+    if 'flux' in s:
+        f = s['flux']
+        ws_flux = _feuille(wb, "🔗 Flux TCP", ["Source", "Destination", "Octets", "Paquets", "Durée (s)", "État"],
+                           [30, 30, 12, 12, 12, 15])
+        
+        for ligne in f['top_octets']:
+            ws_flux.append(list(ligne))
+        ws_flux.append([])
+        for etat, c in f['etats'].items():
+            ws_flux.append([f"État {etat}", c])
+        for d, c in f['durees'].items():
+            ws_flux.append([f"Durée {d}", c])
+        for d, c in f['demi_ouverts_destinations']:
+            ws_flux.append(["Demi-ouvertes vers", d, c])
+    
+    # Sauvegarde
+    wb.save(chemin)
+
+# ============================================================================
+# MODE LIGNE DE COMMANDE (sans tkinter ni matplotlib)
+# ============================================================================
+
+EXTENSIONS_CAPTURE = (".txt", ".log", ".csv", ".dump", ".zip") + EXTENSIONS_PCAP + EXTENSIONS_COMPRESSION
+
+
+def lister_fichiers(entrees):
+    """Développe fichiers, dossiers et motifs glob en une liste de fichiers."""
+    fichiers = []
+    for entree in entrees:
+        if os.path.isdir(entree):
+            fichiers.extend(sorted(
+                p for p in Path(entree).iterdir()
+                if p.is_file() and p.suffix.lower() in EXTENSIONS_CAPTURE
+            ))
+        elif glob.has_magic(entree):
+            fichiers.extend(sorted(Path(p) for p in glob.glob(entree, recursive=True) if os.path.isfile(p)))
+        else:
+            fichiers.append(Path(entree))
+    
+    # Sans doublons, dans l'ordre
+    return list(dict.fromkeys(fichiers))
+
+
+def noms_sortie(fichiers):
+    """Nom de base des sorties de chaque fichier (suffixé si deux fichiers ont le même nom).
+
+    Le suffixe de compression est retiré : capture.txt.gz -> capture.
+    """
+    bases = [Path(f.stem).stem if f.suffix.lower() in EXTENSIONS_COMPRESSION else f.stem for f in fichiers]
+    vus = Counter(bases)
+    rangs = Counter()
+    noms = []
+    for base in bases:
+        rangs[base] += 1
+        noms.append(base if vus[base] == 1 else f"{base}_{rangs[base]}")
+    return noms
+
+
+def ecrire_sorties(stats, fichier, base, formats, profil=None):
+    """Écrit les stats d'un fichier dans chacun des formats demandés (base.json, base.md...).
+
+    Avec l'index par hôte (--par-hote), les sorties sont regroupées par hôte.
+    Avec profil (Profil), chaque export est mesuré.
+    """
+    stats = vue_par_hote(stats)
+    chemins = []
+    for fmt in formats:
+        chemin = Path(f"{base}.{fmt}")
+        with _etape(profil, f"export {fmt}") as e:
+            if fmt == "json":
+                with open(chemin, "w", encoding="utf-8") as f:
+                    json.dump({"fichier": fichier.name, **{k: v for k, v in stats.items() if k not in CLES_OBJETS}},
+                              f, ensure_ascii=False, indent=2)
+            elif fmt == "md":
+                with open(chemin, "w", encoding="utf-8") as f:
+                    f.write(rapport_markdown(stats, fichier.name))
+            elif fmt == "xlsx":
+                ecrire_excel(stats, fichier.name, chemin)
+            e["octets"] = chemin.stat().st_size
+        chemins.append(chemin)
+    return chemins
+
+
+def _ecrire_profil(profil, base, nom):
+    """--profil : base.profil.json (mesures par étape) et le tableau sur la sortie d'erreur."""
+    chemin = Path(f"{base}.profil.json")
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump({"fichier": nom, "etapes": profil.resume()}, f, ensure_ascii=False, indent=2)
+    print(f"⏱️ {nom}\n" + "\n".join(f"  {ligne}" for ligne in profil.lignes()), file=sys.stderr)
+    return chemin
+
+
+def _traiter_fichier(fichier, base, formats, nb_processus=1, cache=False, export_paquets=None, profil=False,
+                     **options):
+    """Analyse un fichier et écrit ses sorties (exécuté dans un processus fils)."""
+    if export_paquets:
+        options["export"] = export_paquets.replace("{nom}", base.name)
+    profil = Profil(memoire=profil == "memoire") if profil else None
+    analyser = analyser_avec_cache if cache else analyser_fichier
+    stats = analyser(fichier, nb_processus=nb_processus, profil=profil, **options)
+    chemins = ecrire_sorties(stats, fichier, base, formats, profil)
+    if profil is not None:
+        chemins.append(_ecrire_profil(profil, base, fichier.name))
+    return stats, chemins
+
+
+def _suivre_cli(entree, sortie, formats, intervalle, **options):
+    """Mode --suivre : réécrit les sorties à chaque rafraîchissement, jusqu'à Ctrl+C ou la fin du flux."""
+    fichier = Path("stdin" if entree == "-" else entree)
+    os.makedirs(sortie, exist_ok=True)
+    base = sortie / fichier.stem
+    
+    def rappel(stats):
+        ecrire_sorties(stats, fichier, base, formats)
+        print(f"📡 {datetime.now():%H:%M:%S} {fichier.name} : {stats['lignes']} lignes, "
+              f"{len(stats['alertes'])} alertes", file=sys.stderr)
+    
+    try:
+        stats = suivre_flux(entree, rappel, intervalle, **options)
+    except (OSError, ValueError) as e:
+        print(f"❌ {entree} : {e}", file=sys.stderr)
+        return 1
+    print(f"✅ {fichier} : {stats['lignes']} lignes, {len(stats['alertes'])} alertes → "
+          + ", ".join(f"{base}.{fmt}" for fmt in formats))
+    return 0
+
+
+def _fusion_cli(fichiers, sortie, formats, nb_processus, seuil, par_hote, profil=False, **options):
+    """Mode --fusion : un seul jeu de sorties (sortie/fusion.*) pour toutes les captures."""
+    profil = Profil(memoire=profil == "memoire") if profil else None
+    try:
+        stats, _ = analyser_fichiers(fichiers, nb_processus, seuil=seuil, profil=profil, **options)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    if not par_hote:
+        stats = {k: v for k, v in stats.items() if k != "index"}
+    chemins = ecrire_sorties(stats, Path("fusion"), sortie / "fusion", formats, profil)
+    if profil is not None:
+        chemins.append(_ecrire_profil(profil, sortie / "fusion", "fusion"))
+    print(f"✅ {len(fichiers)} fichiers : {stats['lignes']} lignes, {len(stats['alertes'])} alertes → "
+          + ", ".join(str(c) for c in chemins))
+    for c in stats["comparaisons"]:
+        print(f"🔀 {c['avant']} → {c['apres']} : {len(c['nouveaux_hotes'])} nouveaux hôtes, "
+              f"{len(c['variations'])} variations, {len(c['alertes_apparues'])} alertes apparues")
+    return 0
+
+
+def main_cli(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(
+        description="SAE 1.05 - Analyseur réseau en ligne de commande (sans interface)."
+    )
+    parser.add_argument("entrees", nargs="+", help="fichiers, dossiers ou motifs glob (ex. 'captures/*.txt')")
+    parser.add_argument("-f", "--format", dest="formats", action="append", choices=["json", "md", "xlsx"],
+                        help="format de sortie (répétable, défaut : json)")
+    parser.add_argument("-o", "--sortie", default=".", help="dossier de sortie (défaut : dossier courant)")
+    parser.add_argument("--hexa", action="store_true",
+                        help="décode aussi les blocs hexa (IP exactes, protocoles, volumes)")
+    parser.add_argument("--fenetre", type=float, metavar="SECONDES",
+                        help="évalue aussi les alertes sur une fenêtre glissante de cette durée")
+    parser.add_argument("--esquisse", type=int, metavar="K",
+                        help="mémoire bornée : top sources/destinations estimé avec K compteurs, distincts par HyperLogLog")
+    parser.add_argument("--par-hote", action="store_true",
+                        help="regroupe sources et destinations par hôte (ports confondus) ; ajoute conversations et ports")
+    parser.add_argument("--export-paquets", metavar="CHEMIN",
+                        help="écrit tous les paquets (.csv.gz, ou .parquet si pyarrow est installé) ; "
+                             "avec plusieurs fichiers, {nom} est remplacé par le nom du fichier")
+    parser.add_argument("--motifs-erreur", metavar="MOTS",
+                        help="mots d'erreur séparés par des virgules (défaut : " + ",".join(MOTS_ERREUR) + ")")
+    parser.add_argument("--regles", metavar="FICHIER.json",
+                        help="règles d'alerte (seuils, motifs, listes d'hôtes, fenêtre) ajoutées aux règles intégrées "
+                             "ou à leur place (\"defaut\": false)")
+    parser.add_argument("--max-erreurs", type=int, default=MAX_ERREURS, metavar="N",
+                        help=f"erreurs gardées en détail (défaut : {MAX_ERREURS}) ; les comptes restent exacts")
+    parser.add_argument("--echantillon-erreurs", action="store_true",
+                        help="garde un échantillon uniforme des erreurs au lieu des premières")
+    parser.add_argument("--flux", type=float, nargs="?", const=EXPIRATION_FLUX, metavar="SECONDES",
+                        help="suit les connexions TCP (poignée de main, fermeture, durées, demi-ouvertes) ; "
+                             f"un flux inactif depuis SECONDES (défaut : {EXPIRATION_FLUX:g}) est retiré de la table")
+    parser.add_argument("--fusion", action="store_true",
+                        help="fusionne toutes les entrées en un résultat (base 'fusion') avec la comparaison "
+                             "de chaque capture à la précédente")
+    parser.add_argument("--variation", type=float, default=SEUIL_VARIATION * 100, metavar="PCT",
+                        help=f"avec --fusion : variation de volume signalée (défaut : {SEUIL_VARIATION * 100:g} %%)")
+    parser.add_argument("--cache", action="store_true",
+                        help=f"réutilise les analyses précédentes (dossier {DOSSIER_CACHE}, variable ANALYSEUR_CACHE)")
+    parser.add_argument("--suivre", action="store_true",
+                        help="suit une capture qui grandit (tcpdump -l) ou stdin (-) et réécrit les sorties")
+    parser.add_argument("--intervalle", type=float, default=5.0, metavar="SECONDES",
+                        help="avec --suivre : délai minimal entre deux réécritures (défaut : 5)")
+    parser.add_argument("--profil", action="store_true",
+                        help="mesure chaque étape (durée, volumes, débit) : base.profil.json")
+    parser.add_argument("--profil-memoire", action="store_true",
+                        help="comme --profil, avec le pic mémoire de chaque étape (tracemalloc : "
+                             "ralentit nettement l'analyse, les durées ne sont plus représentatives)")
+    parser.add_argument("--cprofile", metavar="FICHIER",
+                        help="profil cProfile de toute l'exécution (processus principal), à lire avec pstats")
+    parser.add_argument("-j", "--processus", type=int, default=os.cpu_count() or 1,
+                        help="nombre de processus (défaut : nombre de cœurs)")
+    args = parser.parse_args(argv)
+    if args.profil_memoire:
+        args.profil = "memoire"
+    
+    if args.cprofile:
+        import cProfile
+        profileur = cProfile.Profile()
+        try:
+            return profileur.runcall(_executer_cli, parser, args)
+        finally:
+            profileur.dump_stats(args.cprofile)
+    return _executer_cli(parser, args)
+
+
+def _executer_cli(parser, args):
+    """Suite de main_cli, une fois les arguments lus (profilable d'un bloc)."""
+    formats = list(dict.fromkeys(args.formats or ["json"]))
+    options = {"hexa": args.hexa, "fenetre": args.fenetre, "esquisse": args.esquisse,
+               "hotes": args.par_hote, "max_erreurs": args.max_erreurs, "echantillon": args.echantillon_erreurs,
+               "motifs": args.motifs_erreur.split(",") if args.motifs_erreur else None, "flux": args.flux}
+    if args.regles:
+        try:
+            config = charger_regles(args.regles)
+        except (OSError, ValueError) as e:
+            parser.error(f"--regles : {e}")
+        # Les options de la ligne de commande passent avant celles du fichier
+        options["regles"] = config["regles"]
+        if options["fenetre"] is None:
+            options["fenetre"] = config.get("fenetre")
+        if options["motifs"] is None:
+            options["motifs"] = config.get("mots_erreur")
+    if args.suivre:
+        if len(args.entrees) != 1:
+            parser.error("--suivre prend une seule entrée (fichier ou -)")
+        if args.export_paquets:
+            options["export"] = args.export_paquets.replace("{nom}", Path(args.entrees[0]).stem or "stdin")
+        return _suivre_cli(args.entrees[0], Path(args.sortie), formats, args.intervalle, **options)
+    if args.fusion and args.export_paquets:
+        parser.error("--export-paquets n'est pas disponible avec --fusion")
+    if args.fusion and args.cache:
+        parser.error("--cache n'est pas disponible avec --fusion (chaque capture est relue)")
+    fichiers = lister_fichiers(args.entrees)
+    if not fichiers:
+        parser.error("aucun fichier à analyser")
+    if args.export_paquets and len(fichiers) > 1 and "{nom}" not in args.export_paquets:
+        parser.error("--export-paquets avec plusieurs fichiers : mettre {nom} dans le chemin")
+    os.makedirs(args.sortie, exist_ok=True)
+    if args.fusion:
+        return _fusion_cli(fichiers, Path(args.sortie), formats, args.processus, args.variation / 100,
+                           args.par_hote, args.profil, **options)
+    bases = [Path(args.sortie) / nom for nom in noms_sortie(fichiers)]
+    
+    echecs = 0
+    if len(fichiers) == 1 or args.processus <= 1:
+        # Un seul fichier : le parallélisme se fait à l'intérieur du fichier
+        resultats = []
+        for fichier, base in zip(fichiers, bases):
+            try:
+                res = _traiter_fichier(fichier, base, formats, args.processus, args.cache,
+                                       args.export_paquets, args.profil, **options)
+                resultats.append((fichier, res, None))
+            except Exception as e:
+                resultats.append((fichier, None, e))
+    else:
+        # Plusieurs fichiers : un fichier par processus
+        from concurrent.futures import ProcessPoolExecutor
+        
+        with ProcessPoolExecutor(max_workers=min(args.processus, len(fichiers))) as pool:
+            futures = [(f, pool.submit(_traiter_fichier, f, b, formats, 1, args.cache, args.export_paquets, args.profil, **options)) for f, b in zip(fichiers, bases)]
+            resultats = []
+            for fichier, fut in futures:
+                try:
+                    resultats.append((fichier, fut.result(), None))
+                except Exception as e:
+                    resultats.append((fichier, None, e))
+    
+    for fichier, res, erreur in resultats:
+        if erreur:
+            echecs += 1
+            print(f"❌ {fichier} : {erreur}", file=sys.stderr)
+            continue
+        stats, chemins = res
+        print(f"✅ {fichier} : {stats['lignes']} lignes, {len(stats['alertes'])} alertes → "
+              + ", ".join(str(c) for c in chemins))
+    
+    return 1 if echecs else 0
+
 
 # ============================================================================
 # INTERFACE GRAPHIQUE AVEC GRAPHIQUES
 # ============================================================================
 
+class TableVirtuelle:
+    """Table triable d'un nombre quelconque de lignes (ttk.Treeview virtualisé).
+    
+    Le Treeview ne contient jamais plus de LIGNES_TABLE éléments : la barre
+    de défilement et la molette déplacent une fenêtre sur la liste des
+    lignes, et seules les lignes visibles sont converties en texte.
+    valeurs(ligne) donne le tuple des colonnes (nombres bruts pour le tri).
+    """
+    
+    def __init__(self, parent, colonnes, valeurs, hauteur=LIGNES_TABLE):
+        self.valeurs = valeurs
+        self.hauteur = hauteur
+        self.lignes = []
+        self.debut = 0
+        self.tri = None  # (colonne, décroissant)
+        self.source = None  # données chargées (pour ne pas recharger)
+        
+        self.frame = tk.Frame(parent, bg="#ecf0f1")
+        self.ids = [c for c, _, _ in colonnes]
+        self.titres = {c: titre for c, titre, _ in colonnes}
+        self.tree = ttk.Treeview(self.frame, columns=self.ids, show="headings",
+                                 height=hauteur, selectmode="browse")
+        for c, titre, largeur in colonnes:
+            self.tree.heading(c, text=titre, command=lambda c=c: self.trier(c))
+            self.tree.column(c, width=largeur, stretch=(c == self.ids[-1]))
+        self.barre = tk.Scrollbar(self.frame, command=self.defiler)
+        self.barre.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        self.tree.bind("<MouseWheel>", lambda e: self.aller(self.debut - e.delta // 40))
+        self.tree.bind("<Button-4>", lambda e: self.aller(self.debut - 3))
+        self.tree.bind("<Button-5>", lambda e: self.aller(self.debut + 3))
+        self.tree.bind("<Prior>", lambda e: self.aller(self.debut - self.hauteur))
+        self.tree.bind("<Next>", lambda e: self.aller(self.debut + self.hauteur))
+        self.tree.bind("<Home>", lambda e: self.aller(0))
+        self.tree.bind("<End>", lambda e: self.aller(len(self.lignes)))
+    
+    def charger(self, lignes, source=None):
+        """Remplace les lignes (liste, non copiée) et revient en haut."""
+        self.lignes = lignes
+        self.source = source
+        self.debut = 0
+        self.tri = None
+        for c in self.ids:
+            self.tree.heading(c, text=self.titres[c])
+        self.rafraichir()
+    
+    def montrer_colonnes(self, colonnes):
+        """N'affiche que ces colonnes (les valeurs gardent toutes les colonnes)."""
+        self.tree["displaycolumns"] = colonnes
+    
+    def trier(self, colonne):
+        """Trie sur une colonne ; un second clic inverse l'ordre."""
+        decroissant = self.tri == (colonne, False)
+        k = self.ids.index(colonne)
+        valeurs = self.valeurs
+        self.lignes = sorted(self.lignes, key=lambda l: valeurs(l)[k], reverse=decroissant)
+        self.tri = (colonne, decroissant)
+        for c in self.ids:
+            fleche = (" ▼" if decroissant else " ▲") if c == colonne else ""
+            self.tree.heading(c, text=self.titres[c] + fleche)
+        self.debut = 0
+        self.rafraichir()
+    
+    def defiler(self, action, quantite, unite=None):
+        """Commande de la barre de défilement (moveto / scroll)."""
+        if action == "moveto":
+            self.aller(int(float(quantite) * len(self.lignes)))
+        else:
+            pas = self.hauteur if unite == "pages" else 1
+            self.aller(self.debut + int(quantite) * pas)
+    
+    def aller(self, debut):
+        debut = max(0, min(debut, len(self.lignes) - self.hauteur))
+        if debut != self.debut:
+            self.debut = debut
+            self.rafraichir()
+        return "break"
+    
+    def rafraichir(self):
+        """Recrée les seules lignes visibles et recale la barre."""
+        self.tree.delete(*self.tree.get_children())
+        visibles = self.lignes[self.debut:self.debut + self.hauteur]
+        for ligne in visibles:
+            self.tree.insert("", tk.END, values=self.valeurs(ligne))
+        n = len(self.lignes)
+        if n:
+            self.barre.set(self.debut / n, (self.debut + len(visibles)) / n)
+        else:
+            self.barre.set(0, 1)
+
+
 class AnalyseurApp:
     def __init__(self, root):
         self.root = root
@@ -116,6 +3509,13 @@ class AnalyseurApp:
         self.stats = None
         self.fichier = None
         
+        # Graphiques : figure unique, créée au premier affichage puis réutilisée
+        self.figure = None
+        self.canvas = None
+        self.axes = {}
+        self.donnees_graphiques = {}
+        self.barres_flags = None
+        
         # Frame principal avec scrollbar
         main_canvas = tk.Canvas(root, bg="#2c3e50")
         scrollbar = tk.Scrollbar(root, orient="vertical", command=main_canvas.yview)
@@ -156,6 +3556,96 @@ class AnalyseurApp:
         )
         self.btn_upload.pack(pady=10)
         
+        # Mesure des étapes (analyse, graphiques, exports), affichée en fin de résumé
+        self.profil = None
+        self.var_profil = tk.BooleanVar(value=False)
+        self.chk_profil = tk.Checkbutton(
+            self.scrollable_frame,
+            text="⏱️ Mesurer chaque étape (durée, débit)",
+            variable=self.var_profil,
+            font=("Arial", 10),
+            bg="#2c3e50",
+            fg="white",
+            selectcolor="#34495e",
+            activebackground="#2c3e50"
+        )
+        self.chk_profil.pack()
+        
+        # Suivi des connexions TCP (poignée de main, durées, demi-ouvertes)
+        self.var_flux = tk.BooleanVar(value=False)
+        self.chk_flux = tk.Checkbutton(
+            self.scrollable_frame,
+            text="🔗 Suivre les connexions TCP",
+            variable=self.var_flux,
+            font=("Arial", 10),
+            bg="#2c3e50",
+            fg="white",
+            selectcolor="#34495e",
+            activebackground="#2c3e50"
+        )
+        self.chk_flux.pack()
+        
+        # Fichier de règles d'alerte (charger_regles) appliqué aux analyses suivantes
+        self.config_regles = None
+        self.btn_regles = tk.Button(
+            self.scrollable_frame,
+            text="📜 Règles d'alerte : intégrées",
+            font=("Arial", 10),
+            bg="#34495e",
+            fg="white",
+            command=self.choisir_regles,
+            cursor="hand2"
+        )
+        self.btn_regles.pack(pady=5)
+        
+        self.btn_suivre = tk.Button(
+            self.scrollable_frame,
+            text="📡 Suivre une capture en cours (tcpdump -l)",
+            font=("Arial", 11),
+            bg="#34495e",
+            fg="white",
+            command=self.suivre_fichier,
+            cursor="hand2"
+        )
+        self.btn_suivre.pack(pady=5)
+        
+        self.btn_fusion = tk.Button(
+            self.scrollable_frame,
+            text="🔀 Fusionner et comparer plusieurs captures",
+            font=("Arial", 11),
+            bg="#34495e",
+            fg="white",
+            command=self.fusionner_fichiers,
+            cursor="hand2"
+        )
+        self.btn_fusion.pack(pady=5)
+        
+        # Progression de l'analyse en cours (affichée seulement pendant l'analyse)
+        self.tache = None
+        self.progress_frame = tk.Frame(self.scrollable_frame, bg="#2c3e50")
+        
+        self.progress = ttk.Progressbar(self.progress_frame, length=400, mode="determinate", maximum=100)
+        self.progress.pack(side=tk.LEFT, padx=5)
+        
+        self.lbl_progress = tk.Label(
+            self.progress_frame,
+            text="",
+            font=("Arial", 11),
+            bg="#2c3e50",
+            fg="white"
+        )
+        self.lbl_progress.pack(side=tk.LEFT, padx=5)
+        
+        self.btn_annuler = tk.Button(
+            self.progress_frame,
+            text="✖ Annuler",
+            font=("Arial", 11, "bold"),
+            bg="#e74c3c",
+            fg="white",
+            command=self.annuler_analyse
+        )
+        self.btn_annuler.pack(side=tk.LEFT, padx=5)
+        
         # Frame pour graphiques
         self.graph_frame = tk.Frame(self.scrollable_frame, bg="#2c3e50")
         
@@ -180,6 +3670,32 @@ class AnalyseurApp:
         self.txt_result.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         txt_scrollbar.config(command=self.txt_result.yview)
         
+        # Tables détaillées (toutes les lignes, triables) : un onglet par table,
+        # remplie seulement quand son onglet est affiché
+        self.tables_frame = tk.Frame(self.scrollable_frame, bg="#ecf0f1", relief=tk.RAISED, bd=2)
+        self.onglets = ttk.Notebook(self.tables_frame)
+        self.onglets.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.totaux = {}
+        self.tables = {}
+        for cle, titre, colonnes, valeurs in (
+            ("sources", "🔵 Sources",
+             [("adresse", "Adresse", 400), ("paquets", "Paquets", 120), ("pct", "%", 80)],
+             lambda l: (l[0], l[1], self.pourcentage(l[1], 'total_src'))),
+            ("destinations", "🔴 Destinations",
+             [("adresse", "Adresse", 400), ("paquets", "Paquets", 120), ("pct", "%", 80)],
+             lambda l: (l[0], l[1], self.pourcentage(l[1], 'total_dst'))),
+            ("flags", "🚩 Flags",
+             [("flag", "Flag", 200), ("paquets", "Paquets", 120), ("pct", "%", 80)],
+             lambda l: (l[0], l[1], self.pourcentage(l[1], 'total_flags'))),
+            ("erreurs", "❌ Erreurs",
+             [("fichier", "Fichier", 200), ("ligne", "Ligne", 90), ("type", "Type", 110), ("msg", "Message", 800)],
+             lambda e: (e.get("fichier", ""), e["ligne"], e["type"], e["msg"])),
+        ):
+            table = TableVirtuelle(self.onglets, colonnes, valeurs)
+            self.onglets.add(table.frame, text=titre)
+            self.tables[cle] = table
+        self.onglets.bind("<<NotebookTabChanged>>", lambda e: self.afficher_tables())
+        
         # Boutons export
         self.export_frame = tk.Frame(self.scrollable_frame, bg="#2c3e50")
         
@@ -207,10 +3723,40 @@ class AnalyseurApp:
         )
         self.btn_md.pack(side=tk.LEFT, padx=5)
         
+        # Regroupement par hôte (index de l'analyse, sans relire le fichier)
+        self.var_par_hote = tk.BooleanVar(value=True)
+        self.chk_par_hote = tk.Checkbutton(
+            self.export_frame,
+            text="🏠 Regrouper par hôte (ports confondus)",
+            variable=self.var_par_hote,
+            font=("Arial", 11),
+            bg="#2c3e50",
+            fg="white",
+            selectcolor="#34495e",
+            activebackground="#2c3e50",
+            command=self.changer_vue
+        )
+        self.chk_par_hote.pack(side=tk.LEFT, padx=15)
+        
+        # Ombres et parts éclatées : coûteuses au rendu, désactivables
+        self.var_effets = tk.BooleanVar(value=EFFETS_GRAPHIQUES)
+        self.chk_effets = tk.Checkbutton(
+            self.export_frame,
+            text="✨ Effets graphiques",
+            variable=self.var_effets,
+            font=("Arial", 11),
+            bg="#2c3e50",
+            fg="white",
+            selectcolor="#34495e",
+            activebackground="#2c3e50",
+            command=self.changer_vue
+        )
+        self.chk_effets.pack(side=tk.LEFT, padx=5)
+        
         # Message initial
         msg = tk.Label(
             self.scrollable_frame,
-            text="👉 Clique sur 'Sélectionner un fichier' pour commencer\nFormats : .txt, .log, .csv, .dump",
+            text="👉 Clique sur 'Sélectionner un fichier' pour commencer\nFormats : .txt, .log, .csv, .dump, .pcap, .pcapng",
             font=("Arial", 12),
             bg="#ecf0f1",
             fg="#2c3e50",
@@ -226,6 +3772,8 @@ class AnalyseurApp:
                 ("Fichiers log", "*.log"),
                 ("Fichiers CSV", "*.csv"),
                 ("Fichiers dump", "*.dump"),
+                ("Captures pcap", "*.pcap *.pcapng *.cap"),
+                ("Captures compressées", "*.gz *.bz2 *.xz *.zst *.zip"),
                 ("Tous les fichiers", "*.*")
             ]
         )
@@ -233,98 +3781,280 @@ class AnalyseurApp:
         if not chemin:
             return
         
-        self.fichier = Path(chemin)
+        self.lancer_analyse(Path(chemin))
+    
+    def choisir_regles(self):
+        """Charge un fichier de règles d'alerte ; Annuler revient aux règles intégrées."""
+        chemin = filedialog.askopenfilename(title="Règles d'alerte",
+                                            filetypes=[("Règles JSON", "*.json"), ("Tous les fichiers", "*.*")])
+        if not chemin:
+            self.config_regles = None
+            self.btn_regles.config(text="📜 Règles d'alerte : intégrées")
+            return
+        try:
+            self.config_regles = charger_regles(chemin)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("❌ Erreur", f"Règles invalides :\n{e}")
+            return
+        nb = len(self.config_regles["regles"])
+        self.btn_regles.config(text=f"📜 Règles d'alerte : {Path(chemin).name} ({nb} règles)")
+    
+    def options_analyse(self):
+        """Options communes des analyses lancées depuis la fenêtre (flux TCP, règles d'alerte)."""
+        options = {"flux": EXPIRATION_FLUX if self.var_flux.get() else None}
+        if self.config_regles is not None:
+            options.update(regles=self.config_regles["regles"], fenetre=self.config_regles.get("fenetre"),
+                           motifs=self.config_regles.get("mots_erreur"))
+        return options
+    
+    def lancer_analyse(self, fichier):
+        """Lance l'analyse en tâche de fond ; le résultat précédent reste affiché."""
+        if self.tache:
+            self.tache.annuler()
+        
+        self.profil = Profil() if self.var_profil.get() else None
+        self.tache = TacheAnalyse(fichier, cache=True, nb_processus=None, hexa=True, hotes=True, profil=self.profil,
+                                  **self.options_analyse())
+        self.tache.start()
+        
+        self.arreter_defilement()
+        self.progress["value"] = 0
+        self.lbl_progress.config(text=f"⏳ Analyse de {fichier.name}...")
+        self.progress_frame.pack(pady=5, after=self.btn_fusion)
+        self.root.after(100, self.suivre_analyse, self.tache)
+    
+    def fusionner_fichiers(self):
+        """Analyse plusieurs captures ensemble : compteurs fusionnés et différences de l'une à l'autre."""
+        chemins = filedialog.askopenfilenames(title="Captures à fusionner (dans l'ordre)")
+        if len(chemins) < 2:
+            return
+        if self.tache:
+            self.tache.annuler()
+        
+        self.profil = Profil() if self.var_profil.get() else None
+        self.tache = TacheFusion([Path(c) for c in chemins], nb_processus=None, hexa=True, profil=self.profil,
+                                 **self.options_analyse())
+        self.tache.start()
+        
+        self.arreter_defilement()
+        self.progress["value"] = 0
+        self.lbl_progress.config(text=f"⏳ Fusion de {len(chemins)} captures...")
+        self.progress_frame.pack(pady=5, after=self.btn_fusion)
+        self.root.after(100, self.suivre_analyse, self.tache)
+    
+    def suivre_fichier(self):
+        """Suit un fichier qui grandit ; le résumé et les graphiques sont rafraîchis au fil de l'eau."""
+        chemin = filedialog.askopenfilename(title="Capture à suivre")
+        if not chemin:
+            return
+        if self.tache:
+            self.tache.annuler()
+        
+        self.profil = None
+        self.tache = TacheSuivi(Path(chemin), hexa=True, hotes=True, **self.options_analyse())
+        self.tache.start()
+        
+        self.progress.config(mode="indeterminate")
+        self.progress.start()
+        self.lbl_progress.config(text=f"📡 Suivi de {Path(chemin).name}...")
+        self.progress_frame.pack(pady=5, after=self.btn_fusion)
+        self.root.after(int(INTERVALLE_SUIVI * 1000), self.rafraichir_suivi, self.tache, None)
+    
+    def arreter_defilement(self):
+        """Remet la barre de progression en mode déterminé (après un suivi)."""
+        self.progress.stop()
+        self.progress.config(mode="determinate")
+    
+    def rafraichir_suivi(self, tache, affichees):
+        """Affiche le dernier instantané du suivi (au rythme de INTERVALLE_SUIVI)."""
+        if tache is not self.tache:
+            if not isinstance(self.tache, TacheSuivi):
+                self.arreter_defilement()  # un nouveau suivi garde sa barre défilante
+            return
+        
+        stats = tache.stats
+        if stats is not None and stats is not affichees:
+            self.fichier = tache.chemin
+            self.stats = stats
+            self.afficher_resultats()
+            self.afficher_tables()
+            if charger_matplotlib():
+                self.afficher_graphiques()
+            self.graph_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+            self.result_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+            self.tables_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+            self.export_frame.pack(pady=10)
+            self.lbl_progress.config(text=f"📡 Suivi de {tache.chemin.name} : {stats['lignes']} lignes")
+        
+        if tache.is_alive():
+            self.root.after(int(INTERVALLE_SUIVI * 1000), self.rafraichir_suivi, tache, stats)
+            return
+        
+        self.tache = None
+        self.arreter_defilement()
+        self.progress_frame.pack_forget()
+        if tache.erreur:
+            messagebox.showerror("❌ Erreur", f"Impossible de suivre :\n{tache.erreur}")
+    
+    def annuler_analyse(self):
+        if self.tache:
+            self.tache.annuler()
+    
+    def suivre_analyse(self, tache):
+        """Interroge la tâche depuis la boucle Tk (jamais depuis le thread)."""
+        if tache is not self.tache:
+            return  # remplacée par une analyse plus récente
+        
+        if tache.is_alive():
+            if tache.total:
+                self.progress["value"] = tache.octets * 100 / tache.total
+            self.root.after(100, self.suivre_analyse, tache)
+            return
+        
+        self.tache = None
+        self.progress_frame.pack_forget()
+        
+        if isinstance(tache.erreur, AnalyseAnnulee):
+            return
+        if tache.erreur:
+            messagebox.showerror("❌ Erreur", f"Impossible d'analyser :\n{tache.erreur}")
+            return
         
+        self.fichier = tache.chemin
+        self.stats = tache.stats
         try:
-            self.stats = analyser_fichier(self.fichier)
             self.afficher_resultats()
-            if MATPLOTLIB_OK:
+            self.afficher_tables()
+            if charger_matplotlib():
                 self.afficher_graphiques()
             self.graph_frame.pack(fill=tk.BOTH, expand=True, pady=10)
             self.result_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+            self.tables_frame.pack(fill=tk.BOTH, expand=True, pady=10)
             self.export_frame.pack(pady=10)
             messagebox.showinfo("✅ Succès", "Analyse terminée !")
         except Exception as e:
             messagebox.showerror("❌ Erreur", f"Impossible d'analyser :\n{e}")
     
+    def vue(self):
+        """Les stats affichées et exportées : par hôte si la case est cochée."""
+        return vue_par_hote(self.stats) if self.var_par_hote.get() else self.stats
+    
+    def changer_vue(self):
+        if not self.stats:
+            return
+        self.afficher_resultats()
+        self.afficher_tables()
+        if charger_matplotlib():
+            self.afficher_graphiques()
+    
     def afficher_graphiques(self):
-        """Affiche les graphiques (camemberts + barres)."""
-        for widget in self.graph_frame.winfo_children():
-            widget.destroy()
-        
-        s = self.stats
-        
-        # Figure avec 4 graphiques
-        fig = Figure(figsize=(14, 10), facecolor='#ecf0f1')
-        
-        # 1. Sources (Top 5) - Camembert
-        ax1 = fig.add_subplot(2, 2, 1)
-        if s['sources']:
-            labels = [ip[:20] for ip, _ in s['sources'][:5]]
-            values = [c for _, c in s['sources'][:5]]
-            colors = ['#3498db', '#2ecc71', '#f39c12', '#e74c3c', '#9b59b6']
-            explode = (0.1, 0, 0, 0, 0)
-            
-            ax1.pie(values, labels=labels, autopct='%1.1f%%', colors=colors, 
-                   explode=explode, shadow=True, startangle=90)
-            ax1.set_title('Top 5 Sources (%)', fontsize=14, fontweight='bold')
-        
-        # 2. Destinations (Top 5) - Camembert
-        ax2 = fig.add_subplot(2, 2, 2)
-        if s['destinations']:
-            labels = [ip[:20] for ip, _ in s['destinations'][:5]]
-            values = [c for _, c in s['destinations'][:5]]
-            colors = ['#e74c3c', '#f39c12', '#3498db', '#2ecc71', '#9b59b6']
-            explode = (0.1, 0, 0, 0, 0)
-            
-            ax2.pie(values, labels=labels, autopct='%1.1f%%', colors=colors,
-                   explode=explode, shadow=True, startangle=90)
-            ax2.set_title('Top 5 Destinations (%)', fontsize=14, fontweight='bold')
-        
-        # 3. Flags TCP - Barres horizontales
-        ax3 = fig.add_subplot(2, 2, 3)
-        if s['flags']:
-            flags_labels = [f for f, _ in s['flags'][:6]]
-            flags_values = [c for _, c in s['flags'][:6]]
-            
-            ax3.barh(flags_labels, flags_values, color='#3498db')
-            ax3.set_xlabel('Nombre de paquets', fontweight='bold')
-            ax3.set_title('Flags TCP (Top 6)', fontsize=14, fontweight='bold')
-            ax3.grid(axis='x', alpha=0.3)
-        
-        # 4. Types d'erreurs - Camembert
-        ax4 = fig.add_subplot(2, 2, 4)
-        if s['err_types']:
-            labels = list(s['err_types'].keys())
-            values = list(s['err_types'].values())
-            colors = ['#e74c3c', '#f39c12', '#e67e22', '#c0392b']
-            
-            ax4.pie(values, labels=labels, autopct='%1.1f%%', colors=colors,
-                   shadow=True, startangle=90)
-            ax4.set_title('Types d\'erreurs (%)', fontsize=14, fontweight='bold')
-        else:
-            ax4.text(0.5, 0.5, '✅ Aucune erreur', 
-                    ha='center', va='center', fontsize=16, color='#2ecc71')
-            ax4.set_title('Types d\'erreurs', fontsize=14, fontweight='bold')
-            ax4.axis('off')
+        """Met à jour les graphiques (camemberts + barres).
+        
+        La figure et son canevas sont créés une seule fois ; seuls les graphiques
+        dont les données ont changé sont redessinés, et le canevas n'est rendu
+        que s'il y a eu un changement (rafraîchissements du mode suivi).
+        """
+        s = self.vue()
+        effets = self.var_effets.get()
+        
+        # Ce qui est réellement tracé, par graphique
+        donnees = {
+            'sources': (tuple(s['sources'][:5]), effets),
+            'destinations': (tuple(s['destinations'][:5]), effets),
+            'flags': tuple(s['flags'][:6]),
+            'erreurs': (tuple(s['err_types'].items()), effets),
+        }
         
-        fig.tight_layout()
+        if self.figure is None:
+            # Figure avec 4 graphiques, marges fixes (pas de tight_layout à chaque rendu)
+            self.figure = Figure(figsize=(14, 10), facecolor='#ecf0f1')
+            axes = self.figure.subplots(2, 2).flat
+            self.axes = dict(zip(donnees, axes))
+            self.figure.subplots_adjust(left=0.1, right=0.95, top=0.95, bottom=0.06, hspace=0.3, wspace=0.3)
+            self.canvas = FigureCanvasTkAgg(self.figure, master=self.graph_frame)
+            self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        
+        modifies = [nom for nom in donnees if self.donnees_graphiques.get(nom) != donnees[nom]]
+        if not modifies:
+            return
+        
+        with _etape(self.profil, "graphiques"):
+            for nom in modifies:
+                ax = self.axes[nom]
+                if nom == 'sources':
+                    # 1. Sources (Top 5) - Camembert
+                    self._camembert(ax, s['sources'][:5], 'Top 5 Sources (%)',
+                                    ['#3498db', '#2ecc71', '#f39c12', '#e74c3c', '#9b59b6'], effets)
+                elif nom == 'destinations':
+                    # 2. Destinations (Top 5) - Camembert
+                    self._camembert(ax, s['destinations'][:5], 'Top 5 Destinations (%)',
+                                    ['#e74c3c', '#f39c12', '#3498db', '#2ecc71', '#9b59b6'], effets)
+                elif nom == 'flags':
+                    # 3. Flags TCP - Barres horizontales
+                    self._barres_flags(ax, s['flags'][:6])
+                else:
+                    # 4. Types d'erreurs - Camembert
+                    self._camembert(ax, list(s['err_types'].items()), 'Types d\'erreurs (%)',
+                                    ['#e74c3c', '#f39c12', '#e67e22', '#c0392b'], effets, eclater=False)
+                    if not s['err_types']:
+                        ax.text(0.5, 0.5, '✅ Aucune erreur',
+                                ha='center', va='center', fontsize=16, color='#2ecc71')
+                        ax.set_title('Types d\'erreurs', fontsize=14, fontweight='bold')
+                        ax.axis('off')
+            
+            self.donnees_graphiques = donnees
+            if self.profil is None:
+                self.canvas.draw_idle()
+            else:
+                self.canvas.draw()  # rendu immédiat, pour qu'il soit mesuré
+        self.afficher_profil()
+    
+    @staticmethod
+    def _camembert(ax, elements, titre, couleurs, effets, eclater=True):
+        """Retrace un camembert ; ombre et part éclatée seulement si effets."""
+        ax.clear()
+        ax.axis('on')
+        if not elements:
+            return
+        labels = [str(nom)[:20] for nom, _ in elements]
+        values = [c for _, c in elements]
+        explode = [0.1] + [0] * (len(values) - 1) if effets and eclater else None
+        ax.pie(values, labels=labels, autopct='%1.1f%%', colors=couleurs,
+               explode=explode, shadow=effets, startangle=90)
+        ax.set_title(titre, fontsize=14, fontweight='bold')
+    
+    def _barres_flags(self, ax, flags):
+        """Barres des flags : mêmes flags -> longueurs mises à jour sur place."""
+        labels = [f for f, _ in flags]
+        values = [c for _, c in flags]
+        if self.barres_flags is not None and labels == self.barres_flags[0]:
+            for barre, valeur in zip(self.barres_flags[1], values):
+                barre.set_width(valeur)
+            ax.relim()
+            ax.autoscale_view()
+            return
         
-        canvas = FigureCanvasTkAgg(fig, master=self.graph_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        ax.clear()
+        self.barres_flags = None
+        if flags:
+            barres = ax.barh(labels, values, color='#3498db')
+            ax.set_xlabel('Nombre de paquets', fontweight='bold')
+            ax.set_title('Flags TCP (Top 6)', fontsize=14, fontweight='bold')
+            ax.grid(axis='x', alpha=0.3)
+            self.barres_flags = (labels, barres)
     
     def afficher_resultats(self):
         """Affiche le résumé texte."""
-        s = self.stats
+        s = self.vue()
         self.txt_result.delete("1.0", tk.END)
         
         self.txt_result.insert(tk.END, "═" * 120 + "\n")
         self.txt_result.insert(tk.END, f"  📊 RÉSUMÉ - {self.fichier.name}\n")
         self.txt_result.insert(tk.END, "═" * 120 + "\n\n")
         
-        self.txt_result.insert(tk.END, f"📈 Lignes : {s['lignes']} | Sources : {len(s['sources'])} | Destinations : {len(s['destinations'])} | ")
-        self.txt_result.insert(tk.END, f"Erreurs : {len(s['erreurs'])} | Alertes : {len(s['alertes'])}\n\n")
+        approx = "≈" if 'esquisse' in s or 'elague' in s else ""
+        self.txt_result.insert(tk.END, f"📈 Lignes : {s['lignes']} | Sources : {approx}{s['sources_distinctes']} | Destinations : {approx}{s['destinations_distinctes']} | ")
+        self.txt_result.insert(tk.END, f"Erreurs : {s['nb_erreurs']} | Alertes : {len(s['alertes'])}\n\n")
         
         # Sources avec %
         self.txt_result.insert(tk.END, "🔵 TOP SOURCES\n")
@@ -337,33 +4067,101 @@ class AnalyseurApp:
             pct = round(c / s['total_dst'] * 100, 1) if s['total_dst'] > 0 else 0
             self.txt_result.insert(tk.END, f"  {i:2d}. {ip:40s} : {c:6d} ({pct:5.1f}%)\n")
         
+        if 'ip_sources' in s:
+            protos = ", ".join(f"{p} : {c}" for p, c in s['protocoles'].items())
+            self.txt_result.insert(tk.END, f"\n🌐 IP EXACTES (blocs hexa) - {s['paquets_hexa']} paquets ({protos}), ")
+            self.txt_result.insert(tk.END, f"{s['octets_ip']} octets IP dont {s['octets_utiles']} utiles\n")
+            volumes = dict(s['volume_sources'])
+            for i, (ip, c) in enumerate(s['ip_sources'], 1):
+                self.txt_result.insert(tk.END, f"  {i:2d}. {ip:40s} : {c:6d} paquets, {volumes.get(ip, 0):10d} octets\n")
+        
+        if s.get('conversations'):
+            self.txt_result.insert(tk.END, "\n🔁 TOP CONVERSATIONS (par hôte)\n")
+            for i, (a, b, c) in enumerate(s['conversations'], 1):
+                self.txt_result.insert(tk.END, f"  {i:2d}. {a:40s} → {b:40s} : {c:6d}\n")
+            ports = ", ".join(f"{p} ({c})" for p, c in s['ports_destinations'])
+            self.txt_result.insert(tk.END, f"  Ports de destination : {ports}\n")
+        
+        if 'flux' in s:
+            f = s['flux']
+            etats = ", ".join(f"{e} : {c}" for e, c in f['etats'].items())
+            self.txt_result.insert(tk.END, f"\n🔗 CONNEXIONS TCP - {f['total']} flux ({f['actifs']} ouverts), {etats}\n")
+            if f['duree_moyenne'] is not None:
+                self.txt_result.insert(tk.END, f"  Durée moyenne {f['duree_moyenne']:g} s, max {f['duree_max']:g} s\n")
+            for i, (a, b, o, n, d, e) in enumerate(f['top_octets'], 1):
+                self.txt_result.insert(tk.END, f"  {i:2d}. {a:40s} → {b:40s} : {o:10d} octets, {n:6d} paquets, {e}\n")
+        
         if s['alertes']:
             self.txt_result.insert(tk.END, "\n⚠️ ALERTES\n")
             for a in s['alertes']:
                 self.txt_result.insert(tk.END, f"  • {a}\n")
         
+        if s.get('alertes_fenetres'):
+            self.txt_result.insert(tk.END, f"\n⏱️ ALERTES PAR FENÊTRE DE {s['fenetre']:g} s\n")
+            for a in s['alertes_fenetres']:
+                self.txt_result.insert(tk.END, f"  • {a}\n")
+        
+        for c in s.get('comparaisons', ()):
+            self.txt_result.insert(tk.END, f"\n🔀 {c['avant']} → {c['apres']}\n")
+            nouveaux = ", ".join(f"{h} ({n})" for h, n in c['nouveaux_hotes'][:10])
+            disparus = ", ".join(f"{h} ({n})" for h, n in c['hotes_disparus'][:10])
+            self.txt_result.insert(tk.END, f"  Nouveaux hôtes ({len(c['nouveaux_hotes'])}) : {nouveaux}\n")
+            self.txt_result.insert(tk.END, f"  Hôtes disparus ({len(c['hotes_disparus'])}) : {disparus}\n")
+            for h, a, b, pct in c['variations'][:10]:
+                self.txt_result.insert(tk.END, f"  {h:40s} : {a:6d} → {b:6d} ({pct:+.1f}%)\n")
+            for t in c['alertes_apparues']:
+                self.txt_result.insert(tk.END, f"  + {t}\n")
+            for t in c['alertes_disparues']:
+                self.txt_result.insert(tk.END, f"  - {t}\n")
+        
         self.txt_result.insert(tk.END, "\n" + "═" * 120 + "\n")
+        self.txt_result.mark_set("profil", "end-1c")
+        self.txt_result.mark_gravity("profil", tk.LEFT)
+        self.afficher_profil()
+    
+    def afficher_profil(self):
+        """Section ⏱️ PROFIL en fin de résumé, réécrite après chaque étape mesurée."""
+        if self.profil is None or "profil" not in self.txt_result.mark_names():
+            return
+        self.txt_result.delete("profil", tk.END)
+        self.txt_result.insert(tk.END, "\n⏱️ PROFIL\n" + "".join(f"  {l}\n" for l in self.profil.lignes()))
+    
+    def pourcentage(self, c, total):
+        t = self.totaux.get(total)
+        return round(c / t * 100, 2) if t else 0
+    
+    def afficher_tables(self):
+        """Charge la table de l'onglet affiché, si ses données ont changé."""
+        if not self.stats:
+            return
+        s = self.vue()
+        cle = list(self.tables)[self.onglets.index("current")]
+        table = self.tables[cle]
+        source = (self.stats, self.var_par_hote.get())
+        if table.source is not None and table.source[0] is source[0] and table.source[1] == source[1]:
+            return
+        self.totaux = {t: s[t] for t in ('total_src', 'total_dst', 'total_flags')}
+        if cle in ('sources', 'destinations'):
+            lignes = classement_complet(s, cle)
+        elif cle == 'flags':
+            lignes = sorted(s['flags'], key=lambda f: f[1], reverse=True)
+        else:
+            lignes = s['erreurs']
+            # Colonne Fichier seulement pour une fusion ou une archive zip
+            table.montrer_colonnes([c for c in table.ids if c != "fichier" or (lignes and "fichier" in lignes[0])])
+        table.charger(lignes, source)
     
     def export_excel(self):
         """Export Excel avec graphiques intégrés (camemberts + barres)."""
         if not self.stats:
             return
         
-        # Vérifie que openpyxl est installé
-        try:
-            from openpyxl import Workbook
-            from openpyxl.chart import PieChart, BarChart, Reference
-            from openpyxl.styles import Font, PatternFill, Alignment
-        except ImportError:
-            reponse = messagebox.askyesno(
+        # Vérifie que openpyxl est installé (il n'est importé qu'à l'écriture)
+        if not OPENPYXL_OK:
+            messagebox.showerror(
                 "⚠️ Module manquant",
-                "openpyxl n'est pas installé.\n\nInstaller maintenant ?"
+                "openpyxl n'est pas installé.\n\nLance : pip install openpyxl"
             )
-            if reponse:
-                import subprocess
-                import sys
-                subprocess.check_call([sys.executable, "-m", "pip", "install", "openpyxl"])
-                messagebox.showinfo("✅", "openpyxl installé ! Relance l'export.")
             return
         
         chemin = filedialog.asksaveasfilename(
@@ -375,184 +4173,9 @@ class AnalyseurApp:
         if not chemin:
             return
         
-        s = self.stats
-        
-        wb = Workbook()
-        wb.remove(wb.active)
-        
-        # Styles
-        header_fill = PatternFill(start_color="3498DB", end_color="3498DB", fill_type="solid")
-        header_font = Font(color="FFFFFF", bold=True, size=12)
-        center = Alignment(horizontal="center", vertical="center")
-        
-        # ===== ONGLET 1 : RÉSUMÉ =====
-        ws_resume = wb.create_sheet("📊 Résumé", 0)
-        ws_resume.column_dimensions['A'].width = 30
-        ws_resume.column_dimensions['B'].width = 40
-        
-        ws_resume.append(["Indicateur", "Valeur"])
-        for cell in ws_resume[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center
-        
-        ws_resume.append(["📁 Fichier", self.fichier.name])
-        ws_resume.append(["📅 Date", datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
-        ws_resume.append(["📄 Lignes analysées", s['lignes']])
-        ws_resume.append(["🔵 Sources distinctes", len(s['sources'])])
-        ws_resume.append(["🔴 Destinations distinctes", len(s['destinations'])])
-        ws_resume.append(["❌ Erreurs détectées", len(s['erreurs'])])
-        ws_resume.append(["⚠️ Alertes", len(s['alertes'])])
-        
-        # ===== ONGLET 2 : SOURCES + CAMEMBERT =====
-        ws_src = wb.create_sheet("🔵 Sources")
-        ws_src.column_dimensions['A'].width = 35
-        ws_src.column_dimensions['B'].width = 15
-        ws_src.column_dimensions['C'].width = 12
-        
-        ws_src.append(["IP Source", "Paquets", "Pourcentage"])
-        for cell in ws_src[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center
-        
-        for ip, c in s['sources']:
-            pct = round(c / s['total_src'] * 100, 1) if s['total_src'] > 0 else 0
-            ws_src.append([ip, c, pct])
-        
-        # CAMEMBERT Sources (Top 5)
-        pie_src = PieChart()
-        pie_src.title = "Top 5 Sources (%)"
-        pie_src.height = 12
-        pie_src.width = 18
-        
-        labels = Reference(ws_src, min_col=1, min_row=2, max_row=min(6, ws_src.max_row))
-        data = Reference(ws_src, min_col=2, min_row=1, max_row=min(6, ws_src.max_row))
-        pie_src.add_data(data, titles_from_data=True)
-        pie_src.set_categories(labels)
-        
-        ws_src.add_chart(pie_src, "E2")
-        
-        # ===== ONGLET 3 : DESTINATIONS + CAMEMBERT =====
-        ws_dst = wb.create_sheet("🔴 Destinations")
-        ws_dst.column_dimensions['A'].width = 35
-        ws_dst.column_dimensions['B'].width = 15
-        ws_dst.column_dimensions['C'].width = 12
-        
-        ws_dst.append(["IP Destination", "Connexions", "Pourcentage"])
-        for cell in ws_dst[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center
-        
-        for ip, c in s['destinations']:
-            pct = round(c / s['total_dst'] * 100, 1) if s['total_dst'] > 0 else 0
-            ws_dst.append([ip, c, pct])
-        
-        # CAMEMBERT Destinations (Top 5)
-        pie_dst = PieChart()
-        pie_dst.title = "Top 5 Destinations (%)"
-        pie_dst.height = 12
-        pie_dst.width = 18
-        
-        labels = Reference(ws_dst, min_col=1, min_row=2, max_row=min(6, ws_dst.max_row))
-        data = Reference(ws_dst, min_col=2, min_row=1, max_row=min(6, ws_dst.max_row))
-        pie_dst.add_data(data, titles_from_data=True)
-        pie_dst.set_categories(labels)
-        
-        ws_dst.add_chart(pie_dst, "E2")
-        
-        # ===== ONGLET 4 : FLAGS TCP + BARRES =====
-        ws_flags = wb.create_sheet("🏴 Flags TCP")
-        ws_flags.column_dimensions['A'].width = 20
-        ws_flags.column_dimensions['B'].width = 15
-        ws_flags.column_dimensions['C'].width = 12
-        
-        ws_flags.append(["Flag TCP", "Paquets", "Pourcentage"])
-        for cell in ws_flags[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = center
-        
-        for flag, c in s['flags']:
-            pct = round(c / s['total_flags'] * 100, 1) if s['total_flags'] > 0 else 0
-            ws_flags.append([flag, c, pct])
-        
-        # GRAPHIQUE EN BARRES Flags
-        bar_flags = BarChart()
-        bar_flags.title = "Répartition des Flags TCP"
-        bar_flags.y_axis.title = "Nombre de paquets"
-        bar_flags.x_axis.title = "Flag"
-        bar_flags.height = 12
-        bar_flags.width = 18
-        
-        labels = Reference(ws_flags, min_col=1, min_row=2, max_row=ws_flags.max_row)
-        data = Reference(ws_flags, min_col=2, min_row=1, max_row=ws_flags.max_row)
-        bar_flags.add_data(data, titles_from_data=True)
-        bar_flags.set_categories(labels)
-        
-        ws_flags.add_chart(bar_flags, "E2")
-        
-        # ===== ONGLET 5 : ERREURS + CAMEMBERT =====
-        if s['err_types']:
-            ws_err_types = wb.create_sheet("❌ Types Erreurs")
-            ws_err_types.column_dimensions['A'].width = 20
-            ws_err_types.column_dimensions['B'].width = 15
-            
-            ws_err_types.append(["Type d'erreur", "Occurrences"])
-            for cell in ws_err_types[1]:
-                cell.fill = PatternFill(start_color="E74C3C", end_color="E74C3C", fill_type="solid")
-                cell.font = header_font
-                cell.alignment = center
-            
-            for t, c in s['err_types'].items():
-                ws_err_types.append([t, c])
-            
-            # CAMEMBERT Erreurs
-            pie_err = PieChart()
-            pie_err.title = "Répartition des erreurs (%)"
-            pie_err.height = 12
-            pie_err.width = 18
-            
-            labels = Reference(ws_err_types, min_col=1, min_row=2, max_row=ws_err_types.max_row)
-            data = Reference(ws_err_types, min_col=2, min_row=1, max_row=ws_err_types.max_row)
-            pie_err.add_data(data, titles_from_data=True)
-            pie_err.set_categories(labels)
-            
-            ws_err_types.add_chart(pie_err, "D2")
-            
-            # Onglet détails erreurs
-            ws_err_detail = wb.create_sheet("📋 Erreurs Détail")
-            ws_err_detail.column_dimensions['A'].width = 10
-            ws_err_detail.column_dimensions['B'].width = 15
-            ws_err_detail.column_dimensions['C'].width = 80
-            
-            ws_err_detail.append(["Ligne", "Type", "Message"])
-            for cell in ws_err_detail[1]:
-                cell.fill = PatternFill(start_color="E74C3C", end_color="E74C3C", fill_type="solid")
-                cell.font = header_font
-                cell.alignment = center
-            
-            for e in s['erreurs']:
-                ws_err_detail.append([e['ligne'], e['type'], e['msg']])
-        
-        # ===== ONGLET 6 : ALERTES =====
-        if s['alertes']:
-            ws_alertes = wb.create_sheet("⚠️ Alertes")
-            ws_alertes.column_dimensions['A'].width = 10
-            ws_alertes.column_dimensions['B'].width = 100
-            
-            ws_alertes.append(["N°", "Alerte"])
-            for cell in ws_alertes[1]:
-                cell.fill = PatternFill(start_color="F39C12", end_color="F39C12", fill_type="solid")
-                cell.font = header_font
-                cell.alignment = center
-            
-            for i, a in enumerate(s['alertes'], 1):
-                ws_alertes.append([i, a])
-        
-        # Sauvegarde
-        wb.save(chemin)
+        with _etape(self.profil, "export xlsx"):
+            ecrire_excel(self.vue(), self.fichier.name, chemin)
+        self.afficher_profil()
         
         messagebox.showinfo(
             "✅ Export Excel réussi !",
@@ -578,51 +4201,20 @@ class AnalyseurApp:
         if not chemin:
             return
         
-        s = self.stats
-        
-        md = [
-            f"# 🛡️ Rapport SAE 1.05\n\n",
-            f"**📅 Date** : {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n",
-            f"**📁 Fichier** : `{self.fichier.name}`\n\n",
-            f"---\n\n",
-            f"## 📊 Statistiques globales\n\n",
-            f"- **Lignes analysées** : {s['lignes']}\n",
-            f"- **Sources distinctes** : {len(s['sources'])}\n",
-            f"- **Destinations distinctes** : {len(s['destinations'])}\n",
-            f"- **Erreurs** : {len(s['erreurs'])}\n",
-            f"- **Alertes** : {len(s['alertes'])}\n\n",
-            f"---\n\n",
-            f"## 🔵 Top 10 Sources\n\n",
-            "| Rang | IP Source | Paquets | % |\n",
-            "|:----:|:----------|--------:|---:|\n"
-        ]
-        
-        for i, (ip, c) in enumerate(s['sources'], 1):
-            pct = round(c / s['total_src'] * 100, 1) if s['total_src'] > 0 else 0
-            md.append(f"| {i} | `{ip}` | {c} | **{pct}%** |\n")
-        
-        md.append("\n---\n\n## 🔴 Top 10 Destinations\n\n")
-        md.append("| Rang | IP Destination | Connexions | % |\n")
-        md.append("|:----:|:---------------|----------:|---:|\n")
-        
-        for i, (ip, c) in enumerate(s['destinations'], 1):
-            pct = round(c / s['total_dst'] * 100, 1) if s['total_dst'] > 0 else 0
-            md.append(f"| {i} | `{ip}` | {c} | **{pct}%** |\n")
-        
-        if s['alertes']:
-            md.append("\n---\n\n## ⚠️ Alertes de sécurité\n\n")
-            for i, a in enumerate(s['alertes'], 1):
-                md.append(f"{i}. {a}\n")
-        
-        md.append("\n---\n\n*Rapport généré automatiquement - SAE 1.05*\n")
-        
-        with open(chemin, "w", encoding="utf-8") as f:
-            f.write("".join(md))
+        with _etape(self.profil, "export md"):
+            with open(chemin, "w", encoding="utf-8") as f:
+                f.write(rapport_markdown(self.vue(), self.fichier.name))
+        self.afficher_profil()
         
         messagebox.showinfo("✅ Export Markdown", f"Rapport exporté :\n{chemin}")
 
 
 if __name__ == "__main__":
+    # Avec des arguments : mode ligne de commande, sinon la fenêtre
+    if len(sys.argv) > 1:
+        sys.exit(main_cli())
+    
+    charger_interface()
     if not MATPLOTLIB_OK:
         print("⚠️ matplotlib non installé. Lance : pip install matplotlib")
         print("L'app fonctionne sans graphiques pour l'instant.\n")
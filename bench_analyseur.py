@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+"""
+SAE 1.05 - Mesures de performance de l'analyseur
+Usage : python bench_analyseur.py demarrage [-n 10]
+        python bench_analyseur.py erreurs [-n 200000] [--taux 0.05]
+        python bench_analyseur.py generer capture.txt [-n 1e6] [--hotes 1000] [--hexa]
+        python bench_analyseur.py echelle [--tailles 1e3,1e4,1e5,1e6] [--resultats mesures.json]
+        python bench_analyseur.py regles [-n 1e6] [--regles 20]
+"""
+
+import argparse
+import importlib
+import json
+import random
+import re
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from itertools import accumulate
+from pathlib import Path
+
+DOSSIER = Path(__file__).resolve().parent
+SCRIPT = DOSSIER / "Analyseur_réseau.py"
+CAPTURE = DOSSIER / "fichier182.txt"
+
+# Code exécuté dans un interpréteur neuf pour chaque mesure de démarrage
+_IMPORT_SEUL = "import Analyseur_réseau"
+_IMPORT_SANS_GUI = (
+    "import sys, Analyseur_réseau; "
+    "lourds = [m for m in ('tkinter', 'matplotlib', 'openpyxl') if m in sys.modules]; "
+    "sys.exit(1 if lourds else 0)"
+)
+_PREMIERE_FENETRE = (
+    "import Analyseur_réseau as a; a.charger_interface(); "
+    "root = a.tk.Tk(); app = a.AnalyseurApp(root); root.update(); root.destroy()"
+)
+
+
+def _chrono(commande, n):
+    """Temps murs (s) de n exécutions de la commande ; None si elle échoue."""
+    temps = []
+    for _ in range(n):
+        debut = time.perf_counter()
+        res = subprocess.run(commande, cwd=DOSSIER, capture_output=True)
+        temps.append(time.perf_counter() - debut)
+        if res.returncode != 0:
+            return None
+    return temps
+
+
+def _afficher(nom, temps):
+    if temps is None:
+        print(f"  {nom:40s} : indisponible")
+        return
+    print(f"  {nom:40s} : médiane {statistics.median(temps) * 1000:7.1f} ms"
+          f" | min {min(temps) * 1000:7.1f} ms")
+
+
+def bench_demarrage(n):
+    """Temps de démarrage à froid (interpréteur compris)."""
+    print(f"⏱️ Démarrage ({n} essais, interpréteur neuf à chaque fois)")
+    _afficher("Interpréteur seul", _chrono([sys.executable, "-c", "pass"], n))
+    _afficher("Import du module", _chrono([sys.executable, "-c", _IMPORT_SEUL], n))
+
+    with tempfile.TemporaryDirectory() as sortie:
+        _afficher(
+            f"CLI : première analyse ({CAPTURE.name})",
+            _chrono([sys.executable, str(SCRIPT), str(CAPTURE), "-o", sortie], n),
+        )
+    # Nécessite un affichage (DISPLAY) : sinon "indisponible"
+    _afficher("GUI : première fenêtre", _chrono([sys.executable, "-c", _PREMIERE_FENETRE], n))
+
+    propre = subprocess.run([sys.executable, "-c", _IMPORT_SANS_GUI], cwd=DOSSIER).returncode == 0
+    print(f"  {'Modules lourds chargés à l’import':40s} : {'non ✅' if propre else 'OUI ❌'}")
+
+
+# Boucle de détection d'erreurs d'avant le détecteur à plusieurs mots (référence)
+_ERR_REGEX_ORIGINE = re.compile(r"\b(ERROR|Error|ERR|Exception|CRITICAL|FATAL|failed|failure|denied)\b", re.IGNORECASE)
+_LIGNE = "11:42:04.{i:06d} IP 192.168.190.130.{p} > 184.107.43.74.http: Flags [S.], seq {i}, length 0"
+_ERREUR = "11:42:04.{i:06d} kernel: ERROR: connection to 184.107.43.74 refused ({i})"
+
+
+def _lignes_test(n, taux):
+    pas = round(1 / taux) if taux else n + 1
+    return [(_ERREUR if i % pas == 0 else _LIGNE).format(i=i, p=40000 + i % 20000) for i in range(n)]
+
+
+def _mesure(fonction, n=3):
+    """(meilleure durée en s, pic mémoire en octets) ; tracemalloc ralentit, d'où un appel à part."""
+    durees = []
+    for _ in range(n):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    tracemalloc.start()
+    fonction()
+    pic = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(durees), pic
+
+
+def bench_erreurs(n, taux):
+    """Micro-benchmark : boucle regex d'origine contre détecteur à pré-filtre et erreurs plafonnées."""
+    a = importlib.import_module("Analyseur_réseau")
+    lignes = _lignes_test(n, taux)
+    lignes_b = [l.encode() for l in lignes]
+    tampon = "\n".join(lignes).encode() + b"\n"
+    print(f"⏱️ Détection d'erreurs ({n} lignes, {taux:.1%} d'erreurs)")
+    
+    def origine():
+        types, erreurs = Counter(), []
+        for num, ligne in enumerate(lignes, 1):
+            m = _ERR_REGEX_ORIGINE.search(ligne)
+            if m:
+                t = m.group(0).upper()
+                types[t] += 1
+                erreurs.append({"ligne": num, "type": t, "msg": ligne[:150]})
+    
+    def detecteur(plafond):
+        d = a.DETECTEUR_ERREURS
+        filtre, regex = d.filtre_b.search, d.regex_b.search
+        types, erreurs = Counter(), []
+        for num, ligne in enumerate(lignes_b, 1):
+            if filtre(ligne.lower()):
+                m = regex(ligne)
+                if m:
+                    t = m.group(0).upper().decode()
+                    types[t] += 1
+                    if len(erreurs) < plafond:
+                        erreurs.append({"ligne": num, "type": t, "msg": ligne[:150].decode()})
+    
+    def analyse(**options):
+        a.EtatAnalyse(**options).ajouter_tampon(tampon)
+    
+    mesures = [
+        ("Boucle regex d'origine", origine),
+        ("Pré-filtre + regex, sans plafond", lambda: detecteur(n)),
+        ("Pré-filtre + regex, plafond 1000", lambda: detecteur(1000)),
+        ("EtatAnalyse complet, sans plafond", lambda: analyse(max_erreurs=None)),
+        (f"EtatAnalyse complet, plafond {a.MAX_ERREURS}", lambda: analyse()),
+        ("EtatAnalyse complet, échantillon de 1000", lambda: analyse(max_erreurs=1000, echantillon=True)),
+    ]
+    for nom, fonction in mesures:
+        duree, pic = _mesure(fonction)
+        print(f"  {nom:40s} : {duree * 1e9 / n:7.0f} ns/ligne | pic mémoire {pic / 2**20:7.1f} Mio")
+
+
+# Capture synthétique : flags TCP par défaut (tcpdump) et leur proportion
+FLAGS_DEFAUT = "S=50,.=25,P.=12,S.=8,F.=3,R=2"
+_PORTS_SERVICES = (80, 443, 22, 53, 25, 8080, 3306, 123)
+_OCTET_FLAGS = {"S": 0x02, ".": 0x10, "P.": 0x18, "S.": 0x12, "F.": 0x11, "R": 0x04, "R.": 0x14, "FP.": 0x19}
+_LOT_GENERATION = 10_000
+
+
+def _lire_flags(texte):
+    """"S=50,.=25" -> [("S", 50.0), (".", 25.0)]."""
+    paires = [p.rsplit("=", 1) for p in texte.split(",") if p]
+    return [(f, float(poids)) for f, poids in paires]
+
+
+def _bloc_hexa(src, dst, port_src, port_dst, octet_flags, longueur, seq):
+    """3 lignes tcpdump -x (48 octets) : en-tête IPv4 puis TCP, de quoi nourrir le décodage hexa."""
+    ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 40 + longueur, seq & 0xFFFF, 0x4000, 64, 6, 0, src, dst)
+    tcp = struct.pack("!HHIIBBHHH", port_src, port_dst, seq, 0, 0x50, octet_flags, 512, 0, 0)
+    octets = (ip + tcp + bytes(8)).hex()
+    return "".join(
+        f"\t0x{i * 16:04x}:  " + " ".join(octets[j:j + 4] for j in range(i * 32, i * 32 + 32, 4)) + "\n"
+        for i in range(3)
+    )
+
+
+def generer_capture(chemin, n, hotes=1000, flags=FLAGS_DEFAUT, taux_erreurs=0.01, hexa=False, graine=0):
+    """Écrit une capture tcpdump texte synthétique de n lignes (paquets et erreurs).
+    
+    Les hôtes sont des adresses 10.x.y.z tirées selon une loi de Zipf (quelques
+    gros émetteurs, une longue traîne) ; flags suit le format "S=50,.=25".
+    Avec hexa=True, chaque paquet est suivi de son bloc tcpdump -x. Même
+    graine, mêmes paramètres : même fichier, octet pour octet.
+    """
+    hasard = random.Random(graine)
+    adresses = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(1, hotes + 1)]
+    octets_ip = [bytes(int(x) for x in a.split(".")) for a in adresses]
+    poids = [1 / rang for rang in range(1, hotes + 1)]
+    cumul = list(accumulate(poids))
+    noms_flags, poids_flags = zip(*_lire_flags(flags))
+    
+    with open(chemin, "w", encoding="ascii", newline="\n") as f:
+        fait = 0
+        while fait < n:
+            lot = min(_LOT_GENERATION, n - fait)
+            sources = hasard.choices(range(hotes), cum_weights=cumul, k=lot)
+            destinations = hasard.choices(range(hotes), cum_weights=cumul, k=lot)
+            tirages_flags = hasard.choices(noms_flags, poids_flags, k=lot)
+            lignes = []
+            for k in range(lot):
+                i = fait + k
+                ts = f"11:{42 + i // 60_000_000 % 18:02d}:{i // 1_000_000 % 60:02d}.{i % 1_000_000:06d}"
+                s, d = sources[k], destinations[k]
+                if hasard.random() < taux_erreurs:
+                    lignes.append(f"{ts} kernel: ERROR: connection to {adresses[d]} refused ({i})\n")
+                    continue
+                port_src = 1024 + hasard.randrange(64_000)
+                port_dst = _PORTS_SERVICES[d % len(_PORTS_SERVICES)]
+                flag = tirages_flags[k]
+                longueur = 0 if "P" not in flag else hasard.randrange(1, 1400)
+                lignes.append(f"{ts} IP {adresses[s]}.{port_src} > {adresses[d]}.{port_dst}: "
+                              f"Flags [{flag}], seq {i}, win 512, length {longueur}\n")
+                if hexa:
+                    lignes.append(_bloc_hexa(octets_ip[s], octets_ip[d], port_src, port_dst,
+                                             _OCTET_FLAGS.get(flag, 0x10), longueur, i))
+            f.write("".join(lignes))
+            fait += lot
+
+
+# Mesure d'un fichier dans un interpréteur neuf : pic RSS propre à chaque taille
+_MESURE_ECHELLE = """
+import json, sys, time, tempfile, os
+import Analyseur_réseau as a
+chemin, options = sys.argv[1], json.loads(sys.argv[2])
+nb_processus = options.pop("nb_processus")
+mesures = {}
+debut = time.perf_counter()
+stats = a.analyser_fichier(chemin, nb_processus, **options)
+mesures["analyse"] = time.perf_counter() - debut
+mesures["lignes"] = stats["lignes"]
+debut = time.perf_counter()
+a.rapport_markdown(stats, os.path.basename(chemin))
+mesures["markdown"] = time.perf_counter() - debut
+if a.OPENPYXL_OK:
+    with tempfile.TemporaryDirectory() as d:
+        debut = time.perf_counter()
+        a.ecrire_excel(stats, os.path.basename(chemin), os.path.join(d, "b.xlsx"))
+        mesures["excel"] = time.perf_counter() - debut
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    mesures["pic_rss"] = rss if sys.platform == "darwin" else rss * 1024
+except ImportError:
+    pass
+print(json.dumps(mesures))
+"""
+
+
+def _lire_taille(texte):
+    return int(float(texte))
+
+
+def bench_echelle(tailles, hotes, taux, flags, hexa, nb_processus, graine, dossier, resultats):
+    """Débit du parseur, pic RSS et temps d'export pour des captures synthétiques de taille croissante."""
+    print(f"⏱️ Passage à l'échelle ({hotes} hôtes, {taux:.1%} d'erreurs, flags {flags}"
+          f"{', blocs hexa' if hexa else ''}, {nb_processus} processus, graine {graine})")
+    print(f"  {'lignes':>11s} | {'fichier':>9s} | {'lignes/s':>11s} | {'pic RSS':>9s} | "
+          f"{'Markdown':>9s} | {'Excel':>9s}")
+    lignes_json = []
+    with tempfile.TemporaryDirectory() as temporaire:
+        dossier = Path(dossier or temporaire)
+        dossier.mkdir(parents=True, exist_ok=True)
+        for n in tailles:
+            chemin = dossier / f"synthetique_{n}_{hotes}_{graine}{'_hexa' if hexa else ''}.txt"
+            if not chemin.exists():
+                generer_capture(chemin, n, hotes, flags, taux, hexa, graine)
+            options = {"nb_processus": nb_processus, "hexa": hexa}
+            res = subprocess.run([sys.executable, "-c", _MESURE_ECHELLE, str(chemin), json.dumps(options)],
+                                 cwd=DOSSIER, capture_output=True, text=True)
+            if res.returncode != 0:
+                print(f"  {n:11d} | échec : {res.stderr.strip().splitlines()[-1:]}")
+                continue
+            m = json.loads(res.stdout)
+            m.update(n=n, octets=chemin.stat().st_size)
+            lignes_json.append(m)
+            excel = f"{m['excel'] * 1000:7.0f} ms" if "excel" in m else f"{'-':>9s}"
+            rss = f"{m['pic_rss'] / 2**20:5.0f} Mio" if "pic_rss" in m else f"{'-':>9s}"
+            print(f"  {n:11d} | {m['octets'] / 2**20:5.0f} Mio | {m['lignes'] / m['analyse']:11,.0f} | {rss} | "
+                  f"{m['markdown'] * 1000:6.1f} ms | {excel}")
+    if resultats:
+        with open(resultats, "w", encoding="utf-8") as f:
+            json.dump({"hotes": hotes, "taux": taux, "flags": flags, "hexa": hexa, "processus": nb_processus,
+                       "graine": graine, "mesures": lignes_json}, f, indent=2)
+
+
+# Règles de --regles synthétiques : les six types, tour à tour
+_MOTS_REGLES = ("refused", "timeout", "denied", "reset by peer", "unreachable", "segfault", "dropped", "martian")
+
+
+def regles_synthetiques(n, hotes=1000):
+    """n règles de tous les types (seuils hauts : le coût mesuré est l'évaluation, pas les alertes)."""
+    regles = []
+    for i in range(n):
+        nom = f"R{i:02d}"
+        genre = i % 6
+        if genre == 0:
+            regles.append({"nom": nom, "type": "destination", "seuil": 10_000 + i})
+        elif genre == 1:
+            regles.append({"nom": nom, "type": "source", "seuil": 10_000 + i, "top": 20})
+        elif genre == 2:
+            regles.append({"nom": nom, "type": "flags", "flags": [["R"], ["F"], ["P"], ["U"]][i // 6 % 4],
+                           "seuil": 1_000_000})
+        elif genre == 3:
+            regles.append({"nom": nom, "type": "desequilibre", "seuil": 100, "ratio": 50 + i})
+        elif genre == 4:
+            liste = [f"10.0.{j >> 8 & 255}.{j & 255}" for j in range(i, hotes, 7)] + [f"192.168.{i}.0/24"]
+            regles.append({"nom": nom, "type": "hotes", "hotes": liste, "seuil": 1_000_000})
+        else:
+            mot = _MOTS_REGLES[i // 6 % len(_MOTS_REGLES)]
+            regles.append({"nom": nom, "type": "motif", "mots": [mot], "motif": r"to 10\.\d+" if i % 12 == 5 else None})
+            if regles[-1]["motif"] is None:
+                del regles[-1]["motif"]
+    return regles
+
+
+def bench_regles(n, nb_regles, hotes, taux, flags, hexa, graine, essais=5):
+    """Débit du parseur avec les règles intégrées, puis avec nb_regles règles de plus.
+    
+    Les règles compilées en un JeuRegles sont évaluées dans la passe unique
+    (compteurs partagés, un seul pré-filtre par ligne) ; seule l'évaluation
+    finale, mesurée à part, dépend du nombre d'adresses distinctes. En
+    référence : une passe de plus sur les lignes par règle à motif. Les
+    configurations sont mesurées à tour de rôle (meilleur de essais).
+    """
+    a = importlib.import_module("Analyseur_réseau")
+    print(f"⏱️ Règles d'alerte ({n} lignes, {hotes} hôtes, {taux:.1%} d'erreurs, {'hexa, ' if hexa else ''}"
+          f"graine {graine}, meilleur de {essais})")
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = Path(dossier) / "capture.txt"
+        generer_capture(chemin, n, hotes, flags, taux, hexa, graine)
+        supplementaires = regles_synthetiques(nb_regles, hotes)
+        toutes = list(a.REGLES_DEFAUT) + supplementaires
+        motifs = [r for r in supplementaires if r["type"] == "motif"]
+        
+        def analyse(regles):
+            profil = a.Profil()
+            a.analyser_fichier(chemin, 1, profil=profil, regles=regles, hexa=hexa)
+            return sum(m["duree"] for m in profil.resume() if m["etape"] == "alertes")
+        
+        def passes_separees():
+            evaluation = analyse(None)
+            for r in motifs:
+                regex = re.compile(r.get("motif", "").encode())
+                mots = [m.encode() for m in r["mots"]]
+                with open(chemin, "rb") as f:
+                    sum(1 for ligne in f if any(m in ligne.lower() for m in mots) and regex.search(ligne))
+            return evaluation
+        
+        mesures = [
+            ("Règles intégrées (3)", lambda: analyse(None)),
+            (f"+ {nb_regles} règles, une seule passe", lambda: analyse(toutes)),
+            (f"+ {len(motifs)} passes (une par règle à motif)", passes_separees),
+        ]
+        meilleures = [(float("inf"), 0.0)] * len(mesures)
+        for _ in range(essais):
+            for i, (_, fonction) in enumerate(mesures):
+                debut = time.perf_counter()
+                evaluation = fonction()
+                duree = time.perf_counter() - debut
+                meilleures[i] = min(meilleures[i], (duree, evaluation))
+        reference = meilleures[0][0]
+        for (nom, _), (duree, evaluation) in zip(mesures, meilleures):
+            print(f"  {nom:40s} : {n / duree:11,.0f} lignes/s | {(duree / reference - 1) * 100:+6.1f} % "
+                  f"| évaluation des alertes {evaluation * 1000:6.1f} ms")
+        stats = a.analyser_fichier(chemin, 1, regles=toutes, hexa=hexa)
+        print(f"  {'Adresses distinctes':40s} : {stats['sources_distinctes']} sources, "
+              f"{stats['destinations_distinctes']} destinations")
+        print(f"  {'Lignes par règle à motif':40s} : "
+              + ", ".join(f"{nom} {m['lignes']}" for nom, m in stats["regles_motifs"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesures de performance de l'analyseur SAE 1.05")
+    sous = parser.add_subparsers(dest="mesure", required=True)
+
+    p = sous.add_parser("demarrage", help="temps jusqu'à la première fenêtre / première analyse CLI")
+    p.add_argument("-n", type=int, default=10, help="nombre d'essais")
+
+    p = sous.add_parser("erreurs", help="détection d'erreurs : boucle regex d'origine contre détecteur plafonné")
+    p.add_argument("-n", type=int, default=200_000, help="nombre de lignes")
+    p.add_argument("--taux", type=float, default=0.05, help="proportion de lignes d'erreur")
+    
+    p = sous.add_parser("generer", help="écrit une capture tcpdump texte synthétique")
+    p.add_argument("sortie", help="fichier à écrire")
+    p.add_argument("-n", type=_lire_taille, default=1_000_000, help="nombre de lignes (ex. 1e6)")
+    
+    p = sous.add_parser("echelle", help="débit, pic RSS et exports de 10^3 à 10^8 lignes synthétiques")
+    p.add_argument("--tailles", default="1e3,1e4,1e5,1e6",
+                   help="nombres de lignes séparés par des virgules (défaut : 1e3,1e4,1e5,1e6 ; 1e8 = ~9 Go)")
+    p.add_argument("-j", "--processus", type=int, default=1, help="processus du parseur (défaut : 1)")
+    p.add_argument("--dossier", help="garde les captures générées ici pour les réutiliser (défaut : temporaire)")
+    p.add_argument("--resultats", metavar="FICHIER.json", help="écrit aussi les mesures en JSON (comparaisons)")
+    
+    p = sous.add_parser("regles", help="coût de règles d'alerte en plus, évaluées dans la passe unique")
+    p.add_argument("-n", type=_lire_taille, default=1_000_000, help="nombre de lignes (ex. 1e6)")
+    p.add_argument("--regles", type=int, default=20, help="règles ajoutées aux règles intégrées (défaut : 20)")
+    
+    for p in (sous.choices["generer"], sous.choices["echelle"], sous.choices["regles"]):
+        p.add_argument("--hotes", type=int, default=1000, help="nombre d'hôtes distincts (défaut : 1000)")
+        p.add_argument("--taux", type=float, default=0.01, help="proportion de lignes d'erreur (défaut : 0.01)")
+        p.add_argument("--flags", default=FLAGS_DEFAUT, help=f"flags et poids (défaut : {FLAGS_DEFAUT})")
+        p.add_argument("--hexa", action="store_true", help="ajoute le bloc hexa (tcpdump -x) de chaque paquet")
+        p.add_argument("--graine", type=int, default=0, help="graine du générateur (défaut : 0)")
+    
+    args = parser.parse_args()
+    if args.mesure == "demarrage":
+        bench_demarrage(args.n)
+    elif args.mesure == "erreurs":
+        bench_erreurs(args.n, args.taux)
+    elif args.mesure == "generer":
+        generer_capture(args.sortie, args.n, args.hotes, args.flags, args.taux, args.hexa, args.graine)
+    elif args.mesure == "echelle":
+        tailles = [_lire_taille(t) for t in args.tailles.split(",")]
+        bench_echelle(tailles, args.hotes, args.taux, args.flags, args.hexa, args.processus, args.graine,
+                      args.dossier, args.resultats)
+    elif args.mesure == "regles":
+        bench_regles(args.n, args.regles, args.hotes, args.taux, args.flags, args.hexa, args.graine)
+
+
+if __name__ == "__main__":
+    main()
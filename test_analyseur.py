@@ -0,0 +1,282 @@
+"""Tests de non-régression de l'analyseur (python -m pytest ou python -m unittest)."""
+
+import gzip
+import os
+import socket
+import struct
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+import Analyseur_réseau as a
+
+DOSSIER = Path(__file__).parent
+CAPTURES = [DOSSIER / "fichier182.txt", DOSSIER / "fichier1000.txt"]
+
+# Stats de référence des captures d'exemple (analyseur d'origine, ligne par ligne)
+REFERENCES = {
+    "fichier182.txt": {
+        "lignes": 22, "total_src": 22, "total_dst": 22, "total_flags": 18, "nb_erreurs": 0,
+        "flags": {"[P.],": 8, "[.],": 4, "[S],": 6},
+        "sources": [("BP-Linux8.ssh", 7), ("192.168.190.130.50019", 4), ("ns1.lan.rt.domain", 2)],
+        "destinations": [("184.107.43.74.http", 6), ("BP-Linux8.ssh", 5), ("192.168.190.130.50019", 4)],
+    },
+    "fichier1000.txt": {
+        "lignes": 97, "total_src": 97, "total_dst": 97, "total_flags": 93, "nb_erreurs": 0,
+        "flags": {"[P.],": 8, "[.],": 4, "[S],": 81},
+        "sources": [("BP-Linux8.ssh", 7), ("192.168.190.130.50019", 4), ("ns1.lan.rt.domain", 2)],
+        "destinations": [("184.107.43.74.http", 81), ("BP-Linux8.ssh", 5), ("192.168.190.130.50019", 4)],
+    },
+}
+
+# Lignes que le tokenizer binaire renvoie au chemin texte (tabulation, double espace, non ASCII)
+LIGNES_INHABITUELLES = (
+    "11:42:05.000000 IP h\u00f4te.1 > b.2: Flags [S], error: refus\n"
+    "11:42:05.000001 IP a.1 >\tb.2: Flags [R], length 0\n"
+    "11:42:05.000002 IP a.1  > b.2: Flags [.], ERROR retransmission\n"
+    "11:42:05.000003 IP c.3 > b.2: Flags [S], length 0\r"
+    "11:42:05.000004 IP c.3 > b.2: Flags [F.], failed\r\n"
+).encode()
+
+
+def _paquet_tcp(src, dst, port_src, port_dst, flags, charge=b""):
+    """Paquet IPv4 + TCP minimal (sans sommes de contrôle)."""
+    tcp = struct.pack("!HHIIBBHHH", port_src, port_dst, 1, 0, 0x50, flags, 1024, 0, 0) + charge
+    return struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + len(tcp), 0, 0, 64, 6, 0,
+                       socket.inet_aton(src), socket.inet_aton(dst)) + tcp
+
+
+PAQUETS = [
+    _paquet_tcp("10.0.0.1", "10.0.0.2", 50000, 80, 0x02),
+    _paquet_tcp("10.0.0.2", "10.0.0.1", 80, 50000, 0x12),
+    _paquet_tcp("10.0.0.1", "10.0.0.2", 50000, 80, 0x18, b"GET /"),
+    _paquet_tcp("10.0.0.3", "10.0.0.2", 40000, 80, 0x02),
+]
+
+
+def _pcap(paquets):
+    """Capture pcap (µs, petit-boutiste) en IP brut (linktype 101)."""
+    donnees = struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 101)
+    for i, p in enumerate(paquets):
+        donnees += struct.pack("<IIII", 1000 + i, 0, len(p), len(p)) + p
+    return donnees
+
+
+def _pcapng(paquets):
+    """Capture pcapng : une section, une interface Ethernet, des Enhanced Packet Blocks."""
+    donnees = struct.pack("<IIIHHqI", 0x0A0D0D0A, 28, 0x1A2B3C4D, 1, 0, -1, 28)
+    donnees += struct.pack("<IIHHII", 1, 20, 1, 0, 0, 20)
+    for i, p in enumerate(paquets):
+        trame = bytes(12) + b"\x08\x00" + p
+        corps = trame + bytes(-len(trame) % 4)
+        total = 32 + len(corps)
+        us = (1000 + i) * 10**6
+        donnees += struct.pack("<IIIIIII", 6, total, 0, us >> 32, us & 0xFFFFFFFF, len(trame), len(trame))
+        donnees += corps + struct.pack("<I", total)
+    return donnees
+
+
+def _ecrire(dossier, nom, donnees):
+    chemin = Path(dossier) / nom
+    chemin.write_bytes(donnees)
+    return chemin
+
+# Capture tcpdump -t : aucune ligne n'a d'horodatage
+CAPTURE_SANS_HORODATAGE = b"""\
+IP 10.0.0.1.50000 > 10.0.0.2.80: Flags [S], seq 100, win 64240, length 0
+IP 10.0.0.2.80 > 10.0.0.1.50000: Flags [S.], seq 300, ack 101, win 65160, length 0
+IP 10.0.0.1.50000 > 10.0.0.2.80: Flags [.], ack 301, win 502, length 0
+IP 10.0.0.1.50000 > 10.0.0.2.80: Flags [P.], seq 101:181, ack 301, win 502, length 80
+IP 10.0.0.3.40000 > 10.0.0.2.443: Flags [S], seq 7, win 64240, length 0
+"""
+
+
+class TestFluxSansHorodatage(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.chemin = tempfile.mkstemp(suffix=".txt")
+        os.write(fd, CAPTURE_SANS_HORODATAGE)
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.chemin)
+
+    def test_rapport_markdown(self):
+        stats = a.analyser_fichier(self.chemin, flux=a.EXPIRATION_FLUX)
+        flux = stats["flux"]
+        self.assertEqual(flux["total"], 2)
+        self.assertIsNone(flux["duree_moyenne"])
+        self.assertTrue(all(d is None for _, _, _, _, d, _ in flux["top_octets"]))
+
+        md = a.rapport_markdown(stats, "sans_horodatage.txt")
+        self.assertIn("| `10.0.0.1.50000` | `10.0.0.2.80` | 80 | 4 | - | etabli |", md)
+
+
+
+class TestCapturesExemple(unittest.TestCase):
+    """Le tokenizer binaire (mmap) doit redonner les stats de l'analyseur d'origine."""
+
+    def verifier(self, stats, reference):
+        for cle in ("lignes", "total_src", "total_dst", "total_flags", "nb_erreurs"):
+            self.assertEqual(stats[cle], reference[cle], cle)
+        self.assertEqual(dict(stats["flags"]), reference["flags"])
+        self.assertEqual(stats["sources"][:3], reference["sources"])
+        self.assertEqual(stats["destinations"][:3], reference["destinations"])
+
+    def test_references(self):
+        for chemin in CAPTURES:
+            with self.subTest(capture=chemin.name):
+                self.verifier(a.analyser_fichier(chemin), REFERENCES[chemin.name])
+
+    def test_chemin_texte(self):
+        for chemin in CAPTURES:
+            with self.subTest(capture=chemin.name):
+                etat = a.EtatAnalyse()
+                etat.ajouter_lignes(chemin.read_text(encoding="utf-8", errors="ignore").splitlines())
+                self.verifier(etat.resultat(), REFERENCES[chemin.name])
+
+    def test_lignes_inhabituelles(self):
+        donnees = CAPTURES[0].read_bytes() + b"\n" + LIGNES_INHABITUELLES
+        binaire = a.EtatAnalyse(max_erreurs=100)
+        binaire.ajouter_tampon(donnees)
+        texte = a.EtatAnalyse(max_erreurs=100)
+        texte.ajouter_lignes(donnees.decode("utf-8").replace("\r", "\n").split("\n"))
+        attendu = texte.resultat()
+        self.assertEqual(attendu["lignes"], 27)
+        self.assertEqual(attendu["nb_erreurs"], 3)
+        self.assertEqual(binaire.resultat(), attendu)
+
+
+class TestPlagesParalleles(unittest.TestCase):
+    """Analyse en plusieurs processus (plages fusionnées) == analyse en un seul."""
+
+    def setUp(self):
+        self.dossier = tempfile.TemporaryDirectory()
+        erreurs = b"".join(b"11:42:06.%06d IP e.1 > f.2: Flags [R], error: refus %d\n" % (i, i) for i in range(40))
+        self.chemin = _ecrire(self.dossier.name, "grande.txt", (CAPTURES[0].read_bytes() + b"\n" + erreurs) * 20)
+
+    def tearDown(self):
+        self.dossier.cleanup()
+
+    def analyser(self, nb_processus, **options):
+        with mock.patch.object(a, "TAILLE_MIN_PLAGE", 4096):
+            return a.analyser_fichier(self.chemin, nb_processus=nb_processus, **options)
+
+    def test_fusion_des_plages(self):
+        for options in ({}, {"hexa": True}):
+            with self.subTest(**options):
+                un = self.analyser(1, **options)
+                self.assertEqual(un["nb_erreurs"], 800)
+                self.assertEqual(self.analyser(4, **options), un)
+
+    def test_fusion_des_echantillons(self):
+        # Numérotation de l'analyseur : lignes hexa (0x...) et lignes vides non comptées
+        utiles = [l for l in self.chemin.read_text().splitlines() if l.strip() and not l.strip().startswith("0x")]
+        lignes = {i + 1 for i, l in enumerate(utiles) if "error" in l}
+        for nb_processus in (1, 4):
+            with self.subTest(nb_processus=nb_processus):
+                stats = self.analyser(nb_processus, echantillon=True, max_erreurs=25)
+                self.assertEqual(stats["nb_erreurs"], 800)
+                numeros = [e["ligne"] for e in stats["erreurs"]]
+                self.assertEqual(len(set(numeros)), 25)
+                self.assertEqual(numeros, sorted(numeros))
+                self.assertLessEqual(set(numeros), lignes)
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dossier = tempfile.TemporaryDirectory()
+        self.cache = Path(self.dossier.name) / "cache"
+        self.chemin = _ecrire(self.dossier.name, "capture.txt", CAPTURES[1].read_bytes())
+
+    def tearDown(self):
+        self.dossier.cleanup()
+
+    def analyser(self):
+        profil = a.Profil()
+        stats = a.analyser_avec_cache(self.chemin, dossier=self.cache, profil=profil)
+        analyse = [m for m in profil.etapes if m["etape"] == "analyse"]
+        return stats, analyse[0]["octets"] if analyse else None
+
+    def test_reprise(self):
+        stats, lus = self.analyser()
+        self.assertEqual(lus, self.chemin.stat().st_size)
+        self.assertEqual(stats, a.analyser_fichier(self.chemin))
+        
+        self.assertEqual(self.analyser(), (stats, None))
+        
+        ajout = CAPTURES[0].read_bytes() + b"\n"
+        with open(self.chemin, "ab") as f:
+            f.write(ajout)
+        stats, lus = self.analyser()
+        # Seul le dernier paquet connu (lignes hexa comprises) est relu
+        self.assertGreaterEqual(lus, len(ajout))
+        self.assertLess(lus, self.chemin.stat().st_size // 2)
+        self.assertEqual(stats, a.analyser_fichier(self.chemin))
+
+    def test_contenu_modifie_meme_date(self):
+        self.analyser()
+        st = self.chemin.stat()
+        donnees = self.chemin.read_bytes().replace(b"Flags [P.]", b"Flags [R.]", 1)
+        self.chemin.write_bytes(donnees)
+        os.utime(self.chemin, ns=(st.st_atime_ns, st.st_mtime_ns))
+        stats, lus = self.analyser()
+        self.assertIsNotNone(lus)
+        self.assertEqual(dict(stats["flags"])["[R.],"], 1)
+
+
+class TestFormats(unittest.TestCase):
+    """Captures pcap, pcapng et compressées."""
+
+    def setUp(self):
+        self.dossier = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dossier.cleanup()
+
+    def test_pcap_et_pcapng(self):
+        for nom, donnees in (("x.pcap", _pcap(PAQUETS)), ("x.pcapng", _pcapng(PAQUETS))):
+            with self.subTest(capture=nom):
+                chemin = _ecrire(self.dossier.name, nom, donnees)
+                self.assertEqual(a.format_capture(chemin), nom[2:])
+                stats = a.analyser_fichier(chemin)
+                self.assertEqual(stats["lignes"], 4)
+                self.assertEqual(stats["sources"], [("10.0.0.1.50000", 2), ("10.0.0.2.80", 1), ("10.0.0.3.40000", 1)])
+                self.assertEqual(stats["destinations"], [("10.0.0.2.80", 3), ("10.0.0.1.50000", 1)])
+                self.assertEqual(dict(stats["flags"]), {"[S],": 2, "[S.],": 1, "[P.],": 1})
+
+    def test_compresse(self):
+        for source in CAPTURES + [_ecrire(self.dossier.name, "x.pcap", _pcap(PAQUETS))]:
+            with self.subTest(capture=source.name):
+                chemin = _ecrire(self.dossier.name, source.name + ".gz", gzip.compress(source.read_bytes()))
+                self.assertEqual(a.compression_capture(chemin), "gz")
+                self.assertEqual(a.analyser_fichier(chemin), a.analyser_fichier(source))
+
+
+class TestTablePaquets(unittest.TestCase):
+    """Les agrégats de la table doivent redonner les compteurs de l'analyse."""
+
+    def test_tops_et_flags(self):
+        for chemin in CAPTURES:
+            with self.subTest(capture=chemin.name):
+                stats = a.analyser_fichier(chemin, table=True, hotes=True)
+                table, index = stats["table"], stats["index"]
+                self.assertEqual(len(table), stats["total_src"])
+                self.assertEqual(table.compte_flags(), dict(stats["flags"]))
+                for nom, compteur in (("src", index.hotes_src), ("dst", index.hotes_dst)):
+                    self.assertEqual(Counter(dict(table.top(nom, n=None))), compteur)
+                    self.assertEqual([c for _, c in table.top(nom, 5)],
+                                     [c for _, c in compteur.most_common(5)])
+
+    def test_paquets_non_tcp(self):
+        table = a.TablePaquets()
+        table.ajouter(1.0, "10.0.0.1.53", "10.0.0.2.53", None, 40)
+        table.ajouter(2.0, "10.0.0.1.1", "10.0.0.2.80", a.BITS_FLAGS["[none],"], 0)
+        self.assertEqual(table.compte_flags(), {"[none],": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()